@@ -0,0 +1,190 @@
+"""Benchmark de form_teams sobre elencos sintéticos de tamanho crescente.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmark.bench_form_teams
+    python -m benchmark.bench_form_teams --sizes 12 24 48 --flexibility 0.2 --conflicts 0.0 0.05
+    python -m benchmark.bench_form_teams --compare benchmark/results/antigo.json benchmark/results/novo.json
+
+Cada caso roda num processo próprio, para que o pico de memória medido seja só dele.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import resource
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from data_input import import_data
+from data_cleaning import datasets
+from data_cleaning import roster
+from match_making import engine
+from match_making import lineup_model
+
+SKILL_COLUMNS = ['Saque', 'Recepcao', 'Levantamento', 'Ataque', 'Bloqueio', 'Defesa']
+# Distribuição das posições primárias, próxima à do elenco real
+PRIMARY_POSITION_WEIGHTS = {'Ponta': 0.35, 'Saida': 0.2, 'Meio': 0.15, 'Levantador': 0.15, 'Libero': 0.15}
+RESULTS_DIR = 'benchmark/results'
+
+
+def generate_roster(num_players, flexibility, conflict_density, seed=0):
+    # Gerar dataframes no mesmo formato de overall.csv e posicao_picuinha.csv
+    rng = random.Random(seed)
+    names = [f'Jogador{idx:03d}' for idx in range(num_players)]
+    overall_df = pd.DataFrame(
+        [[name] + [rng.randint(55, 95) for _ in SKILL_COLUMNS] for name in names],
+        columns=['Nome'] + SKILL_COLUMNS,
+    )
+
+    all_positions = list(PRIMARY_POSITION_WEIGHTS)
+    conflicts = {name: [] for name in names}
+    for idx, name in enumerate(names):
+        for other in names[idx + 1:]:
+            if rng.random() < conflict_density:
+                conflicts[name].append(other)
+
+    rows = []
+    for name in names:
+        primary = rng.choices(all_positions, weights=list(PRIMARY_POSITION_WEIGHTS.values()))[0]
+        # Cada posição extra entra com probabilidade igual à densidade de flexibilidade
+        extra = [pos for pos in all_positions if pos != primary and rng.random() < flexibility]
+        player_positions = ([primary] + extra + [None] * 5)[:5]
+        rows.append([name] + player_positions + ['/'.join(conflicts[name]) or None])
+    positions_df = pd.DataFrame(rows, columns=['Nome', 'Posicao1', 'Posicao2', 'Posicao3', 'Posicao4', 'Posicao5', 'Conflito'])
+    return overall_df, positions_df
+
+
+def run_case(case):
+    # Executado num processo separado; devolve as métricas do caso. A memória vem só do pico de RSS
+    # do processo (tracemalloc rastrearia cada alocação e inflaria os tempos medidos)
+    _, _, coefficients_df = import_data.import_all_data()
+    overall_df, positions_df = generate_roster(case['num_players'], case['flexibility'], case['conflict_density'], case['seed'])
+    case_roster = roster.Roster(*datasets.make_dict(overall_df, positions_df, coefficients_df))
+    all_players = case_roster.players
+    positions_required_list = engine.DEFAULT_CONFIGURATIONS[case['configuration'] - 1]
+
+    start = time.perf_counter()
+    model = lineup_model.build_lineup_model(case['formulation'], case_roster, positions_required_list)
+    build_time = time.perf_counter() - start
+
+    mandatory_players = all_players[:case['num_mandatory']]
+    start = time.perf_counter()
+    solutions_data = model.form_teams(all_players, num_solutions=case['num_solutions'], mandatory_players=mandatory_players,
+                                      num_workers=case['num_workers'], verbose=False, time_limit=case['time_limit'])
+    # Materializar todas as soluções para medir a extração completa
+    for solution_data in solutions_data:
+        dict(solution_data)
+    total_time = time.perf_counter() - start
+    stats = model.last_solve_stats
+
+    return dict(case, **{
+        'num_variables': model.num_variables(),
+        'num_constraints': len(model.model.Proto().constraints),
+        'build_time': build_time,
+        # Preparo da partida (literais de controle, pré-processamento e dica) fica fora da extração
+        'prepare_time': stats['prepare_time'],
+        'solve_time': stats['solve_time'],
+        'extraction_time': total_time - stats['prepare_time'] - stats['solve_time'],
+        'status': stats['status'],
+        'num_solutions_found': stats['num_solutions'],
+        'objective': stats['objective'],
+        'best_bound': stats['best_bound'],
+        'best_overall_difference': min((solution['overall_difference'] for solution in solutions_data), default=None),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+
+def build_cases(args):
+    cases = []
+    for num_players in args.sizes:
+        for flexibility in args.flexibility:
+            for conflict_density in args.conflicts:
+                for formulation in args.formulations:
+                    for configuration in args.configurations:
+                        cases.append({
+                            'num_players': num_players,
+                            'flexibility': flexibility,
+                            'conflict_density': conflict_density,
+                            'formulation': formulation,
+                            'configuration': configuration,
+                            'num_solutions': args.num_solutions,
+                            'num_workers': args.num_workers,
+                            'time_limit': args.time_limit,
+                            'seed': args.seed,
+                            'num_mandatory': args.mandatory,
+                        })
+    return cases
+
+
+def compare(old_path, new_path):
+    # Comparar dois arquivos de resultados caso a caso (tempo de solução e objetivo)
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    key_fields = ['num_players', 'flexibility', 'conflict_density', 'formulation', 'configuration']
+    old_cases = {tuple(case[field] for field in key_fields): case for case in old['cases']}
+    print(f"{old['commit']} -> {new['commit']}")
+    for case in new['cases']:
+        key = tuple(case[field] for field in key_fields)
+        if key not in old_cases:
+            continue
+        before = old_cases[key]
+        ratio = case['solve_time'] / before['solve_time'] if before['solve_time'] else float('nan')
+        print(f"{key}: solve {before['solve_time']:.3f}s -> {case['solve_time']:.3f}s (x{ratio:.2f}), "
+              f"objetivo {before['objective']} -> {case['objective']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de form_teams com elencos sintéticos")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[12, 24, 48, 100, 200])
+    parser.add_argument('--flexibility', type=float, nargs='+', default=[0.1, 0.4], help="Probabilidade de cada posição extra por jogador")
+    parser.add_argument('--conflicts', type=float, nargs='+', default=[0.0, 0.02], help="Probabilidade de conflito entre cada par de jogadores")
+    parser.add_argument('--formulations', nargs='+', default=list(lineup_model.FORMULATIONS))
+    parser.add_argument('--configurations', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--num-solutions', type=int, default=10)
+    parser.add_argument('--num-workers', type=int, default=0, help="Workers do CP-SAT (0 = todos os núcleos)")
+    parser.add_argument('--time-limit', type=float, default=10.0, help="Limite de tempo por solução, em segundos")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mandatory', type=int, default=0, help="Quantos dos primeiros jogadores são obrigatórios")
+    parser.add_argument('--output', default=None, help=f"Arquivo JSON de saída (padrão: {RESULTS_DIR}/bench_<commit>_<data>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('ANTIGO', 'NOVO'), help="Comparar dois arquivos de resultados")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    cases = build_cases(args)
+    results = []
+    # Um processo novo por caso, para isolar o pico de memória
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1) as executor:
+        for case, result in zip(cases, executor.map(run_case, cases)):
+            results.append(result)
+            print(f"{case['num_players']:>4} jogadores, flex {case['flexibility']:.2f}, conflitos {case['conflict_density']:.2f}, "
+                  f"{case['formulation']:<8} config {case['configuration']}: build {result['build_time']:.3f}s, "
+                  f"preparo {result['prepare_time']*1000:.1f}ms, solve {result['solve_time']:.3f}s, extração {result['extraction_time']*1000:.1f}ms, "
+                  f"{result['status']}, objetivo {result['objective']}, pico {result['peak_rss_mb']:.0f}MB")
+
+    commit = git_commit()
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = f"{RESULTS_DIR}/bench_{commit}_{datetime.datetime.now().strftime('%d-%m-%Y_%H-%M-%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'commit': commit, 'numpy': np.__version__, 'cases': results}, f, indent=2)
+    print(f"Resultados salvos em {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import hashlib
+import numpy as np
+
+SKILL_NAMES = ['Saque', 'Recepcao', 'Levantamento', 'Ataque', 'Bloqueio', 'Defesa']
+SCALE_FACTOR = 1000  # Fator de escala para lidar com variáveis inteiras
+
+
+class Roster:
+    """Elenco em arrays, indexado por ids inteiros (a ordem de all_players).
+
+    Entram apenas jogadores com habilidades e posições cadastradas. Os dicionários
+    por nome (positions, conflicts, primary_positions, overalls) continuam disponíveis
+    para a construção dos modelos CP-SAT, que nomeia as variáveis pelos jogadores;
+    os jogadores de uma partida são recortados dos arrays pelos ids (ids).
+    """
+
+    def __init__(self, positions, conflicts, coefficients, all_players, skills, all_positions, scale_factor=SCALE_FACTOR, version=None):
+        self.scale_factor = scale_factor
+        # Versão do snapshot dos CSVs (roster_cache); None quando o elenco não veio do snapshot
+        self.version = version
+        self.players = [player for player in all_players if player in skills and player in positions]
+        self.index = {player: idx for idx, player in enumerate(self.players)}
+        self.position_names = list(all_positions)
+        self.position_index = {pos: idx for idx, pos in enumerate(self.position_names)}
+        num_players = len(self.players)
+
+        # Posições de cada jogador, em ordem de preferência (a primeira é a primária)
+        self.positions = {player: list(positions[player]) for player in self.players}
+        self.primary_positions = {player: self.positions[player][0] for player in self.players}
+        self.primary_position_ids = np.array([self.position_index[self.primary_positions[player]] for player in self.players], dtype=np.intp)
+
+        # Habilidades (jogadores × habilidades) e coeficientes de calibração (posições × habilidades)
+        self.skill_matrix = np.array([[skills[player][skill] for skill in SKILL_NAMES] for player in self.players], dtype=np.float64).reshape(num_players, len(SKILL_NAMES))
+        self.coefficient_matrix = np.array([[coefficients[pos][skill] for skill in SKILL_NAMES] for pos in self.position_names], dtype=np.float64)
+
+        # Overall de cada jogador em cada posição: média das habilidades ponderada pelos coeficientes da posição.
+        # As somas seguem a ordem das habilidades, para truncar exatamente como o cálculo escalar original
+        numerator = np.zeros((num_players, len(self.position_names)))
+        denominator = np.zeros(len(self.position_names))
+        for skill_idx in range(len(SKILL_NAMES)):
+            numerator += self.skill_matrix[:, skill_idx, None] * self.coefficient_matrix[None, :, skill_idx]
+            denominator += self.coefficient_matrix[:, skill_idx]
+        self.overall_matrix = (numerator / denominator * scale_factor).astype(np.int64)
+
+        # Posições que cada jogador pode ocupar: matriz booleana e máscara de bits por jogador
+        # (posições sem coeficientes de calibração, como erros de digitação, ficam de fora)
+        self.eligibility = np.zeros((num_players, len(self.position_names)), dtype=bool)
+        for idx, player in enumerate(self.players):
+            self.eligibility[idx, [self.position_index[pos] for pos in self.positions[player] if pos in self.position_index]] = True
+        self.eligibility_mask = (self.eligibility * (1 << np.arange(len(self.position_names)))).sum(axis=1)
+
+        # Conflitos como matriz de adjacência simétrica (nomes fora do elenco são ignorados)
+        self.conflict_matrix = np.zeros((num_players, num_players), dtype=bool)
+        for player in self.players:
+            for other in conflicts.get(player, []):
+                if other in self.index:
+                    self.conflict_matrix[self.index[player], self.index[other]] = True
+                    self.conflict_matrix[self.index[other], self.index[player]] = True
+        self.conflicts = {player: [self.players[other] for other in np.flatnonzero(self.conflict_matrix[idx])] for idx, player in enumerate(self.players)}
+
+        # Overall usado na escalação: o da posição primária. Fora dela o overall ajustado é o mesmo
+        # (sem penalização). Vetores por id, e os mesmos valores por nome
+        self.primary_overalls = self.overall_matrix[np.arange(num_players), self.primary_position_ids]
+        self.adjusted_overalls = self.primary_overalls.copy()
+        self.primary_overall = {}
+        self.adjusted_overall = {}
+        self._sync_overall_dicts()
+
+    def _sync_overall_dicts(self):
+        # Atualizados no lugar: modelos e soluções guardam referências a estes dicionários
+        self.primary_overall.update(zip(self.players, self.primary_overalls.tolist()))
+        self.adjusted_overall.update(zip(self.players, self.adjusted_overalls.tolist()))
+
+    def shift_overalls(self, shifts):
+        # Somar um ajuste (em unidades escaladas) ao overall de cada jogador em todas as posições,
+        # como na mistura com os ratings; os ajustes entram na versão, para o cache de escalações
+        for player, shift in shifts.items():
+            if player not in self.index:
+                continue
+            idx = self.index[player]
+            self.overall_matrix[idx] += shift
+            self.primary_overalls[idx] += shift
+            self.adjusted_overalls[idx] += shift
+        self._sync_overall_dicts()
+        if self.version is not None and shifts:
+            digest = hashlib.sha256(repr(sorted(shifts.items())).encode('utf-8')).hexdigest()
+            self.version = f'{self.version}+{digest[:16]}'
+
+    def __len__(self):
+        return len(self.players)
+
+    def __contains__(self, player):
+        return player in self.index
+
+    def ids(self, players):
+        # Ids dos jogadores do elenco, na ordem dada (nomes desconhecidos são ignorados)
+        return np.array([self.index[player] for player in players if player in self.index], dtype=np.intp)
+
+    def names(self, ids):
+        return [self.players[idx] for idx in ids]
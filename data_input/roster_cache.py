@@ -0,0 +1,94 @@
+import hashlib
+import os
+import pickle
+
+CSV_FILES = ['csv/overall.csv', 'csv/posicao_picuinha.csv', 'csv/valores_calibracao.csv']
+CACHE_PATH = 'csv/.roster_cache.pkl'
+CACHE_VERSION = 1
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _plain(value):
+    # Converter escalares do numpy/pandas em tipos do Python, para o snapshot não depender deles
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if cache.get('version') != CACHE_VERSION:
+        return None
+    return cache
+
+
+def _is_valid(cache, csv_files):
+    # Válido se os CSVs não mudaram: mtime e tamanho iguais, ou, se mudaram, o mesmo conteúdo
+    touched = False
+    for path in csv_files:
+        cached = cache['files'].get(path)
+        if cached is None or not os.path.exists(path):
+            return False, False
+        signature = _file_signature(path)
+        if signature == {'mtime_ns': cached['mtime_ns'], 'size': cached['size']}:
+            continue
+        if _file_hash(path) != cached['sha256']:
+            return False, False
+        cached.update(signature)
+        touched = True
+    return True, touched
+
+
+def _write_cache(cache, cache_path):
+    # Gravar num arquivo temporário e renomear, para não deixar um snapshot pela metade
+    tmp_path = f'{cache_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+def _snapshot_version(cache):
+    # Versão do snapshot: muda sempre que o conteúdo de algum dos CSVs muda
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for path in sorted(cache['files']):
+        digest.update(cache['files'][path]['sha256'].encode())
+    return digest.hexdigest()
+
+
+def load_roster_snapshot(csv_files=CSV_FILES, cache_path=CACHE_PATH):
+    # Mesmo retorno de datasets.make_dict e a versão do snapshot (para invalidar caches derivados dos CSVs);
+    # o pandas só é importado quando o snapshot precisa ser refeito
+    cache = _read_cache(cache_path)
+    if cache is not None:
+        valid, touched = _is_valid(cache, csv_files)
+        if valid:
+            if touched:
+                _write_cache(cache, cache_path)
+            return cache['roster'], _snapshot_version(cache)
+
+    from data_input import import_data
+    from data_cleaning import datasets
+    overall_df, positions_df, coefficients_df = import_data.import_all_data()
+    roster = _plain(list(datasets.make_dict(overall_df, positions_df, coefficients_df)))
+    cache = {
+        'version': CACHE_VERSION,
+        'files': {path: dict(_file_signature(path), sha256=_file_hash(path)) for path in csv_files},
+        'roster': tuple(roster),
+    }
+    _write_cache(cache, cache_path)
+    return cache['roster'], _snapshot_version(cache)
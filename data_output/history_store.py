@@ -0,0 +1,136 @@
+import csv
+import datetime
+import os
+import sqlite3
+from data_output import match_log
+
+HISTORY_DIR = 'match_history'
+DEFAULT_PATH = f'{HISTORY_DIR}/history.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested_files (
+    name TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_totals (
+    session TEXT NOT NULL,
+    session_date TEXT NOT NULL,
+    player TEXT NOT NULL,
+    games_played INTEGER NOT NULL,
+    games_won INTEGER NOT NULL,
+    PRIMARY KEY (session, player)
+);
+CREATE INDEX IF NOT EXISTS idx_totals_player ON session_totals (player, session_date, games_played, games_won);
+CREATE INDEX IF NOT EXISTS idx_totals_date ON session_totals (session_date);
+CREATE TABLE IF NOT EXISTS match_players (
+    session TEXT NOT NULL,
+    session_date TEXT NOT NULL,
+    match INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    team INTEGER NOT NULL,
+    position TEXT NOT NULL,
+    won INTEGER NOT NULL,
+    PRIMARY KEY (session, match, player)
+);
+CREATE INDEX IF NOT EXISTS idx_matches_player ON match_players (player, session_date);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON match_players (session_date);
+"""
+
+
+def session_date(session):
+    # 'sessao_jogo_24-11-2024_20-49-42' / 'partidas_24-11-2024_20-49-42' -> '2024-11-24 20:49:42'
+    timestamp = '_'.join(session.rsplit('_', 2)[1:])
+    return datetime.datetime.strptime(timestamp, '%d-%m-%Y_%H-%M-%S').strftime('%Y-%m-%d %H:%M:%S')
+
+
+class HistoryStore:
+    """Histórico de todas as sessões em SQLite, com índices por jogador e por data.
+
+    Os arquivos de match_history são ingeridos de forma incremental: apenas os novos
+    ou modificados (pelo nome e mtime) são lidos a cada chamada de ingest.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def ingest(self, directory=HISTORY_DIR):
+        # Devolve o número de arquivos (re)ingeridos
+        seen = dict(self.connection.execute('SELECT name, mtime FROM ingested_files'))
+        ingested = 0
+        with self.connection:
+            for name in sorted(os.listdir(directory)):
+                is_totals = name.startswith('sessao_jogo_') and name.endswith('.csv')
+                is_log = name.startswith('partidas_') and name.endswith('.jsonl')
+                if not (is_totals or is_log):
+                    continue
+                path = os.path.join(directory, name)
+                mtime = os.path.getmtime(path)
+                if seen.get(name) == mtime:
+                    continue
+                session = os.path.splitext(name)[0]
+                if is_totals:
+                    self._ingest_totals(path, session)
+                else:
+                    self._ingest_log(path, session)
+                self.connection.execute('INSERT OR REPLACE INTO ingested_files (name, mtime) VALUES (?, ?)', (name, mtime))
+                ingested += 1
+        return ingested
+
+    def _ingest_totals(self, path, session):
+        date = session_date(session)
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = [(session, date, row['Player'], int(row['Games_Played']), int(row['Games_Won'])) for row in csv.DictReader(f)]
+        # Um arquivo modificado substitui as linhas da versão anterior
+        self.connection.execute('DELETE FROM session_totals WHERE session = ?', (session,))
+        self.connection.executemany('INSERT INTO session_totals VALUES (?, ?, ?, ?, ?)', rows)
+
+    def _ingest_log(self, path, session):
+        date = session_date(session)
+        rows = []
+        for record in match_log.read_match_log(path):
+            winners = record['winner'] if isinstance(record['winner'], list) else [record['winner']]
+            for team, team_positions in enumerate(record['positions']):
+                for pos, players in team_positions.items():
+                    for player in players:
+                        rows.append((session, date, record['match'], player, team + 1, pos, int(team + 1 in winners)))
+        self.connection.execute('DELETE FROM match_players WHERE session = ?', (session,))
+        self.connection.executemany('INSERT INTO match_players VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def player_totals(self, players=None, start=None, end=None):
+        # Partidas jogadas e vencidas por jogador em todas as sessões (ou no intervalo de datas 'AAAA-MM-DD').
+        # Sessões interrompidas antes de gravar o CSV de totais entram pelo log de partidas
+        query = (
+            'WITH totals AS ('
+            ' SELECT player, session_date, games_played, games_won FROM session_totals'
+            ' UNION ALL'
+            ' SELECT player, session_date, COUNT(*), SUM(won) FROM match_players'
+            ' WHERE session_date NOT IN (SELECT session_date FROM session_totals)'
+            ' GROUP BY session, player'
+            ') SELECT player, SUM(games_played), SUM(games_won), COUNT(*) FROM totals WHERE 1 = 1'
+        )
+        params = []
+        if players:
+            query += f" AND player IN ({', '.join('?' * len(players))})"
+            params.extend(players)
+        if start:
+            query += ' AND session_date >= ?'
+            params.append(start)
+        if end:
+            # Inclui o dia final inteiro
+            query += ' AND session_date < date(?, \'+1 day\')'
+            params.append(end)
+        query += ' GROUP BY player ORDER BY SUM(games_played) DESC, player'
+        return [
+            {'Player': player, 'Games_Played': played, 'Games_Won': won, 'Sessions': sessions}
+            for player, played, won, sessions in self.connection.execute(query, params)
+        ]
+
+    def position_totals(self, player):
+        # Partidas por posição de um jogador (disponível para as sessões com log de partidas)
+        query = 'SELECT position, COUNT(*), SUM(won) FROM match_players WHERE player = ? GROUP BY position ORDER BY COUNT(*) DESC'
+        return [{'Position': pos, 'Games_Played': played, 'Games_Won': won} for pos, played, won in self.connection.execute(query, (player,))]
+
+    def close(self):
+        self.connection.close()
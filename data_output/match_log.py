@@ -0,0 +1,68 @@
+import datetime
+import json
+import os
+
+
+def build_match_record(match_number, config_number, solution_data, winning_team):
+    # Um registro por partida: times, posições, overalls e vencedor (winning_team começa em 1;
+    # com várias quadras é a lista dos vencedores, um por quadra)
+    scale_factor = solution_data['scale_factor']
+    teams = solution_data['teams']
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'match': match_number,
+        'configuration': config_number,
+        'teams': [teams[team] for team in range(len(teams))],
+        'positions': [solution_data['team_positions'][team] for team in range(len(teams))],
+        'team_overalls': [solution_data['team_overalls_result'][team] / scale_factor for team in range(len(teams))],
+        'overall_difference': solution_data['overall_difference'] / scale_factor,
+        'left_out': solution_data['left_out_players'],
+        'winner': winning_team,
+    }
+
+
+class MatchLog:
+    """Log de partidas só de acréscimo (JSON Lines), gravado em disco ao fim de cada partida."""
+
+    def __init__(self, path):
+        self.path = path
+        # O arquivo só é criado na primeira partida registrada
+        self._file = None
+
+    def append(self, record):
+        # Cada partida acrescenta uma linha de tamanho constante; flush + fsync para sobreviver a quedas
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def read_match_log(path):
+    # Ler os registros do log; uma última linha incompleta (queda durante a escrita) é ignorada
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return records
+
+
+def session_totals(records):
+    # Partidas jogadas e vencidas por jogador, reconstruídas a partir do log
+    totals = {}
+    for record in records:
+        winners = record['winner'] if isinstance(record['winner'], list) else [record['winner']]
+        for team, players in enumerate(record['teams']):
+            for player in players:
+                stats = totals.setdefault(player, {'Player': player, 'Games_Played': 0, 'Games_Won': 0})
+                stats['Games_Played'] += 1
+                if team + 1 in winners:
+                    stats['Games_Won'] += 1
+    return list(totals.values())
@@ -0,0 +1,177 @@
+import json
+import math
+import os
+from data_output import history_store
+from data_output import match_log
+
+RATINGS_PATH = f'{history_store.HISTORY_DIR}/ratings.json'
+BASE_RATING = 1500.0
+# Pontos de Elo por partida (ganho máximo de cada jogador do time vencedor)
+K_FACTOR = 32.0
+# Regularização do ajuste em lote: puxa para BASE_RATING quem jogou poucas partidas
+REFIT_PRIOR = 0.5
+# Partidas para o rating valer metade do peso na mistura com o overall
+RATING_PRIOR_GAMES = 10
+
+
+def expected_score(team_rating, opponent_rating):
+    # Probabilidade de vitória do time pela diferença de Elo (média dos ratings de cada time)
+    return 1.0 / (1.0 + 10.0 ** ((opponent_rating - team_rating) / 400.0))
+
+
+def match_results(record):
+    # (time A, time B, A venceu) de cada quadra de um registro do log de partidas
+    winners = record['winner'] if isinstance(record['winner'], list) else [record['winner']]
+    teams = record['teams']
+    return [(teams[2 * court], teams[2 * court + 1], 2 * court + 1 in winners) for court in range(len(teams) // 2)]
+
+
+def history_log_names(directory=history_store.HISTORY_DIR):
+    # Nomes dos logs de partidas, das sessões mais antigas às mais recentes
+    if not os.path.isdir(directory):
+        return []
+    names = [name for name in os.listdir(directory) if name.startswith('partidas_') and name.endswith('.jsonl')]
+    names.sort(key=lambda name: history_store.session_date(os.path.splitext(name)[0]))
+    return names
+
+
+def history_logs(directory=history_store.HISTORY_DIR):
+    # Logs de partidas (nome, registros), das sessões mais antigas às mais recentes
+    return [(name, match_log.read_match_log(os.path.join(directory, name))) for name in history_log_names(directory)]
+
+
+class RatingEngine:
+    """Ratings Elo dos jogadores, atualizados a cada resultado e gravados em match_history.
+
+    A força de um time é a média dos ratings dos seus jogadores; o resultado move todos
+    os jogadores do time pelo mesmo valor (O(tamanho do time) por partida). O arquivo
+    guarda quantas partidas de cada log já entraram nos ratings e o mtime de cada log lido,
+    então ao iniciar só os logs novos ou modificados são lidos, e só as partidas novas são
+    aplicadas (catch_up). refit recalcula tudo de uma vez pelo histórico.
+    """
+
+    def __init__(self, path=RATINGS_PATH, k_factor=K_FACTOR):
+        self.path = path
+        self.k_factor = k_factor
+        self.ratings = {}
+        self.games = {}
+        # Partidas já aplicadas de cada log de partidas (pelo nome do arquivo)
+        self.applied = {}
+        # mtime de cada log quando foi lido por inteiro (a mesma marca do ingest do history_store)
+        self.mtimes = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        self.ratings = data.get('ratings', {})
+        self.games = data.get('games', {})
+        self.applied = data.get('applied', {})
+        self.mtimes = data.get('mtimes', {})
+
+    def rating(self, player):
+        return self.ratings.get(player, BASE_RATING)
+
+    def update(self, team_a, team_b, a_won):
+        # Atualização Elo de uma partida: só os jogadores dos dois times mudam
+        rating_a = sum(self.rating(player) for player in team_a) / len(team_a)
+        rating_b = sum(self.rating(player) for player in team_b) / len(team_b)
+        delta = self.k_factor * (float(a_won) - expected_score(rating_a, rating_b))
+        for team, sign in ((team_a, 1.0), (team_b, -1.0)):
+            for player in team:
+                self.ratings[player] = self.rating(player) + sign * delta
+                self.games[player] = self.games.get(player, 0) + 1
+        self._dirty = True
+
+    def record_match(self, record, log_name):
+        # Aplicar uma partida recém-registrada no log (match_log.build_match_record)
+        for team_a, team_b, a_won in match_results(record):
+            self.update(team_a, team_b, a_won)
+        self.applied[log_name] = self.applied.get(log_name, 0) + 1
+
+    def catch_up(self, directory=history_store.HISTORY_DIR):
+        # Aplicar as partidas dos logs que ainda não entraram nos ratings; devolve quantas foram
+        applied = 0
+        for name in history_log_names(directory):
+            path = os.path.join(directory, name)
+            mtime = os.path.getmtime(path)
+            # Log sem mudança desde a última leitura: todas as suas partidas já foram aplicadas
+            if self.mtimes.get(name) == mtime:
+                continue
+            for record in match_log.read_match_log(path)[self.applied.get(name, 0):]:
+                self.record_match(record, name)
+                applied += 1
+            self.mtimes[name] = mtime
+            self._dirty = True
+        return applied
+
+    def refit(self, directory=history_store.HISTORY_DIR, prior=REFIT_PRIOR, max_iterations=50):
+        """Recalcular os ratings com todo o histórico num único ajuste Bradley-Terry.
+
+        Cada partida é uma linha da matriz jogadores × partidas (+1/n para o time A, -1/n
+        para o time B) e os ratings saem de uma regressão logística regularizada, resolvida
+        por Newton com operações vetorizadas sobre todas as partidas; a escala é a do Elo.
+        """
+        # numpy só é carregado aqui e em overall_shifts, fora da inicialização
+        import numpy as np
+        logs = history_logs(directory)
+        matches = [result for _, records in logs for record in records for result in match_results(record)]
+        players = sorted({player for team_a, team_b, _ in matches for player in team_a + team_b})
+        index = {player: idx for idx, player in enumerate(players)}
+        rows, cols, values = [], [], []
+        for row, (team_a, team_b, _) in enumerate(matches):
+            for team, sign in ((team_a, 1.0), (team_b, -1.0)):
+                rows += [row] * len(team)
+                cols += [index[player] for player in team]
+                values += [sign / len(team)] * len(team)
+        design = np.zeros((len(matches), len(players)))
+        np.add.at(design, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), values)
+        outcome = np.array([float(a_won) for _, _, a_won in matches])
+
+        strength = np.zeros(len(players))
+        for _ in range(max_iterations):
+            probability = 1.0 / (1.0 + np.exp(-design @ strength))
+            gradient = design.T @ (outcome - probability) - prior * strength
+            hessian = (design.T * (probability * (1.0 - probability))) @ design + prior * np.eye(len(players))
+            step = np.linalg.solve(hessian, gradient)
+            strength += step
+            if len(step) == 0 or np.abs(step).max() < 1e-8:
+                break
+
+        # Força logística -> pontos de Elo (10^(d/400) = e^(força))
+        self.ratings = dict(zip(players, (BASE_RATING + strength * 400.0 / math.log(10)).tolist()))
+        self.games = dict(zip(players, (design != 0).sum(axis=0).tolist()))
+        self.applied = {name: len(records) for name, records in logs}
+        self.mtimes = {name: os.path.getmtime(os.path.join(directory, name)) for name, _ in logs}
+        self._dirty = True
+        return len(matches)
+
+    def overall_shifts(self, roster, weight, prior_games=RATING_PRIOR_GAMES):
+        # Ajuste do overall de cada jogador (em unidades escaladas) pela mistura com o rating:
+        # 400 pontos de Elo valem um desvio padrão dos overalls do elenco, e o peso cresce com
+        # as partidas jogadas (quem nunca jogou fica com o overall das habilidades)
+        import numpy as np
+        spread = float(np.std(list(roster.primary_overall.values())))
+        shifts = {}
+        for player in roster.players:
+            games = self.games.get(player, 0)
+            if player not in self.ratings or games == 0:
+                continue
+            player_weight = weight * games / (games + prior_games)
+            shifts[player] = int(round(player_weight * (self.ratings[player] - BASE_RATING) / 400.0 * spread))
+        return shifts
+
+    def save(self):
+        # Gravar num arquivo temporário e renomear, como o cache de escalações
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'ratings': self.ratings, 'games': self.games, 'applied': self.applied, 'mtimes': self.mtimes}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
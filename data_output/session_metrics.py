@@ -0,0 +1,96 @@
+import datetime
+import time
+from contextlib import contextmanager
+from data_output import match_log
+
+
+class SessionMetrics:
+    """Tempos por fase e estatísticas do CP-SAT de cada partida da sessão.
+
+    Cada partida vira uma linha JSON (mesmo formato só de acréscimo do log de partidas)
+    com o tempo de parede de cada fase e, por configuração, os tempos de preparação,
+    busca e decodificação, o status, o limite inferior e os ramos/conflitos do CP-SAT.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.records = []
+        # Fases de fora das partidas (carregar o elenco, por exemplo)
+        self.session_phases = {}
+        self._phases = {}
+        self._log = None
+
+    def open(self, path):
+        # O arquivo é criado só na primeira partida registrada, como o log de partidas
+        self.path = path
+        self._log = match_log.MatchLog(path)
+
+    @contextmanager
+    def phase(self, name):
+        # Cronometrar uma fase da partida em andamento (somada, se repetida)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record_session_phase(self, name, elapsed):
+        self.session_phases[name] = elapsed
+
+    def record_match(self, match_number, players, mandatory_players, source, configurations):
+        # Fecha a partida: as fases cronometradas desde a última chamada e as estatísticas por configuração
+        record = {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'match': match_number,
+            'num_players': len(players),
+            'num_mandatory': len(mandatory_players),
+            'source': source,
+            'phases': self._phases,
+            'configurations': configurations,
+        }
+        self._phases = {}
+        self.records.append(record)
+        if self._log is not None:
+            self._log.append(record)
+        return record
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+
+    def summary(self):
+        # Texto com o total e a média de cada fase, o pior caso do CP-SAT e a partida mais lenta
+        lines = []
+        for name, elapsed in self.session_phases.items():
+            lines.append(f"{name}: {elapsed*1000:.1f}ms")
+        if not self.records:
+            return '\n'.join(lines + ["Nenhuma partida registrada."])
+        phase_totals = {}
+        for record in self.records:
+            for name, elapsed in record['phases'].items():
+                phase_totals.setdefault(name, []).append(elapsed)
+        lines.append(f"Partidas: {len(self.records)}")
+        for name, values in phase_totals.items():
+            lines.append(f"  {name}: total {sum(values)*1000:.1f}ms, média {sum(values)/len(values)*1000:.1f}ms, máx {max(values)*1000:.1f}ms")
+        searches = [stats for record in self.records for stats in record['configurations'] if stats.get('source') == 'cp-sat']
+        if searches:
+            slowest = max(searches, key=lambda stats: stats.get('solve_time', 0.0))
+            fixed = sum(stats.get('presolve_fixed_variables', 0) for stats in searches)
+            if fixed:
+                candidates = sum(stats.get('presolve_candidate_variables', 0) for stats in searches)
+                lines.append(f"  Pré-processamento: {fixed} de {candidates} variáveis dos jogadores presentes fixadas antes do CP-SAT")
+            lines.append(f"  Buscas do CP-SAT: {len(searches)}, ramos {sum(stats.get('num_branches', 0) for stats in searches)}, "
+                         f"conflitos {sum(stats.get('num_conflicts', 0) for stats in searches)}; mais lenta: configuração "
+                         f"{slowest['configuration']} em {slowest.get('solve_time', 0.0)*1000:.1f}ms ({slowest.get('status')})")
+        cached = sum(1 for record in self.records for stats in record['configurations'] if stats.get('source') == 'cache')
+        if cached:
+            lines.append(f"  Configurações recuperadas do cache: {cached}")
+        pruned = sum(1 for record in self.records for stats in record['configurations'] if stats.get('source') == 'pruned')
+        if pruned:
+            lines.append(f"  Configurações descartadas antes do solver: {pruned}")
+        slowest_match = max(self.records, key=lambda record: record['phases'].get('resolver', 0.0))
+        lines.append(f"  Partida mais lenta para resolver: {slowest_match['match']} ({slowest_match['num_players']} jogadores, "
+                     f"{slowest_match['phases'].get('resolver', 0.0)*1000:.1f}ms, origem: {slowest_match['source']})")
+        if self.path:
+            lines.append(f"  Métricas por partida em {self.path}")
+        return '\n'.join(lines)
@@ -1,11 +1,62 @@
-from data_input import import_data
-from data_cleaning import datasets
-from match_making import make_teams
-import ortools
-import numpy
-import pandas
+from data_input import roster_cache
+from data_output import history_store
+from data_output import ratings
+from data_output import session_metrics
+from importlib import metadata
+import argparse
+import time
 
 def main():
+    parser = argparse.ArgumentParser(description="Fofoca Project - formação de times")
+    parser.add_argument("--workers", type=int, default=1, help="Número de processos para resolver as configurações em paralelo (1 = sequencial)")
+    parser.add_argument("--options", type=int, default=None, help="Número máximo de opções de times exibidas por partida (padrão: todas)")
+    parser.add_argument("--formulation", choices=["classic", "compact"], default="classic", help="Formulação do modelo CP-SAT")
+    parser.add_argument("--time-budget", type=float, default=None, help="Tempo total (s) de busca por partida, dividido entre as configurações")
+    parser.add_argument("--improve", type=float, default=None, help="Tempo (s) para refinar as opções em segundo plano enquanto são lidas")
+    parser.add_argument("--mode", choices=["exact", "heuristic", "heuristic-then-exact"], default="exact",
+                        help="Busca das escalações: CP-SAT, heurística (gulosa + busca local, em milissegundos) ou as duas, com o gap da heurística")
+    parser.add_argument("--top-k", action="store_true", help="Gerar as k melhores divisões de times distintas (cortes no-good) em vez das primeiras soluções (sem --time-budget, prazo de 3s por partida)")
+    parser.add_argument("--no-presolve", action="store_true", help="Não fixar antes do CP-SAT as posições, times e jogadores forçados de cada partida")
+    parser.add_argument("--courts", type=int, default=1, help="Número de quadras simultâneas (2 times por quadra)")
+    parser.add_argument("--court-strategy", choices=["partition", "joint"], default="partition", help="Várias quadras: dividir os jogadores e resolver cada quadra em paralelo, ou um único modelo com todos os times")
+    parser.add_argument("--plan-ahead", type=int, default=None, metavar="K", help="Planejar o rodízio das próximas K partidas e calcular as escalações de antemão")
+    parser.add_argument("--no-lineup-cache", action="store_true", help="Não reaproveitar escalações já calculadas em sessões anteriores (match_history/lineup_cache.pkl)")
+    parser.add_argument("--metrics-summary", action="store_true", help="Mostrar ao final o resumo dos tempos por fase e das buscas do CP-SAT (as métricas são sempre gravadas em match_history)")
+    parser.add_argument("--rating-weight", type=float, default=0.0, metavar="W",
+                        help="Misturar os ratings Elo (match_history/ratings.json) aos overalls: 0 = só as habilidades, 1 = peso total para quem já jogou bastante")
+    parser.add_argument("--refit-ratings", action="store_true", help="Recalcular os ratings com todo o histórico de partidas de uma vez, mostrá-los e sair")
+    parser.add_argument("--serve", default=None, metavar="ENDERECO", help="Serviço local de escalações para vários grupos: 'host:porta' (HTTP) ou 'unix:/caminho' (socket Unix)")
+    parser.add_argument("--serve-engines", type=int, default=2, help="Motores CP-SAT aquecidos no modo --serve (partidas resolvidas ao mesmo tempo)")
+    parser.add_argument("--max-pending", type=int, default=8, help="Partidas esperando motor no modo --serve antes de recusar novas (503)")
+    parser.add_argument("--replay", nargs="+", metavar="ROTEIRO", help="Reproduzir sessões gravadas (JSON/CSV) sem interação")
+    parser.add_argument("--repeat", type=int, default=1, help="Quantas vezes reproduzir cada roteiro no modo --replay")
+    parser.add_argument("--replay-output", default=None, help="Arquivo JSON com os resultados detalhados do modo --replay")
+    parser.add_argument("--history", nargs="*", metavar="JOGADOR", help="Mostrar partidas jogadas/vencidas de todas as sessões (opcionalmente só destes jogadores) e sair")
+    parser.add_argument("--since", default=None, help="Data inicial (AAAA-MM-DD) para --history")
+    parser.add_argument("--until", default=None, help="Data final (AAAA-MM-DD) para --history")
+    args = parser.parse_args()
+
+    #Histórico de todas as sessões, sem carregar o elenco nem o solver
+    if args.history is not None:
+        store = history_store.HistoryStore()
+        new_files = store.ingest()
+        totals = store.player_totals(args.history, start=args.since, end=args.until)
+        store.close()
+        print(f"Arquivos novos ou modificados ingeridos: {new_files}")
+        for row in totals:
+            print(f"{row['Player']}: {row['Games_Played']} partidas, {row['Games_Won']} vitórias em {row['Sessions']} sessões")
+        return
+
+    #Ratings recalculados com todo o histórico de partidas
+    if args.refit_ratings:
+        rating_engine = ratings.RatingEngine()
+        num_matches = rating_engine.refit()
+        rating_engine.save()
+        print(f"Ratings recalculados com {num_matches} partidas:")
+        for player, rating in sorted(rating_engine.ratings.items(), key=lambda item: -item[1]):
+            print(f"{player}: {rating:.0f} ({rating_engine.games[player]} partidas)")
+        return
+
     print("""
 .-----------------------------------------------------------------.
 | _____      __                   ____            _           _   |
@@ -16,17 +67,66 @@ def main():
 |                                              |__/               |
 '-----------------------------------------------------------------' 
 """)
-    print(ortools.__version__, pandas.__version__, numpy.__version__)
-    
-    #Importando dados dos csv's
-    overall_df, positions_df, coefficients_df = import_data.import_all_data()
+    # Versões lidas dos metadados dos pacotes, sem importá-los (ortools e pandas são lentos para carregar)
+    print(metadata.version('ortools'), metadata.version('pandas'), metadata.version('numpy'))
     
-    #Limpando os dataframes
-    positions, conflicts, coefficients, all_players, skills, all_positions = datasets.make_dict(overall_df, positions_df, coefficients_df)
+    #Importando e limpando os dados dos csv's (snapshot em cache enquanto os csv's não mudarem)
+    metrics = session_metrics.SessionMetrics()
+    load_start = time.perf_counter()
+    (positions, conflicts, coefficients, all_players, skills, all_positions), roster_version = roster_cache.load_roster_snapshot()
+
+    #Elenco em arrays compartilhado por todos os módulos (importado aqui: carrega o numpy)
+    from data_cleaning import roster
+    session_roster = roster.Roster(positions, conflicts, coefficients, all_players, skills, all_positions, version=roster_version)
+
+    #Ratings Elo: só os logs novos ou modificados desde a última sessão são lidos
+    rating_engine = ratings.RatingEngine()
+    rating_engine.catch_up()
+    rating_engine.save()
+    if args.rating_weight > 0:
+        session_roster.shift_overalls(rating_engine.overall_shifts(session_roster, args.rating_weight))
+    metrics.record_session_phase('carregar_elenco', time.perf_counter() - load_start)
     
+    #Reprodução em lote de sessões gravadas
+    if args.replay:
+        from match_making import replay
+        summary = replay.run_batch(session_roster, args.replay, repeat=args.repeat,
+                                   formulation=args.formulation, num_pool_workers=args.workers, output_path=args.replay_output,
+                                   time_budget=args.time_budget, top_k=args.top_k, mode=args.mode)
+        latency = summary['latency']
+        print(f"Sessões reproduzidas: {summary['sessions']} ({summary['failed_sessions']} sem solução) em {summary['elapsed']:.2f}s")
+        if latency['count']:
+            print(f"Latência por partida: média {latency['mean']*1000:.1f}ms, p50 {latency['p50']*1000:.1f}ms, p95 {latency['p95']*1000:.1f}ms, máx {latency['max']*1000:.1f}ms")
+        if summary['heuristic_gaps']:
+            gaps = summary['heuristic_gaps']
+            print(f"Gap da heurística em relação ao CP-SAT: médio {sum(gaps)/len(gaps):.2f}, máximo {max(gaps):.2f} "
+                  f"({sum(1 for gap in gaps if gap <= 0)} de {len(gaps)} partidas sem perda)")
+        return
+
+    #Serviço local: elenco e motores carregados uma vez, várias sessões ao mesmo tempo
+    if args.serve:
+        import asyncio
+        from match_making import lineup_cache as lineup_cache_module
+        from match_making import service
+        cache = lineup_cache_module.LineupCache(session_roster.version) if not args.no_lineup_cache and session_roster.version is not None else None
+        lineup_service = service.LineupService(session_roster, num_engines=args.serve_engines, max_pending=args.max_pending, time_budget=args.time_budget,
+                                               formulation=args.formulation, top_k=args.top_k, lineup_cache=cache, mode=args.mode, presolve=not args.no_presolve)
+        try:
+            asyncio.run(service.serve(lineup_service, args.serve))
+        except KeyboardInterrupt:
+            print("\nServiço encerrado.")
+        finally:
+            lineup_service.close()
+        return
+
     #Match Making loop
-    final_stats = make_teams.make_teams(positions, conflicts, coefficients, all_players, skills, all_positions)
+    from match_making import make_teams
+    final_stats = make_teams.make_teams(session_roster, num_pool_workers=args.workers, num_options_displayed=args.options, formulation=args.formulation, time_budget=args.time_budget, improve_budget=args.improve, top_k=args.top_k,
+                                        num_courts=args.courts, court_strategy=args.court_strategy, plan_ahead=args.plan_ahead,
+                                        lineup_cache=not args.no_lineup_cache, mode=args.mode, metrics=metrics, ratings=rating_engine, presolve=not args.no_presolve)
     print(final_stats)
+    if args.metrics_summary:
+        print(metrics.summary())
     
     #End Message
     print("--- Thanks for playing! ---")
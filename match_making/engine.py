@@ -0,0 +1,437 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from match_making import heuristic
+from match_making import lineup_cache as lineup_cache_module
+from match_making import lineup_model
+from match_making import parallel_solver
+from match_making import team_configurations
+
+# Configurações fixas de antes da geração automática (team_configurations), mantidas para o benchmark
+DEFAULT_CONFIGURATIONS = [
+    # Configuração 1
+    [
+        {'Levantador': 1, 'Ponta': 2, 'Meio': 1, 'Libero': 1, 'Saida': 1},
+        {'Levantador': 1, 'Ponta': 2, 'Meio': 1, 'Libero': 1, 'Saida': 1}
+    ],
+    # Configuração 2
+    [
+        {'Levantador': 1, 'Ponta': 2, 'Meio': 1, 'Libero': 1, 'Saida': 1},
+        {'Levantador': 1, 'Ponta': 2, 'Meio': 2, 'Saida': 1}
+    ],
+    # Configuração 3
+    [
+        {'Levantador': 1, 'Ponta': 2, 'Meio': 2, 'Saida': 1},
+        {'Levantador': 1, 'Ponta': 2, 'Meio': 2, 'Saida': 1}
+    ]
+]
+
+
+class LineupEngine:
+    """Motor de escalação sem interação: jogadores da partida + obrigatórios -> escalações ordenadas."""
+
+    def __init__(self, roster, configurations=None, formulation='classic', num_pool_workers=1, num_solutions=10, verbose=True, top_k=False, cpsat_workers=0, lineup_cache=None, mode='exact', presolve=True):
+        self.roster = roster
+        # Sem configurações dadas, elas são geradas a partir das posições do elenco
+        self.configurations = configurations or team_configurations.generate_configurations(roster)
+        self.formulation = formulation
+        self.num_solutions = num_solutions
+        self.verbose = verbose
+        # Workers do CP-SAT no modo sequencial (0 = todos os núcleos)
+        self.cpsat_workers = cpsat_workers
+        # Opções repassadas a solve_lineups de cada modelo (também nos processos do pool)
+        self.solve_options = {'top_k': top_k, 'presolve': presolve}
+        # Escalações já calculadas (lineup_cache.LineupCache), por configuração; None desliga o cache
+        self.lineup_cache = lineup_cache
+        # 'exact' (CP-SAT), 'heuristic' (heuristic.heuristic_lineups) ou 'heuristic-then-exact' (as duas, com o gap da heurística)
+        self.mode = mode
+        self.last_heuristic_report = None
+        # Tempos e estatísticas do CP-SAT de cada configuração na última chamada de solve
+        self.last_stats = []
+
+        # Modelos CP-SAT persistentes, um por configuração, reutilizados entre partidas
+        self.lineup_models = {}
+        # Com mais de um worker, as configurações são resolvidas em paralelo
+        self.solver_pool = None
+        # Melhoria das opções em segundo plano (ver start_improvement)
+        self._background = ThreadPoolExecutor(max_workers=1)
+        self._improvement = None
+        self._cancel_improvement = threading.Event()
+        if num_pool_workers > 1:
+            self.solver_pool = parallel_solver.ConfigurationSolverPool(roster, num_pool_workers, formulation)
+
+    def _model(self, idx, positions_required_list):
+        # O modelo de cada configuração é construído uma única vez por sessão
+        if idx not in self.lineup_models:
+            self.lineup_models[idx] = lineup_model.build_lineup_model(self.formulation, self.roster, positions_required_list)
+        return self.lineup_models[idx]
+
+    def warm_up(self):
+        # Construir de antemão os modelos de todas as configurações (motores sempre prontos do serviço)
+        for idx, positions_required_list in enumerate(self.configurations):
+            self._model(idx, positions_required_list)
+
+    def solve(self, players, mandatory_players, time_budget=None, verbose=None, cancel_event=None):
+        # time_budget: tempo total (s) da partida, dividido entre as configurações.
+        # Sem orçamento, cada configuração para após num_solutions soluções (no top-k, vale o
+        # prazo lineup_model.TOP_K_TIME_BUDGET).
+        verbose = self.verbose if verbose is None else verbose
+        # Estatísticas desta chamada; só viram last_stats se a busca não foi cancelada, para que uma
+        # melhoria interrompida não sobrescreva as da busca que a substituiu
+        stats = []
+        try:
+            return self._solve(players, mandatory_players, time_budget, verbose, cancel_event, stats)
+        finally:
+            if cancel_event is None or not cancel_event.is_set():
+                self.last_stats = stats
+
+    def _solve(self, players, mandatory_players, time_budget, verbose, cancel_event, stats):
+        config_indices = self.feasible_configurations(players, mandatory_players, verbose, stats)
+        if self.mode == 'exact':
+            return self._rank(self._solve_exact(players, mandatory_players, time_budget, verbose, cancel_event, config_indices, stats), verbose)
+
+        # Heurística: resposta em milissegundos, sem garantia de ótimo
+        start = time.perf_counter()
+        heuristic_results = [
+            (idx, heuristic.heuristic_lineups(self.roster, self.configurations[idx], players, mandatory_players, self.num_solutions))
+            for idx in config_indices
+        ]
+        heuristic_time = time.perf_counter() - start
+        stats += [{'configuration': idx + 1, 'source': 'heuristic', 'solve_time': heuristic_time / max(len(config_indices), 1),
+                             'num_solutions': len(solutions_data)} for idx, solutions_data in heuristic_results]
+        heuristic_solutions = self._rank(heuristic_results, verbose and self.mode == 'heuristic')
+        self.last_heuristic_report = {'time': heuristic_time, 'heuristic_best': None, 'exact_best': None, 'gap': None}
+        if heuristic_solutions:
+            self.last_heuristic_report['heuristic_best'] = heuristic_solutions[0][1]['overall_difference']
+        if self.mode == 'heuristic':
+            return heuristic_solutions
+
+        # heuristic-then-exact: o CP-SAT dá a resposta final e mede quanto a heurística ficou do melhor encontrado
+        exact_solutions = self._rank(self._solve_exact(players, mandatory_players, time_budget, verbose, cancel_event, config_indices, stats), verbose)
+        if heuristic_solutions and exact_solutions:
+            report = self.last_heuristic_report
+            report['exact_best'] = exact_solutions[0][1]['overall_difference']
+            report['gap'] = report['heuristic_best'] - report['exact_best']
+            if verbose:
+                scale_factor = self.roster.scale_factor
+                print(f"\nHeurística: diferença {report['heuristic_best']/scale_factor:.2f} em {heuristic_time*1000:.1f}ms; "
+                      f"CP-SAT ({exact_solutions[0][1]['solver_status']}): {report['exact_best']/scale_factor:.2f}; "
+                      f"gap da heurística: {report['gap']/scale_factor:.2f}")
+        # Se o CP-SAT não encontrar nada no prazo, ficam as escalações da heurística
+        return exact_solutions or heuristic_solutions
+
+    def feasible_configurations(self, players, mandatory_players, verbose=False, stats=None):
+        # Índices das configurações que os jogadores da partida conseguem preencher, das mais
+        # promissoras às menos; as demais são descartadas antes de construir ou resolver o modelo
+        config_indices = team_configurations.rank_configurations(self.configurations, players, mandatory_players,
+                                                                 self.roster.positions, self.roster.primary_positions)
+        for idx in range(len(self.configurations)):
+            if idx in config_indices:
+                continue
+            if verbose:
+                print(f"\nOpção {idx + 1} descartada: não há como preencher as posições com os jogadores presentes e obrigatórios.")
+            if stats is not None:
+                stats.append({'configuration': idx + 1, 'source': 'pruned', 'num_solutions': 0})
+        return config_indices
+
+    def _solve_exact(self, players, mandatory_players, time_budget, verbose, cancel_event=None, config_indices=None, stats=None):
+        # Resultados do CP-SAT (e do cache) por configuração: [(índice da configuração, soluções)]
+        stats = [] if stats is None else stats
+        solve_options = dict(self.solve_options)
+        if time_budget is None and solve_options['top_k']:
+            # O top-k sem orçamento também tem prazo por partida, dividido entre as configurações
+            time_budget = lineup_model.TOP_K_TIME_BUDGET
+        # Configurações já resolvidas para estes jogadores saem do cache; só as demais vão ao solver
+        results = []
+        config_indices = list(range(len(self.configurations))) if config_indices is None else config_indices
+        cache_keys = {}
+        if self.lineup_cache is not None:
+            # O modo de busca entra na chave: as primeiras N soluções (sem prazo) não servem a quem pede as melhores no prazo
+            key_options = {'formulation': self.formulation, 'num_solutions': self.num_solutions, 'top_k': solve_options['top_k'],
+                           'search': 'first-n' if time_budget is None else 'keep-best'}
+            candidates, config_indices = config_indices, []
+            for idx in candidates:
+                positions_required_list = self.configurations[idx]
+                cache_keys[idx] = lineup_cache_module.lineup_key(players, mandatory_players, positions_required_list, key_options)
+                cached = self.lineup_cache.get(cache_keys[idx])
+                if cached is None:
+                    config_indices.append(idx)
+                else:
+                    if verbose:
+                        print(f"\nSoluções da Opção {idx + 1} recuperadas do cache.")
+                    results.append((idx, cached))
+                    stats.append({'configuration': idx + 1, 'source': 'cache', 'num_solutions': len(cached)})
+
+        if self.solver_pool is not None:
+            # Modo paralelo: cada configuração vai para um processo do pool e todas correm ao mesmo tempo,
+            # então cada uma recebe o orçamento inteiro de tempo de parede
+            if verbose:
+                for idx in config_indices:
+                    print(f"\nGerando soluções para a Opção {idx + 1}...")
+            pool_results = self.solver_pool.solve_all([self.configurations[idx] for idx in config_indices], players, mandatory_players, num_solutions=self.num_solutions,
+                                                      verbose=verbose, time_limit=time_budget, solve_options=solve_options, cancel_event=cancel_event)
+            solved = ((config_indices[position], solutions_data, solve_stats) for position, solutions_data, solve_stats in pool_results)
+        else:
+            solved = self._solve_sequential(players, mandatory_players, time_budget, verbose, cancel_event, solve_options, config_indices)
+
+        for idx, solutions_data, solve_stats in solved:
+            if cancel_event is not None and cancel_event.is_set():
+                # Busca cancelada: o resultado será descartado, nada vai para o cache
+                break
+            results.append((idx, solutions_data))
+            stats.append(dict(solve_stats, configuration=idx + 1, source='cp-sat'))
+            # Só entram no cache buscas completas: com prazo ou no top-k (rodadas com limite de tempo), provadas ótimas
+            complete = True
+            if time_budget is not None or solve_options['top_k']:
+                complete = complete and bool(solutions_data) and all(solution['solver_status'] == 'OPTIMAL' for solution in solutions_data)
+            if self.lineup_cache is not None and complete:
+                self.lineup_cache.put(cache_keys[idx], solutions_data)
+        return results
+
+    def _rank(self, results, verbose):
+        all_solutions = []
+        for idx, solutions_data in sorted(results, key=lambda result: result[0]):
+            if solutions_data:
+                for solution in solutions_data:
+                    all_solutions.append((idx + 1, solution))
+            elif verbose:
+                print(f"Não foi possível gerar soluções para a Opção {idx + 1}.")
+
+        # Ordenar as soluções por menor diferença de overall (e pela configuração, em caso de empate)
+        all_solutions.sort(key=lambda x: (x[1]['overall_difference'], x[0]))
+        return all_solutions
+
+    def _solve_sequential(self, players, mandatory_players, time_budget, verbose, cancel_event=None, solve_options=None, config_indices=None):
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        config_indices = list(range(len(self.configurations))) if config_indices is None else config_indices
+        for position, idx in enumerate(config_indices):
+            positions_required_list = self.configurations[idx]
+            if verbose:
+                print(f"\nGerando soluções para a Opção {idx + 1}...")
+            # Cada configuração recebe uma fatia igual do tempo restante; sobras passam para as próximas
+            time_limit = None
+            if deadline is not None:
+                time_limit = (deadline - time.perf_counter()) / (len(config_indices) - position)
+            built = idx not in self.lineup_models
+            model = self._model(idx, positions_required_list)
+            build_time = model.build_time if built else 0.0
+            if cancel_event is not None and cancel_event.is_set():
+                yield idx, [], {'status': 'CANCELLED', 'build_time': build_time}
+                continue
+            solutions_data = model.solve_lineups(players, num_solutions=self.num_solutions, mandatory_players=mandatory_players,
+                                                 num_workers=self.cpsat_workers, verbose=verbose, time_limit=time_limit, **(solve_options or self.solve_options))
+            yield idx, solutions_data, dict(model.last_solve_stats, build_time=build_time)
+
+    def start_improvement(self, players, mandatory_players, time_budget):
+        # Refinar as opções em segundo plano enquanto o organizador lê as atuais
+        self.cancel_improvement()
+        self._cancel_improvement.clear()
+        self._improvement = self._background.submit(self.solve, players, mandatory_players, time_budget, False, self._cancel_improvement)
+        return self._improvement
+
+    def improvement_ready(self):
+        return self._improvement is not None and self._improvement.done()
+
+    def improved_solutions(self):
+        # Resultado da melhoria em segundo plano, ou None se ainda não terminou ou foi cancelada
+        if not self.improvement_ready() or self._cancel_improvement.is_set():
+            return None
+        return self._improvement.result()
+
+    def cancel_improvement(self):
+        # Parar a busca em segundo plano antes de reutilizar os modelos
+        if self._improvement is None:
+            return
+        self._cancel_improvement.set()
+        self._improvement.cancel()
+        # Esperar a thread terminar, repetindo o pedido de parada (a busca pode ainda não ter começado);
+        # no pool, a thread para de esperar pelos processos assim que vê o cancelamento
+        while not self._improvement.done():
+            self.stop_search()
+            wait([self._improvement], timeout=0.05)
+        self._improvement = None
+
+    def stop_search(self):
+        # Pedir a parada das buscas em andamento nos modelos desta thread (não alcança o pool)
+        for model in self.lineup_models.values():
+            model.stop()
+
+    def close(self):
+        self.cancel_improvement()
+        self._background.shutdown(wait=True)
+        if self.lineup_cache is not None:
+            self.lineup_cache.save()
+        if self.solver_pool is not None:
+            self.solver_pool.shutdown()
+            self.solver_pool = None
+
+
+def solve_with_stats(lineup_engine, *args, **kwargs):
+    # Soluções e estatísticas da mesma chamada de solve (buscas feitas em outra thread)
+    solutions = lineup_engine.solve(*args, **kwargs)
+    return solutions, list(lineup_engine.last_stats)
+
+
+class Speculation:
+    """Pré-solução da próxima partida em segundo plano, enquanto a atual é jogada.
+
+    Os jogadores da próxima partida já são conhecidos quando a escalação é escolhida
+    (o banco não depende do vencedor), então a busca começa nesse momento. O resultado
+    só é aproveitado se a partida pedida tiver os mesmos jogadores e obrigatórios; se
+    alguém chegar, a pré-solução é cancelada e pode ser refeita com os novos dados.
+    """
+
+    def __init__(self, lineup_engine):
+        self.lineup_engine = lineup_engine
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+        self._key = None
+        self._cancelled = threading.Event()
+        # Estatísticas da pré-solução usada por último em result
+        self.last_stats = []
+
+    def start(self, players, mandatory_players, time_budget=None):
+        self.cancel()
+        self._cancelled.clear()
+        self._key = (tuple(players), tuple(mandatory_players))
+        self._future = self._executor.submit(solve_with_stats, self.lineup_engine, players, mandatory_players, time_budget,
+                                             False, self._cancelled)
+        return self._future
+
+    def result(self, players, mandatory_players):
+        # Soluções pré-calculadas para estes jogadores (esperando a busca terminar, se preciso),
+        # ou None se a pré-solução foi feita para outra partida
+        if self._future is None or self._key != (tuple(players), tuple(mandatory_players)):
+            self.cancel()
+            return None
+        solutions, self.last_stats = self._future.result()
+        self._future = None
+        return solutions
+
+    def cancel(self):
+        # Interromper a busca antes de reutilizar os modelos (no pool, ela termina pelo próprio limite)
+        if self._future is None:
+            return
+        self._cancelled.set()
+        self._future.cancel()
+        while not self._future.done():
+            self.lineup_engine.stop_search()
+            wait([self._future], timeout=0.05)
+        self._future = None
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=True)
+
+
+class MatchSession:
+    """Estado de uma sessão de jogos: presentes, rodízio do banco e estatísticas."""
+
+    def __init__(self, all_players, present_players, priority_count=12):
+        self.all_players = all_players
+        # Priorizar os primeiros 12 jogadores (12 por quadra no modo de várias quadras)
+        self.priority_players = present_players[:priority_count]
+        self.all_present_players = self.priority_players + present_players[priority_count:]
+        self.new_players_arrived = []
+        self.match_number = 1
+        self.left_out_players = []
+        self.assigned_players = []
+
+        # Inicializar as estatísticas dos jogadores
+        self.player_stats = {player: {'Games_Played': 0, 'Games_Won': 0} for player in all_players}
+        # Inicializar partidas consecutivas jogadas
+        self.consecutive_matches_played = {player: 0 for player in all_players}
+        self.chosen_solution = None
+
+    def next_match(self):
+        # Devolve (jogadores da partida, obrigatórios, jogadores no banco)
+        players, mandatory_players, players_to_bench = self.peek_next_match()
+        if self.match_number > 1:
+            self.new_players_arrived = []
+        return players, mandatory_players, players_to_bench
+
+    def peek_next_match(self, match_number=None):
+        # Mesmo resultado de next_match, sem alterar a sessão; match_number permite olhar a partida
+        # seguinte antes de advance (o banco não depende do vencedor)
+        match_number = self.match_number if match_number is None else match_number
+        if match_number == 1:
+            # Na primeira partida, os jogadores prioritários são obrigatórios
+            mandatory_players = self.priority_players
+            players_to_bench = []
+        else:
+            # Nas partidas subsequentes, jogadores que ficaram de fora são obrigatórios
+            mandatory_players = self.left_out_players + self.new_players_arrived
+            # Determinar jogadores que irão para o banco
+            num_players_to_bench = len(self.left_out_players)
+            # Excluir jogadores obrigatórios da consideração
+            eligible_players_for_benching = [player for player in self.assigned_players if player not in mandatory_players]
+            # Ordenar jogadores elegíveis por partidas consecutivas jogadas (ordem decrescente)
+            eligible_players_for_benching.sort(key=lambda x: self.consecutive_matches_played[x], reverse=True)
+            # Selecionar jogadores para o banco
+            players_to_bench = eligible_players_for_benching[:num_players_to_bench]
+
+        # Jogadores restantes são aqueles não em mandatory_players ou players_to_bench
+        remaining_players = [player for player in self.all_present_players if player not in mandatory_players and player not in players_to_bench]
+
+        # Preparar a lista de jogadores para esta partida
+        players = mandatory_players + remaining_players
+        return players, mandatory_players, players_to_bench
+
+    def choose(self, solution_data):
+        # Utilizar a solução escolhida para prosseguir
+        self.chosen_solution = solution_data
+        self.assigned_players = solution_data['assigned_players']
+        self.left_out_players = solution_data['left_out_players']
+
+        # Atualizar estatísticas dos jogadores
+        for player in self.assigned_players:
+            self.player_stats[player]['Games_Played'] += 1
+            self.consecutive_matches_played[player] += 1  # Incrementar partidas consecutivas jogadas
+        for player in self.left_out_players:
+            self.consecutive_matches_played[player] = 0  # Reiniciar partidas consecutivas jogadas
+
+    def record_winner(self, winning_team):
+        # winning_team começa em 1, como no prompt
+        winning_players = self.chosen_solution['teams'][winning_team - 1]
+        for player in winning_players:
+            self.player_stats[player]['Games_Won'] += 1
+        return winning_players
+
+    def remove_players(self, players_list):
+        # Retirar da lista de presentes quem foi embora; devolve as mensagens para o usuário
+        messages = []
+        for player in players_list:
+            if player not in self.all_present_players:
+                messages.append(f"Jogador '{player}' não está na lista de jogadores presentes.")
+                continue
+            self.all_present_players.remove(player)
+            for group in (self.priority_players, self.new_players_arrived, self.left_out_players, self.assigned_players):
+                if player in group:
+                    group.remove(player)
+            messages.append(f"Jogador '{player}' removido da lista de jogadores presentes.")
+        return messages
+
+    def add_players(self, new_players_list):
+        # Adicionar novos jogadores à lista de jogadores presentes; devolve as mensagens para o usuário
+        messages = []
+        for player in new_players_list:
+            if player not in self.all_players:
+                messages.append(f"Jogador '{player}' não encontrado nos dados. Certifique-se de que o nome está correto.")
+            elif player in self.all_present_players:
+                messages.append(f"Jogador '{player}' já está na lista de jogadores presentes.")
+            else:
+                self.all_present_players.append(player)
+                self.new_players_arrived.append(player)
+                messages.append(f"Jogador '{player}' adicionado à lista de jogadores presentes.")
+        return messages
+
+    def advance(self):
+        self.match_number += 1
+
+    def session_stats(self):
+        # Estatísticas dos jogadores que já jogaram na sessão
+        return [
+            {'Player': player, 'Games_Played': stats['Games_Played'], 'Games_Won': stats['Games_Won']}
+            for player, stats in self.player_stats.items()
+            if stats['Games_Played'] > 0
+        ]
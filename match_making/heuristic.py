@@ -0,0 +1,216 @@
+import random
+import numpy as np
+from match_making import solutions
+from match_making import team_configurations
+
+# Limite de rodadas da busca local em cada reinício
+MAX_LOCAL_SEARCH_ROUNDS = 200
+
+
+class _LineupState:
+    """Escalação em construção: time e posição de cada jogador, overall dos times e conflitos.
+
+    Os jogadores são os índices na lista da partida (overall, conflict e primary são
+    indexados por eles). Conflitos dentro dos times e jogadores na posição primária são
+    contados a cada movimento, para a pontuação não percorrer a escalação inteira.
+    """
+
+    def __init__(self, overall, conflict, primary, num_teams):
+        self.overall = overall
+        self.conflict = conflict
+        self.primary = primary
+        self.team_of = {}
+        self.pos_of = {}
+        self.members = [set() for _ in range(num_teams)]
+        self.totals = [0] * num_teams
+        self.violations = 0
+        self.primary_count = 0
+
+    def place(self, player, team, pos):
+        self.violations += self.conflicts_in(player, team)
+        self.primary_count += self.primary[player] == pos
+        self.team_of[player] = team
+        self.pos_of[player] = pos
+        self.members[team].add(player)
+        self.totals[team] += self.overall[player]
+
+    def remove(self, player):
+        team = self.team_of.pop(player)
+        pos = self.pos_of.pop(player)
+        self.members[team].discard(player)
+        self.totals[team] -= self.overall[player]
+        self.violations -= self.conflicts_in(player, team)
+        self.primary_count -= self.primary[player] == pos
+
+    def conflicts_in(self, player, team):
+        return len(self.members[team] & self.conflict[player])
+
+    def score(self):
+        # Mesma ordem de prioridade do modelo: conflitos, depois diferença de overall, depois posições primárias
+        return (self.violations, max(self.totals) - min(self.totals), -self.primary_count)
+
+
+def _split_teams(state, assigned, positions_required_list, conflicts_first=True):
+    # Divisão gulosa: cada jogador vai para o time mais fraco com vaga na sua posição, evitando
+    # times com jogadores em conflito com ele, do mais forte ao mais fraco. Com conflicts_first,
+    # quem tem conflitos vem antes, em busca em largura a partir do que tem mais conflitos (os
+    # desafetos entram logo depois, no outro time)
+    open_slots = [dict(positions_required) for positions_required in positions_required_list]
+    order = []
+    queued = set()
+    for start in [] if not conflicts_first else sorted(assigned, key=lambda player: -len(state.conflict[player] & assigned.keys())):
+        if start in queued or not state.conflict[start] & assigned.keys():
+            continue
+        queue = [start]
+        queued.add(start)
+        while queue:
+            player = queue.pop(0)
+            order.append(player)
+            for other in sorted(state.conflict[player] & assigned.keys()):
+                if other not in queued:
+                    queued.add(other)
+                    queue.append(other)
+    order += sorted((player for player in assigned if player not in queued), key=lambda player: -state.overall[player])
+    for player in order:
+        pos = assigned[player]
+        teams = [team for team in range(len(open_slots)) if open_slots[team].get(pos, 0) > 0]
+        team = min(teams, key=lambda team: (state.conflicts_in(player, team) > 0, state.totals[team]))
+        open_slots[team][pos] -= 1
+        state.place(player, team, pos)
+
+
+def _local_search(state, bench, eligible, mandatory_set):
+    # Busca local com a primeira melhora: trocar dois jogadores de times diferentes (cada um
+    # assume a vaga do outro), trocar as posições de dois jogadores do mesmo time, ou
+    # substituir um jogador não obrigatório por alguém de fora que jogue na mesma posição
+    score = state.score()
+    for _ in range(MAX_LOCAL_SEARCH_ROUNDS):
+        improved = False
+        playing = list(state.team_of)
+        for i, player in enumerate(playing):
+            for other in playing[i + 1:]:
+                team, pos = state.team_of[player], state.pos_of[player]
+                other_team, other_pos = state.team_of[other], state.pos_of[other]
+                if (team == other_team and pos == other_pos) or pos not in eligible[other] or other_pos not in eligible[player]:
+                    continue
+                state.remove(player)
+                state.remove(other)
+                state.place(player, other_team, other_pos)
+                state.place(other, team, pos)
+                new_score = state.score()
+                if new_score < score:
+                    score, improved = new_score, True
+                    break
+                state.remove(player)
+                state.remove(other)
+                state.place(player, team, pos)
+                state.place(other, other_team, other_pos)
+            if improved:
+                break
+        if not improved:
+            for player in playing:
+                if player in mandatory_set:
+                    continue
+                team, pos = state.team_of[player], state.pos_of[player]
+                for substitute in bench:
+                    if pos not in eligible[substitute]:
+                        continue
+                    state.remove(player)
+                    state.place(substitute, team, pos)
+                    new_score = state.score()
+                    if new_score < score:
+                        bench[bench.index(substitute)] = player
+                        score, improved = new_score, True
+                        break
+                    state.remove(substitute)
+                    state.place(player, team, pos)
+                if improved:
+                    break
+        if not improved:
+            return score
+    return score
+
+
+def heuristic_lineups(roster, positions_required_list, players, mandatory_players=None, num_solutions=10, num_restarts=None, seed=42):
+    """Escalações sem CP-SAT: seleção por posição, divisão gulosa equilibrada e busca local por trocas.
+
+    Respeita as cotas de posição, os obrigatórios e os conflitos (escalações que ainda violam
+    algum conflito são descartadas). Cada reinício embaralha a ordem dos candidatos, e as
+    escalações distintas encontradas são devolvidas como em form_teams (LazySolution), ordenadas
+    pela diferença de overall e com solver_status 'HEURISTIC'; [] se nenhuma for viável.
+    """
+    players = [player for player in players if player in roster]
+    num_teams = len(positions_required_list)
+    need = team_configurations.position_slots(positions_required_list)
+    if len(players) < sum(need.values()):
+        return []
+
+    # A busca trabalha com os índices dos jogadores na partida, recortados dos arrays do elenco pelos ids
+    ids = roster.ids(players)
+    local_players = range(len(players))
+    required = set(mandatory_players or [])
+    mandatory_set = {local for local in local_players if players[local] in required}
+    overall = roster.primary_overalls[ids].tolist()
+    conflict = [set(np.flatnonzero(row).tolist()) for row in roster.conflict_matrix[np.ix_(ids, ids)]]
+    primary = [roster.position_names[pos_id] for pos_id in roster.primary_position_ids[ids]]
+    # Posições de cada jogador exigidas na configuração, a primária primeiro
+    eligible = [[pos for pos in roster.positions[player] if pos in need] for player in players]
+
+    rng = random.Random(seed)
+    num_restarts = num_restarts or 3 * num_solutions
+    found = {}
+    for restart in range(num_restarts):
+        mandatory = [local for local in local_players if local in mandatory_set]
+        optional = [local for local in local_players if local not in mandatory_set]
+        if restart > 0:
+            rng.shuffle(mandatory)
+            rng.shuffle(optional)
+        prefs = eligible
+        if restart > 0:
+            # Nos reinícios, as posições secundárias também são tentadas em outra ordem
+            prefs = [positions[:1] + rng.sample(positions[1:], len(positions[1:])) for positions in eligible]
+        assigned = team_configurations.assign_positions(mandatory + optional, prefs, need, mandatory_set)
+        if assigned is None:
+            if restart == 0:
+                return []
+            continue
+        state = _LineupState(overall, conflict, primary, num_teams)
+        # Os reinícios alternam entre separar primeiro os jogadores em conflito e só equilibrar a força
+        _split_teams(state, assigned, positions_required_list, conflicts_first=restart % 2 == 0)
+        bench = [local for local in local_players if local not in state.team_of]
+        score = _local_search(state, bench, eligible, mandatory_set)
+        if score[0] > 0:
+            continue
+        key = _lineup_key(state, positions_required_list)
+        if key not in found or score < found[key][0]:
+            found[key] = (score, dict(state.team_of), dict(state.pos_of), list(state.totals))
+
+    ranked = sorted(found.values(), key=lambda item: item[0])[:num_solutions]
+    if not ranked:
+        return []
+    position_names = sorted(need)
+    position_index = {pos: idx for idx, pos in enumerate(position_names)}
+    team_of = np.full((len(ranked), len(players)), -1, dtype=np.int64)
+    position_of = np.full((len(ranked), len(players)), -1, dtype=np.int64)
+    for row, (_, teams, positions, _) in enumerate(ranked):
+        for local, team in teams.items():
+            team_of[row, local] = team
+            position_of[row, local] = position_index[positions[local]]
+    team_overalls = np.array([totals for *_, totals in ranked], dtype=np.int64)
+    overall_difference = team_overalls.max(axis=1) - team_overalls.min(axis=1)
+    solution_set = solutions.SolutionSet(
+        players, position_names, team_of, position_of, team_overalls, overall_difference,
+        [sum(positions_required.values()) for positions_required in positions_required_list], positions_required_list,
+        roster.primary_positions, roster.primary_overall, roster.adjusted_overall, roster.scale_factor,
+        optimality_gap=None, solver_status='HEURISTIC',
+    )
+    return solution_set.solutions()
+
+
+def _lineup_key(state, positions_required_list):
+    # Escalações iguais a menos da ordem de times de mesma composição têm a mesma chave
+    teams = {}
+    for team, positions_required in enumerate(positions_required_list):
+        lineup = tuple(sorted((player, state.pos_of[player]) for player in state.members[team]))
+        teams.setdefault(tuple(sorted(positions_required.items())), []).append(lineup)
+    return tuple(sorted((template, tuple(sorted(lineups))) for template, lineups in teams.items()))
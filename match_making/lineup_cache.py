@@ -0,0 +1,79 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from match_making import parallel_solver
+
+CACHE_PATH = 'match_history/lineup_cache.pkl'
+MAX_ENTRIES = 256
+
+
+def lineup_key(players, mandatory_players, positions_required_list, solve_options):
+    # Hash canônico de um problema: a ordem dos jogadores não muda as escalações possíveis
+    payload = repr((
+        sorted(players),
+        sorted(mandatory_players or []),
+        parallel_solver.configuration_key(positions_required_list),
+        sorted(solve_options.items()),
+    ))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LineupCache:
+    """Escalações já calculadas, por problema (lineup_key), com descarte LRU e gravação em disco.
+
+    O arquivo guarda a versão do snapshot do elenco (roster_cache): se algum CSV mudou,
+    as escalações antigas são descartadas ao carregar.
+    """
+
+    def __init__(self, roster_version, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.roster_version = roster_version
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        # As quadras do modo de várias quadras consultam o mesmo cache em threads diferentes
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                cache = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return
+        if cache.get('roster_version') == self.roster_version:
+            self.entries = cache['entries']
+
+    def get(self, key):
+        # Soluções guardadas (marcadas como as mais recentes), ou None
+        with self._lock:
+            solutions = self.entries.get(key)
+            if solutions is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return solutions
+
+    def put(self, key, solutions):
+        with self._lock:
+            self.entries[key] = list(solutions)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        # Gravar num arquivo temporário e renomear, como o snapshot do elenco
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'roster_version': self.roster_version, 'entries': self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
@@ -0,0 +1,628 @@
+import math
+import time
+import numpy as np
+from ortools.sat.python import cp_model
+from match_making import presolve as presolve_module
+from match_making import solutions
+
+# Top-k sem time_limit: prazo total (s) da partida, dividido entre as configurações (LineupEngine) e
+# entre as rodadas, como o --time-budget. Em todo caso a rodada para de provar o ótimo no gap absoluto
+# TOP_K_ABSOLUTE_GAP, em unidades do objetivo (overall escalado menos posições primárias): 10 é 0,01
+# de overall com SCALE_FACTOR = 1000, abaixo da precisão exibida. O gap que sobra é informado.
+TOP_K_TIME_BUDGET = 3.0
+TOP_K_ABSOLUTE_GAP = 10
+
+
+class BaseLineupModel:
+    """Modelo CP-SAT de uma configuração, construído uma vez por sessão.
+
+    O modelo cobre todo o elenco da sessão. A cada partida apenas os literais de
+    controle (disponível / obrigatório) de cada jogador são fixados, de modo que
+    jogadores no banco, obrigatórios e recém-chegados não exigem reconstrução.
+    As subclasses definem a formulação em _build.
+    """
+
+    def __init__(self, roster, positions_required_list):
+        self.positions_required_list = positions_required_list
+        self.num_teams = len(positions_required_list)
+        self.team_sizes = [sum(positions_required.values()) for positions_required in positions_required_list]
+        # Com dois times de mesma composição, cada escalação aparece duas vezes (times trocados)
+        self.identical_templates = self.num_teams == 2 and positions_required_list[0] == positions_required_list[1]
+        self.scale_factor = roster.scale_factor
+
+        # Elenco compartilhado (data_cleaning.roster.Roster), com os overalls já calculados
+        self.roster = roster
+        self.positions_subset = roster.positions
+        self.conflicts_subset = roster.conflicts
+        self.primary_positions = roster.primary_positions
+        self.primary_overall = roster.primary_overall
+        self.adjusted_overall = roster.adjusted_overall
+        # Tempos e estatísticas da última chamada de form_teams
+        self.last_solve_stats = {}
+        self._active_solver = None
+        # Índices das variáveis fixadas pelo pré-processamento da última partida (liberadas na seguinte)
+        self._presolve_fixed = []
+
+        start = time.perf_counter()
+        self._build()
+        # Tempo de construção do modelo (uma vez por sessão)
+        self.build_time = time.perf_counter() - start
+
+    def _build(self):
+        raise NotImplementedError
+
+    def _add_control_literals(self, model):
+        # Literais de controle fixados a cada partida
+        self.available = {}
+        self.mandatory = {}
+        for player in self.roster.players:
+            self.available[player] = model.NewBoolVar(f'available_{player}')
+            self.mandatory[player] = model.NewBoolVar(f'mandatory_{player}')
+            model.AddImplication(self.mandatory[player], self.available[player])
+
+    def _add_spread(self, model, overall_difference, team_overall, max_overall):
+        # Dois times: valor absoluto da diferença. Mais times (várias quadras): maior menos menor overall
+        if self.num_teams == 2:
+            model.AddAbsEquality(overall_difference, team_overall[0] - team_overall[1])
+            return
+        highest = model.NewIntVar(0, max_overall, 'highest_team_overall')
+        lowest = model.NewIntVar(0, max_overall, 'lowest_team_overall')
+        model.AddMaxEquality(highest, list(team_overall.values()))
+        model.AddMinEquality(lowest, list(team_overall.values()))
+        model.Add(overall_difference == highest - lowest)
+
+    def _break_team_symmetry(self, model, team_membership):
+        # Quebra de simetria para dois times de mesma composição: o primeiro jogador escalado
+        # (na ordem do elenco) fica no time 0, o que descarta a metade espelhada da busca sem
+        # mudar o ótimo. team_membership[(jogador, time)] é 1 se o jogador está no time.
+        if not self.identical_templates:
+            return
+        seen_team0 = None  # Algum jogador anterior já está no time 0
+        for player in self.roster.players:
+            in_team0 = team_membership[(player, 0)]
+            in_team1 = team_membership[(player, 1)]
+            if seen_team0 is None:
+                model.Add(in_team1 == 0)
+                seen_team0 = in_team0
+                continue
+            model.Add(in_team1 <= seen_team0)
+            next_seen = model.NewBoolVar(f'seen_team0_{player}')
+            model.AddMaxEquality(next_seen, [seen_team0, in_team0])
+            seen_team0 = next_seen
+
+    def _index_lineup(self, lineup_vars):
+        # Índices das variáveis jogador × time × posição, para decodificar as soluções por arrays.
+        # Combinações inexistentes apontam para -1, a coluna sempre zero da matriz de soluções.
+        players = self.roster.players
+        self.position_names = sorted({pos for player in players for pos in self.positions_subset[player]})
+        position_ids = {pos: idx for idx, pos in enumerate(self.position_names)}
+        self.lineup_index = np.full((len(players), self.num_teams, len(self.position_names)), -1, dtype=np.intp)
+        # Literais que indicam a presença de cada jogador em cada time (usados nos cortes do top-k)
+        self.lineup_vars = lineup_vars
+        self.membership_vars = {}
+        for (player, team, pos), var in lineup_vars.items():
+            self.lineup_index[self.roster.index[player], team, position_ids[pos]] = var.Index()
+            self.membership_vars.setdefault((player, team), []).append(var)
+        # Overall de cada jogador em cada posição do modelo (primário na posição primária, ajustado nas
+        # demais), a partir dos vetores do elenco; posições fora da calibração nunca são a primária
+        roster_position_ids = np.array([self.roster.position_index.get(pos, -1) for pos in self.position_names], dtype=np.intp)
+        is_primary = self.roster.primary_position_ids[:, None] == roster_position_ids[None, :]
+        self.overall_matrix = np.where(is_primary, self.roster.primary_overalls[:, None], self.roster.adjusted_overalls[:, None])
+
+    def num_variables(self):
+        return len(self.model.Proto().variables)
+
+    def _fix_literal(self, literal, value):
+        # Fixar o domínio do literal diretamente no proto, sem recriar o modelo
+        domain = self.model.Proto().variables[literal.Index()].domain
+        domain.clear()
+        domain.extend([value, value])
+
+    def _set_match(self, players, mandatory_players):
+        present = set(players)
+        required = set(mandatory_players or [])
+        for player in self.roster.players:
+            self._fix_literal(self.available[player], int(player in present))
+            self._fix_literal(self.mandatory[player], int(player in present and player in required))
+
+    def _presolve_candidates(self, positions, teams):
+        # (variável, ainda pode valer 1) das famílias de variáveis de cada jogador da partida
+        for (player, team, pos), var in self.lineup_vars.items():
+            if player in positions:
+                yield var, pos in positions[player] and team in teams[player]
+
+    def _release_presolve(self):
+        # Devolver o domínio {0, 1} às variáveis fixadas na partida anterior
+        proto_variables = self.model.Proto().variables
+        for index in self._presolve_fixed:
+            domain = proto_variables[index].domain
+            domain.clear()
+            domain.extend([0, 1])
+        self._presolve_fixed = []
+
+    def _apply_presolve(self, players, mandatory_players, verbose):
+        # Fixar no proto o que o pré-processamento deduziu; devolve False se a partida for inviável
+        reduction = presolve_module.presolve_match(players, mandatory_players, self.positions_required_list, self.positions_subset, self.conflicts_subset,
+                                                   self.roster.players if self.identical_templates else None)
+        if not reduction['feasible']:
+            if verbose:
+                print("Pré-processamento: não há como preencher as posições respeitando obrigatórios e conflitos.")
+            return False
+        for player in reduction['eliminated']:
+            self._fix_literal(self.available[player], 0)
+        for player in reduction['forced_players']:
+            self._fix_literal(self.mandatory[player], 1)
+        num_candidates = 0
+        for var, allowed in self._presolve_candidates(reduction['positions'], reduction['teams']):
+            num_candidates += 1
+            if not allowed:
+                self._fix_literal(var, 0)
+                self._presolve_fixed.append(var.Index())
+        self.last_solve_stats.update({
+            'presolve_fixed_variables': len(self._presolve_fixed), 'presolve_candidate_variables': num_candidates,
+            'presolve_eliminated': len(reduction['eliminated']), 'presolve_forced_players': len(reduction['forced_players']),
+            'presolve_removed_positions': reduction['removed_positions'], 'presolve_forced_teams': reduction['forced_teams'],
+        })
+        if verbose:
+            print(f"Pré-processamento: {len(self._presolve_fixed)} de {num_candidates} variáveis dos jogadores presentes fixadas "
+                  f"({reduction['removed_positions']} posições descartadas, {len(reduction['forced_players'])} jogadores forçados, "
+                  f"{reduction['forced_teams']} times forçados, {len(reduction['eliminated'])} jogadores dominados).")
+        return True
+
+    def check_feasibility(self, players, verbose=True):
+        total_players_required = sum(self.team_sizes)
+        if len(players) < total_players_required:
+            if verbose:
+                print(f"Não há jogadores suficientes para formar {self.num_teams} times com as posições requeridas. São necessários {total_players_required} jogadores.")
+            return False
+
+        # Verificar se há jogadores suficientes para cada posição em todos os times
+        total_positions_required = {}
+        for positions_required in self.positions_required_list:
+            for pos, required in positions_required.items():
+                total_positions_required[pos] = total_positions_required.get(pos, 0) + required
+
+        for pos, total_required in total_positions_required.items():
+            players_who_can_play = [player for player in players if pos in self.positions_subset[player]]
+            if len(players_who_can_play) < total_required:
+                if verbose:
+                    print(f"Não há jogadores suficientes que possam jogar na posição '{pos}'. Necessário: {total_required}, disponível: {len(players_who_can_play)}")
+                return False
+        return True
+
+    def _new_solver(self, num_workers, time_limit, absolute_gap=None):
+        # Criar o solver
+        solver = cp_model.CpSolver()
+        # Opcional: Definir semente aleatória para reprodutibilidade
+        solver.parameters.random_seed = 42
+        # 0 deixa o CP-SAT usar todos os núcleos; o pool paralelo divide os núcleos entre processos
+        solver.parameters.num_workers = num_workers
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = max(time_limit, 0.01)
+        if absolute_gap is not None:
+            solver.parameters.absolute_gap_limit = absolute_gap
+        return solver
+
+    def _prepare_match(self, players, mandatory_players, verbose, presolve=True):
+        # Considerar apenas os jogadores presentes que fazem parte do modelo
+        start = time.perf_counter()
+        players = [player for player in players if player in self.positions_subset]
+        self.last_solve_stats = {'status': 'NOT_SOLVED', 'prepare_time': 0.0, 'solve_time': 0.0, 'extraction_time': 0.0, 'num_solutions': 0,
+                                 'objective': None, 'best_bound': None, 'num_branches': 0, 'num_conflicts': 0, 'wall_time': 0.0}
+        if not self.check_feasibility(players, verbose):
+            return None
+        self._set_match(players, mandatory_players)
+        self._release_presolve()
+        if presolve and not self._apply_presolve(players, mandatory_players, verbose):
+            self.last_solve_stats['status'] = 'INFEASIBLE'
+            self.last_solve_stats['prepare_time'] = time.perf_counter() - start
+            return None
+        self.last_solve_stats['prepare_time'] = time.perf_counter() - start
+        return players
+
+    def _record_search_stats(self, solver):
+        # Estatísticas do CP-SAT, somadas entre as rodadas do top-k
+        self.last_solve_stats['num_branches'] += solver.NumBranches()
+        self.last_solve_stats['num_conflicts'] += solver.NumConflicts()
+        self.last_solve_stats['wall_time'] += solver.WallTime()
+
+    def solve_lineups(self, players, num_solutions=10, mandatory_players=None, num_workers=0, verbose=True, time_limit=None, top_k=False, presolve=True):
+        # Ponto de entrada usado pelo motor e pelo pool: escolhe a estratégia de busca
+        if top_k:
+            return self.top_k_lineups(players, k=num_solutions, mandatory_players=mandatory_players, num_workers=num_workers, verbose=verbose, time_limit=time_limit, presolve=presolve)
+        return self.form_teams(players, num_solutions=num_solutions, mandatory_players=mandatory_players, num_workers=num_workers, verbose=verbose, time_limit=time_limit, presolve=presolve)
+
+    def form_teams(self, players, num_solutions=10, mandatory_players=None, num_workers=0, verbose=True, time_limit=None, presolve=True):
+        # Sem time_limit, para após num_solutions soluções (comportamento original).
+        # Com time_limit, busca até o prazo (ou até provar o ótimo) e devolve as melhores soluções.
+        players = self._prepare_match(players, mandatory_players, verbose, presolve)
+        if players is None:
+            return []
+
+        solver = self._new_solver(num_workers, time_limit)
+
+        # Resolver e coletar soluções
+        collector = solutions.MatrixSolutionCollector(self.num_variables(), num_solutions, keep_best=time_limit is not None)
+        self._active_solver = solver
+        start = time.perf_counter()
+        status = solver.Solve(self.model, collector)
+        self._active_solver = None
+        self.last_solve_stats['solve_time'] = time.perf_counter() - start
+        self.last_solve_stats['status'] = solver.StatusName(status)
+        self.last_solve_stats['num_solutions'] = collector.solution_count()
+        self._record_search_stats(solver)
+
+        if collector.solution_count() == 0:
+            return []
+
+        self.last_solve_stats['objective'] = solver.ObjectiveValue()
+        self.last_solve_stats['best_bound'] = solver.BestObjectiveBound()
+        start = time.perf_counter()
+        solution_set = self._solution_set(players, collector.solution_matrix())
+        solution_set.optimality_gap = int(round(solver.ObjectiveValue() - solver.BestObjectiveBound()))
+        solution_set.solver_status = solver.StatusName(status)
+        solutions_data = solution_set.solutions()
+        self.last_solve_stats['extraction_time'] = time.perf_counter() - start
+        return solutions_data
+
+    def top_k_lineups(self, players, k=10, mandatory_players=None, num_workers=0, verbose=True, time_limit=None, presolve=True):
+        # As k divisões de times com menor objetivo que diferem entre si em pelo menos um jogador.
+        # Cada rodada resolve e adiciona um corte (no-good) que proíbe a divisão encontrada. Os cortes
+        # só removem escalações, então o limite inferior provado numa rodada vale para as seguintes:
+        # ele entra no modelo, e a rodada termina assim que uma escalação empata com ele.
+        players = self._prepare_match(players, mandatory_players, verbose, presolve)
+        if players is None:
+            return []
+
+        # Cortes e limites valem apenas para esta partida: vão para uma cópia do modelo persistente,
+        # feita uma vez e mantida entre as rodadas
+        start = time.perf_counter()
+        found, objectives, statuses, max_gap, last_status = self._top_k_rounds(self.model.Clone(), players, k, num_workers, time_limit)
+
+        self.last_solve_stats['solve_time'] = time.perf_counter() - start
+        self.last_solve_stats['num_solutions'] = len(found)
+        if not found:
+            self.last_solve_stats['status'] = last_status
+            return []
+        # Com o gap absoluto o CP-SAT também devolve OPTIMAL: só é ótimo se nenhuma rodada deixou gap
+        self.last_solve_stats['status'] = 'OPTIMAL' if max_gap == 0 and all(status == 'OPTIMAL' for status in statuses) else 'FEASIBLE'
+        self.last_solve_stats['optimality_gap'] = max_gap
+
+        start = time.perf_counter()
+        # Uma rodada parada no gap pode achar escalação pior que a da rodada seguinte: ordenar pelo objetivo
+        order = np.argsort(objectives, kind='stable')
+        solution_set = self._solution_set(players, np.vstack(found)[order])
+        solution_set.optimality_gap = max_gap
+        solution_set.solver_status = self.last_solve_stats['status']
+        solutions_data = solution_set.solutions()
+        self.last_solve_stats['extraction_time'] = time.perf_counter() - start
+        return solutions_data
+
+    def _top_k_rounds(self, model, players, k, num_workers, time_limit):
+        num_variables = self.num_variables()
+        rows = self.roster.ids(players)
+        mirror_cuts = self.identical_templates
+        deadline = time.perf_counter() + (TOP_K_TIME_BUDGET if time_limit is None else time_limit)
+        found = []
+        objectives = []
+        statuses = []
+        last_status = 'NOT_SOLVED'
+        max_gap = 0
+        lower_bound = None
+        # Soluções intermediárias das rodadas (divisão -> (objetivo, valores)): a melhor que ainda não
+        # foi cortada vira a dica da rodada seguinte, que começa com um incumbente em vez de do zero
+        candidates = {}
+        cut_keys = set()
+        for round_idx in range(k):
+            # Parte igual do tempo que resta; o que uma rodada não usa fica para as seguintes
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            round_limit = remaining / (k - round_idx)
+            if candidates:
+                self._hint_incumbent(model, min(candidates.values(), key=lambda candidate: candidate[0])[1])
+            solver = self._new_solver(num_workers, round_limit, TOP_K_ABSOLUTE_GAP)
+            collector = solutions.MatrixSolutionCollector(num_variables, k, keep_best=True)
+            self._active_solver = solver
+            status = solver.Solve(model, collector)
+            self._active_solver = None
+            self._record_search_stats(solver)
+            last_status = solver.StatusName(status)
+            if collector.solution_count() == 0:
+                break
+            values = collector.solution_matrix()[-1]
+            found.append(values)
+            objectives.append(solver.ObjectiveValue())
+            statuses.append(last_status)
+            max_gap = max(max_gap, int(round(solver.ObjectiveValue() - solver.BestObjectiveBound())))
+            if round_idx == 0:
+                self.last_solve_stats['objective'] = solver.ObjectiveValue()
+                self.last_solve_stats['best_bound'] = solver.BestObjectiveBound()
+
+            # Corte: pelo menos um jogador muda de time (ou sai) em relação à divisão encontrada
+            membership = values[self.lineup_index[rows]].any(axis=2)
+            chosen = [(players[player_idx], team) for player_idx, team in zip(*np.nonzero(membership))]
+            model.Add(sum(var for key in chosen for var in self.membership_vars[key]) <= len(chosen) - 1)
+            cut_keys.add(membership.tobytes())
+            if mirror_cuts:
+                # Com times idênticos, a divisão espelhada é a mesma escalação
+                mirrored = [(player, 1 - team) for player, team in chosen]
+                model.Add(sum(var for key in mirrored for var in self.membership_vars[key]) <= len(mirrored) - 1)
+                cut_keys.add(np.ascontiguousarray(membership[:, ::-1]).tobytes())
+
+            # Limite inferior provado (o objetivo é inteiro), mantido para as rodadas seguintes
+            round_bound = math.ceil(solver.BestObjectiveBound() - 1e-6)
+            if lower_bound is None or round_bound > lower_bound:
+                lower_bound = round_bound
+                model.Add(self.objective >= lower_bound)
+
+            for row, objective in zip(collector.solution_matrix(), self._objective_values(model, collector.solution_matrix())):
+                key = row[self.lineup_index[rows]].any(axis=2).tobytes()
+                if key not in candidates or objective < candidates[key][0]:
+                    candidates[key] = (objective, row)
+            for key in cut_keys:
+                candidates.pop(key, None)
+        return found, objectives, statuses, max_gap, last_status
+
+    def _objective_values(self, model, values):
+        # Objetivo de cada linha da matriz de soluções, a partir do objetivo linear do proto
+        objective = model.Proto().objective
+        return values[:, list(objective.vars)] @ np.array(objective.coeffs, dtype=np.int64) + objective.offset
+
+    def _hint_incumbent(self, model, values):
+        # Dica completa (todas as variáveis) com uma solução já conhecida, que satisfaz os cortes
+        model.ClearHints()
+        hint = model.Proto().solution_hint
+        hint.vars.extend(range(self.num_variables()))
+        hint.values.extend(values[:self.num_variables()].tolist())
+
+    def stop(self):
+        # Interromper a busca em andamento (chamado de outra thread)
+        solver = self._active_solver
+        if solver is not None:
+            solver.stop_search()
+
+    def _solution_set(self, players, values):
+        # Jogadores da partida recortados pelos ids; os dicionários por nome do elenco vão inteiros
+        rows = self.roster.ids(players)
+        team_of, position_of, team_overalls, overall_difference = solutions.decode_solutions(
+            values, self.lineup_index[rows], self.overall_difference.Index(), self.overall_matrix[rows])
+        return solutions.SolutionSet(
+            players, self.position_names, team_of, position_of, team_overalls, overall_difference,
+            self.team_sizes, self.positions_required_list,
+            self.primary_positions, self.primary_overall, self.adjusted_overall, self.scale_factor,
+        )
+
+
+class LineupModel(BaseLineupModel):
+    """Formulação original: assign, position_vars, assign_pos, plays_primary e plays_not_primary."""
+
+    def _build(self):
+        players = self.roster.players
+        num_teams = self.num_teams
+        positions_subset = self.positions_subset
+        primary_overall = self.primary_overall
+        adjusted_overall = self.adjusted_overall
+        model = cp_model.CpModel()
+
+        self._add_control_literals(model)
+        available = self.available
+        mandatory = self.mandatory
+
+        # Inicializar variáveis
+        assign = {}
+        for player in players:
+            for team in range(num_teams):
+                assign[(player, team)] = model.NewBoolVar(f'assign_{player}_team{team}')
+
+        position_vars = {}
+        for player in players:
+            for pos in positions_subset[player]:
+                position_vars[(player, pos)] = model.NewBoolVar(f'position_{player}_{pos}')
+
+        # Criar variáveis auxiliares para atribuições combinadas
+        assign_pos = {}
+        for player in players:
+            for team in range(num_teams):
+                for pos in positions_subset[player]:
+                    assign_pos[(player, team, pos)] = model.NewBoolVar(f'assign_{player}_team{team}_pos{pos}')
+                    # assign_pos == 1 se e somente se assign[player, team] == 1 e position_vars[player, pos] == 1
+                    model.AddBoolAnd([assign[(player, team)], position_vars[(player, pos)]]).OnlyEnforceIf(assign_pos[(player, team, pos)])
+                    model.AddBoolOr([assign[(player, team)].Not(), position_vars[(player, pos)].Not()]).OnlyEnforceIf(assign_pos[(player, team, pos)].Not())
+
+        # Variáveis indicando se um jogador joga em sua posição primária ou não
+        primary_positions = self.primary_positions
+        plays_primary = {}
+        plays_not_primary = {}
+
+        for player in players:
+            primary_pos = primary_positions[player]
+            for team in range(num_teams):
+                plays_primary[(player, team)] = model.NewBoolVar(f'plays_primary_{player}_team{team}')
+                plays_not_primary[(player, team)] = model.NewBoolVar(f'plays_not_primary_{player}_team{team}')
+
+                # plays_primary[player, team] == assign[player, team] AND position_vars[player, primary_pos]
+                model.AddBoolAnd([assign[(player, team)], position_vars[(player, primary_pos)]]).OnlyEnforceIf(plays_primary[(player, team)])
+                model.AddBoolOr([assign[(player, team)].Not(), position_vars[(player, primary_pos)].Not()]).OnlyEnforceIf(plays_primary[(player, team)].Not())
+
+                # plays_not_primary[player, team] == assign[player, team] AND NOT position_vars[player, primary_pos]
+                model.AddBoolAnd([assign[(player, team)], position_vars[(player, primary_pos)].Not()]).OnlyEnforceIf(plays_not_primary[(player, team)])
+                model.AddBoolOr([assign[(player, team)].Not(), position_vars[(player, primary_pos)]]).OnlyEnforceIf(plays_not_primary[(player, team)].Not())
+
+        # Variáveis de overall do time
+        max_overall = sum(primary_overall.values())  # Máximo possível de overall do time
+        team_overall = {}
+        for team in range(num_teams):
+            team_overall[team] = model.NewIntVar(0, max_overall, f'team_overall_{team}')
+
+        # Diferença nos overalls dos times
+        max_overall_difference = max_overall  # Máxima diferença possível
+        overall_difference = model.NewIntVar(0, max_overall_difference, 'overall_difference')
+
+        # Definir a diferença entre os overalls dos times (valor absoluto quando são dois)
+        self._add_spread(model, overall_difference, team_overall, max_overall)
+
+        # Restrições
+        # Cada jogador é atribuído a no máximo um time, e apenas se estiver disponível
+        for player in players:
+            model.Add(sum(assign[(player, team)] for team in range(num_teams)) <= available[player])
+
+        # Jogadores obrigatórios devem ser atribuídos a um time
+        for player in players:
+            model.Add(sum(assign[(player, team)] for team in range(num_teams)) == 1).OnlyEnforceIf(mandatory[player])
+
+        # Jogadores em conflito estão em times diferentes
+        for player in players:
+            for conflict_player in self.conflicts_subset[player]:
+                if conflict_player in positions_subset:
+                    for team in range(num_teams):
+                        model.Add(assign[(player, team)] + assign[(conflict_player, team)] <= 1)
+
+        # Cada time tem o número requerido de jogadores
+        for team in range(num_teams):
+            model.Add(sum(assign[(player, team)] for player in players) == self.team_sizes[team])
+
+        # Times de mesma composição: descartar as escalações espelhadas
+        self._break_team_symmetry(model, assign)
+
+        # Cada jogador é atribuído a no máximo uma posição que pode jogar
+        for player in players:
+            model.Add(sum(position_vars[(player, pos)] for pos in positions_subset[player]) <= 1)
+
+        # Vincular atribuição de jogador à atribuição de posição
+        for player in players:
+            model.Add(sum(assign[(player, team)] for team in range(num_teams)) == sum(position_vars[(player, pos)] for pos in positions_subset[player]))
+
+        # Cada posição em um time é preenchida pelo número requerido de jogadores
+        for team in range(num_teams):
+            positions_required = self.positions_required_list[team]
+            for pos, required_number in positions_required.items():
+                model.Add(sum(assign_pos[(player, team, pos)] for player in players if pos in positions_subset[player]) == required_number)
+
+        # Calcular overalls dos times com overalls ajustados
+        for team in range(num_teams):
+            total_overall = []
+            for player in players:
+                # Contribuição do jogador para o overall do time
+                primary_contrib = primary_overall[player] * plays_primary[(player, team)]
+                adjusted_contrib = adjusted_overall[player] * plays_not_primary[(player, team)]
+                total_overall.append(primary_contrib + adjusted_contrib)
+            model.Add(team_overall[team] == sum(total_overall))
+
+        # Objetivo
+        # Primeiro, minimizar a diferença total de overalls
+        # Segundo, maximizar o número de jogadores em suas posições primárias (opcional)
+        weight_primary_positions = 1  # Peso para o número de posições primárias
+        self.objective = overall_difference - weight_primary_positions * sum(plays_primary[(player, team)] for player in players for team in range(num_teams))
+        model.Minimize(self.objective)
+
+        self.model = model
+        self.assign = assign
+        self.position_vars = position_vars
+        self.assign_pos = assign_pos
+        self.plays_primary = plays_primary
+        self.plays_not_primary = plays_not_primary
+        self.team_overall = team_overall
+        self.overall_difference = overall_difference
+
+        self._index_lineup(assign_pos)
+
+    def _presolve_candidates(self, positions, teams):
+        # Na formulação original, também as famílias por jogador × time e jogador × posição
+        yield from super()._presolve_candidates(positions, teams)
+        for (player, team), var in self.assign.items():
+            if player in positions:
+                yield var, team in teams[player]
+        for (player, pos), var in self.position_vars.items():
+            if player in positions:
+                yield var, pos in positions[player]
+        for (player, team), var in self.plays_primary.items():
+            if player in positions:
+                yield var, team in teams[player] and self.primary_positions[player] in positions[player]
+        for (player, team), var in self.plays_not_primary.items():
+            if player in positions:
+                yield var, team in teams[player] and any(pos != self.primary_positions[player] for pos in positions[player])
+
+
+class CompactLineupModel(BaseLineupModel):
+    """Formulação enxuta com uma única família de literais x[jogador, time, posição].
+
+    Overall do time, número de jogadores na posição primária e cotas de posição
+    são somas lineares sobre x. Só são criados literais para posições que o time
+    realmente exige na configuração.
+    """
+
+    def _build(self):
+        players = self.roster.players
+        num_teams = self.num_teams
+        model = cp_model.CpModel()
+        self._add_control_literals(model)
+
+        # x[jogador, time, posição] == 1 se o jogador joga naquela posição naquele time
+        x = {}
+        for player in players:
+            for team in range(num_teams):
+                for pos in self.positions_subset[player]:
+                    if pos in self.positions_required_list[team]:
+                        x[(player, team, pos)] = model.NewBoolVar(f'x_{player}_team{team}_pos{pos}')
+        player_vars = {player: [] for player in players}
+        team_player_vars = {}
+        for (player, team, pos), var in x.items():
+            player_vars[player].append(var)
+            team_player_vars.setdefault((player, team), []).append(var)
+
+        # Cada jogador ocupa no máximo uma vaga, e apenas se estiver disponível
+        for player in players:
+            model.Add(sum(player_vars[player]) <= self.available[player])
+            # Jogadores obrigatórios devem ocupar uma vaga
+            model.Add(sum(player_vars[player]) == 1).OnlyEnforceIf(self.mandatory[player])
+
+        # Jogadores em conflito estão em times diferentes
+        for player in players:
+            for conflict_player in self.conflicts_subset[player]:
+                if conflict_player in self.positions_subset:
+                    for team in range(num_teams):
+                        model.Add(sum(team_player_vars.get((player, team), [])) + sum(team_player_vars.get((conflict_player, team), [])) <= 1)
+
+        # Times de mesma composição: descartar as escalações espelhadas
+        self._break_team_symmetry(model, {(player, team): sum(team_player_vars.get((player, team), [])) for player in players for team in range(num_teams)})
+
+        # Cada posição em um time é preenchida pelo número requerido de jogadores (o tamanho do time segue das cotas)
+        for team in range(num_teams):
+            for pos, required_number in self.positions_required_list[team].items():
+                model.Add(sum(x[(player, team, pos)] for player in players if (player, team, pos) in x) == required_number)
+
+        # Overall dos times como soma linear sobre x
+        max_overall = sum(self.primary_overall.values())
+        team_overall = {}
+        for team in range(num_teams):
+            team_overall[team] = model.NewIntVar(0, max_overall, f'team_overall_{team}')
+            model.Add(team_overall[team] == sum(
+                (self.primary_overall[player] if pos == self.primary_positions[player] else self.adjusted_overall[player]) * var
+                for (player, var_team, pos), var in x.items() if var_team == team))
+
+        overall_difference = model.NewIntVar(0, max_overall, 'overall_difference')
+        self._add_spread(model, overall_difference, team_overall, max_overall)
+
+        # Mesmo objetivo da formulação original
+        weight_primary_positions = 1
+        plays_primary = [var for (player, team, pos), var in x.items() if pos == self.primary_positions[player]]
+        self.objective = overall_difference - weight_primary_positions * sum(plays_primary)
+        model.Minimize(self.objective)
+
+        self.model = model
+        self.x = x
+        self.team_overall = team_overall
+        self.overall_difference = overall_difference
+        self._index_lineup(x)
+
+
+FORMULATIONS = {
+    'classic': LineupModel,
+    'compact': CompactLineupModel,
+}
+
+
+def build_lineup_model(formulation, roster, positions_required_list):
+    # Escolher a formulação do modelo pelo nome
+    return FORMULATIONS[formulation](roster, positions_required_list)
@@ -1,10 +1,66 @@
-import pandas as pd
-import numpy as np
-from ortools.sat.python import cp_model
+import importlib
 import os
 import datetime
+import threading
+from data_output import match_log
+from data_output import session_metrics
+
+def print_solutions(all_solutions):
+    print("\nAs melhores formações de times encontradas (ordenadas pela menor diferença de overall):")
+    # Situação da busca uma vez por configuração: o gap é o da melhor solução da configuração
+    # em relação ao limite provado pelo CP-SAT, e não o de cada opção
+    configurations = {}
+    for config_number, solution_data in all_solutions:
+        configurations.setdefault(config_number, solution_data)
+    for config_number, solution_data in sorted(configurations.items()):
+        gap_text = ""
+        if solution_data['optimality_gap'] is not None:
+            gap_text = f", Gap de Otimalidade: {solution_data['optimality_gap']/solution_data['scale_factor']:.3f}"
+        elif any(gap is not None for gap in solution_data.get('court_gaps', [])):
+            # Várias quadras: o gap de cada quadra, que não cobre o equilíbrio entre elas
+            gap_text = ", Gap de Otimalidade por quadra: " + " / ".join(
+                "-" if gap is None else f"{gap/solution_data['scale_factor']:.3f}" for gap in solution_data['court_gaps'])
+        print(f"Configuração {config_number}: {solution_data['solver_status']}{gap_text}")
+    for idx, (config_number, solution_data) in enumerate(all_solutions):
+        print(f"\nOpção {idx + 1} (Configuração {config_number}), Diferença de Overall Total: {solution_data['overall_difference']/solution_data['scale_factor']:.2f}")
+        teams = solution_data['teams']
+        team_positions = solution_data['team_positions']
+        team_overalls_result = solution_data['team_overalls_result']
+        assigned_players = solution_data['assigned_players']
+        left_out_players = solution_data['left_out_players']
+        team_sizes = solution_data['team_sizes']
+        primary_positions = solution_data['primary_positions']
+        primary_overall = solution_data['primary_overall']
+        adjusted_overall = solution_data['adjusted_overall']
+        scale_factor = solution_data['scale_factor']
+        positions_required_list = solution_data['positions_required_list']
+
+        for team in range(len(positions_required_list)):
+            team_total_overall = team_overalls_result[team] / scale_factor
+            team_average_overall = team_total_overall / team_sizes[team]
+            court_text = f", Quadra {team // 2 + 1}" if len(positions_required_list) > 2 else ""
+            print(f"\n  Time {team + 1}{court_text} (Overall Médio: {team_average_overall:.2f}, Overall Total: {team_total_overall:.2f}):")
+            print("    Jogadores:", teams[team])
+            print("    Posições:")
+            positions_required = positions_required_list[team]
+            for pos in positions_required.keys():
+                players_in_position = team_positions[team].get(pos, [])
+                for player in players_in_position:
+                    if primary_positions[player] == pos:
+                        player_overall = primary_overall[player] / scale_factor
+                        flag = '(Posição Primária)'
+                    else:
+                        player_overall = adjusted_overall[player] / scale_factor
+                        flag = '(Overall Ajustado)'
+                    print(f"      {pos}: {player} {flag}, Overall: {player_overall:.2f}")
+        if left_out_players:
+            print("    Jogadores não escalados:", left_out_players)
+        else:
+            print("    Todos os jogadores foram escalados.")
+
 
-def make_teams(positions, conflicts, coefficients, all_players, skills, all_positions):
+def make_teams(roster, num_pool_workers=1, num_options_displayed=None, formulation='classic', time_budget=None, improve_budget=None, top_k=False,
+               num_courts=1, court_strategy='partition', plan_ahead=None, lineup_cache=True, mode='exact', metrics=None, ratings=None, presolve=True):
     # Criar o diretório para guardar o log dos arquivos
     if not os.path.exists('match_history'):
         os.makedirs('match_history')
@@ -12,416 +68,143 @@ def make_teams(positions, conflicts, coefficients, all_players, skills, all_posi
     session_filename = f"sessao_jogo_{start_time}.csv"
     session_filepath = f"match_history/{session_filename}"
 
-    # Iniciar o dataframe da sessão de jogo    
-    session_df = pd.DataFrame(columns=['Player', 'Games_Played', 'Games_Won'])
-    session_df.to_csv(session_filepath, index=False)
+    # Log de partidas da sessão: uma linha por partida, acrescentada ao fim de cada jogo.
+    # O CSV com os totais da sessão é gravado uma única vez, no final.
+    session_log = match_log.MatchLog(f"match_history/partidas_{start_time}.jsonl")
+    # Tempos por fase e estatísticas do CP-SAT de cada partida, ao lado do log de partidas
+    metrics = metrics or session_metrics.SessionMetrics()
+    metrics.open(f"match_history/metricas_{start_time}.jsonl")
     
-    # Inicializar as estatísticas dos jogadores
-    player_stats = {player: {'Games_Played': 0, 'Games_Won': 0} for player in all_players}
-
-    # Inicializar partidas consecutivas jogadas
-    consecutive_matches_played = {player: 0 for player in all_players}
+    # Carregar o solver (ortools, numpy) em segundo plano enquanto o organizador digita os nomes
+    preload_modules = ['match_making.multi_court'] + (['match_making.rotation'] if plan_ahead else [])
+    preload = threading.Thread(target=lambda: [importlib.import_module(module) for module in preload_modules], daemon=True)
+    preload.start()
 
     # Entrada dos nomes de todos os jogadores presentes (apenas uma vez)
     input_players_string = input("Digite os nomes de todos os jogadores presentes, separados por vírgulas:\n")
     input_players_list = [name.strip() for name in input_players_string.split(',')]
-    # Priorizar os primeiros 12 jogadores
-    priority_players = input_players_list[:12]
-    remaining_players = input_players_list[12:]
-    all_present_players = priority_players + remaining_players
-    new_players_arrived = []
+    preload.join()
+    from match_making import engine
+    from match_making import multi_court
+    from match_making import lineup_cache as lineup_cache_module
+    # Escalações já calculadas em sessões anteriores, válidas enquanto os CSVs do elenco não mudarem
+    cache = lineup_cache_module.LineupCache(roster.version) if lineup_cache and roster.version is not None else None
+    # Com várias quadras, os 12 primeiros de cada quadra têm prioridade na primeira partida
+    session = engine.MatchSession(roster.players, input_players_list, priority_count=12 * num_courts)
+    if num_courts > 1:
+        # Sem pool de processos, top-k e melhoria em segundo plano: as quadras já são resolvidas em paralelo
+        lineup_engine = multi_court.MultiCourtEngine(roster, num_courts, formulation=formulation, strategy=court_strategy, lineup_cache=cache, mode=mode, presolve=presolve)
+        improve_budget = None
+    else:
+        lineup_engine = engine.LineupEngine(roster, formulation=formulation, num_pool_workers=num_pool_workers, top_k=top_k, lineup_cache=cache, mode=mode, presolve=presolve)
+    configurations = lineup_engine.configurations
+    planner = None
+    if plan_ahead:
+        # As escalações planejadas são resolvidas numa thread própria, que passa a ser a única a usar o motor:
+        # sem melhoria em segundo plano
+        from match_making import rotation
+        planner = rotation.RotationPlanner(lineup_engine, horizon=plan_ahead, slots=12 * num_courts, time_budget=time_budget)
+        improve_budget = None
+    # Sem o rodízio planejado (que já calcula as partidas de antemão), a próxima partida é
+    # pré-resolvida em segundo plano enquanto a atual é jogada
+    speculation = engine.Speculation(lineup_engine) if planner is None else None
+    refresh_hint = ", ou 'r' para reexibir as opções melhoradas" if improve_budget else ""
 
-    # Loop Principal
-    match_number = 1
-    left_out_players = []
-    
     # Loop principal do programa
     while True:
-        print(f"\n--- Partida {match_number} ---")
-
-        if match_number == 1:
-            # Na primeira partida, os primeiros 12 jogadores são obrigatórios
-            mandatory_players = priority_players
-            players_to_bench = []
+        print(f"\n--- Partida {session.match_number} ---")
+
+        if planner is not None:
+            with metrics.phase('resolver'):
+                players, mandatory_players, players_to_bench, all_solutions, ready = planner.next_match(session)
+            solve_stats, source = planner.last_stats, 'rodizio_planejado' if ready else 'rodizio_aguardado'
+            if session.match_number > 1 or players_to_bench:
+                print(f"Jogadores que irão para o banco pelo rodízio planejado: {players_to_bench}")
+            if ready:
+                print("Escalações desta partida já calculadas de antemão.")
         else:
-            # Nas partidas subsequentes, jogadores que ficaram de fora são obrigatórios
-            mandatory_players = left_out_players + new_players_arrived
-            new_players_arrived = []
-            # Determinar jogadores que irão para o banco
-            num_players_to_bench = len(left_out_players)
-            # Excluir jogadores obrigatórios da consideração
-            eligible_players_for_benching = [player for player in assigned_players if player not in mandatory_players]
-            # Ordenar jogadores elegíveis por partidas consecutivas jogadas (ordem decrescente)
-            eligible_players_for_benching.sort(key=lambda x: consecutive_matches_played[x], reverse=True)
-            # Selecionar jogadores para o banco
-            players_to_bench = eligible_players_for_benching[:num_players_to_bench]
-            print(f"Jogadores que irão para o banco com base em partidas consecutivas jogadas: {players_to_bench}")
-
-        # Jogadores restantes são aqueles não em mandatory_players ou players_to_bench
-        remaining_players = [player for player in all_present_players if player not in mandatory_players and player not in players_to_bench]
-
-        # Preparar a lista de jogadores para esta partida
-        players = mandatory_players + remaining_players
-        skills_subset = {player: skills[player] for player in players if player in skills}
-        positions_subset = {player: positions[player] for player in players if player in positions}
-        conflicts_subset = {player: conflicts[player] for player in players if player in conflicts}
-
-        # Função para tentar formar times com os requisitos de posição dados
-        def form_teams(positions_required_list, num_solutions=10, mandatory_players=None):
-            num_teams = len(positions_required_list)
-            team_sizes = [sum(positions_required.values()) for positions_required in positions_required_list]
-            total_players_required = sum(team_sizes)
-
-            if len(players) < total_players_required:
-                print(f"Não há jogadores suficientes para formar {num_teams} times com as posições requeridas. São necessários {total_players_required} jogadores.")
-                return []
-            else:
-                # Verificar se há jogadores suficientes para cada posição em todos os times
-                total_positions_required = {}
-                for positions_required in positions_required_list:
-                    for pos, required in positions_required.items():
-                        total_positions_required[pos] = total_positions_required.get(pos, 0) + required
-
-                for pos, total_required in total_positions_required.items():
-                    players_who_can_play = [player for player in players if pos in positions_subset[player]]
-                    if len(players_who_can_play) < total_required:
-                        print(f"Não há jogadores suficientes que possam jogar na posição '{pos}'. Necessário: {total_required}, disponível: {len(players_who_can_play)}")
-                        return []
-
-                # Calcular o overall primário e ajustado dos jogadores
-                scale_factor = 1000  # Fator de escala para lidar com variáveis inteiras
-
-                primary_overall = {}
-                adjusted_overall = {}
-                for player in players:
-                    skills_values = skills_subset[player]  # Dicionário de habilidades do jogador
-                    primary_position = positions_subset[player][0]
-                    position_coeffs = coefficients[primary_position]
-
-                    numerator = 0
-                    denominator = 0
-                    for skill_name in ['Saque', 'Recepcao', 'Levantamento', 'Ataque', 'Bloqueio', 'Defesa']:
-                        skill_value = skills_values[skill_name]
-                        coeff = position_coeffs[skill_name]
-                        numerator += skill_value * coeff
-                        denominator += coeff
-                    overall = numerator / denominator
-                    overall_int = int(overall * scale_factor)  # Escalar para inteiro
-                    primary_overall[player] = overall_int
-                    adjusted_overall[player] = int(overall * 1 * scale_factor)  # Overall ajustado (sem penalização)
-
-                # Variáveis para armazenar as soluções
-                solutions = []
-                model = cp_model.CpModel()
-
-                # Inicializar variáveis
-                assign = {}
-                for player in players:
-                    for team in range(num_teams):
-                        assign[(player, team)] = model.NewBoolVar(f'assign_{player}_team{team}')
-
-                position_vars = {}
-                for player in players:
-                    for pos in positions_subset[player]:
-                        position_vars[(player, pos)] = model.NewBoolVar(f'position_{player}_{pos}')
-
-                # Criar variáveis auxiliares para atribuições combinadas
-                assign_pos = {}
-                for player in players:
-                    for team in range(num_teams):
-                        for pos in positions_subset[player]:
-                            assign_pos[(player, team, pos)] = model.NewBoolVar(f'assign_{player}_team{team}_pos{pos}')
-                            # assign_pos == 1 se e somente se assign[player, team] == 1 e position_vars[player, pos] == 1
-                            model.AddBoolAnd([assign[(player, team)], position_vars[(player, pos)]]).OnlyEnforceIf(assign_pos[(player, team, pos)])
-                            model.AddBoolOr([assign[(player, team)].Not(), position_vars[(player, pos)].Not()]).OnlyEnforceIf(assign_pos[(player, team, pos)].Not())
-
-                # Variáveis indicando se um jogador joga em sua posição primária ou não
-                primary_positions = {player: positions_subset[player][0] for player in players}
-                plays_primary = {}
-                plays_not_primary = {}
-
-                for player in players:
-                    primary_pos = primary_positions[player]
-                    for team in range(num_teams):
-                        plays_primary[(player, team)] = model.NewBoolVar(f'plays_primary_{player}_team{team}')
-                        plays_not_primary[(player, team)] = model.NewBoolVar(f'plays_not_primary_{player}_team{team}')
-
-                        # plays_primary[player, team] == assign[player, team] AND position_vars[player, primary_pos]
-                        model.AddBoolAnd([assign[(player, team)], position_vars[(player, primary_pos)]]).OnlyEnforceIf(plays_primary[(player, team)])
-                        model.AddBoolOr([assign[(player, team)].Not(), position_vars[(player, primary_pos)].Not()]).OnlyEnforceIf(plays_primary[(player, team)].Not())
-
-                        # plays_not_primary[player, team] == assign[player, team] AND NOT position_vars[player, primary_pos]
-                        model.AddBoolAnd([assign[(player, team)], position_vars[(player, primary_pos)].Not()]).OnlyEnforceIf(plays_not_primary[(player, team)])
-                        model.AddBoolOr([assign[(player, team)].Not(), position_vars[(player, primary_pos)] ]).OnlyEnforceIf(plays_not_primary[(player, team)].Not())
-
-                # Variáveis de overall do time
-                max_overall = sum(primary_overall.values())  # Máximo possível de overall do time
-                team_overall = {}
-                for team in range(num_teams):
-                    team_overall[team] = model.NewIntVar(0, max_overall, f'team_overall_{team}')
-
-                # Diferença nos overalls dos times
-                max_overall_difference = max_overall  # Máxima diferença possível
-                overall_difference = model.NewIntVar(0, max_overall_difference, 'overall_difference')
-
-                # Definir a diferença como o valor absoluto da diferença entre os overalls dos times
-                model.Add(overall_difference == abs(team_overall[0] - team_overall[1]))
-
-                # Restrições
-                # Cada jogador é atribuído a no máximo um time
-                for player in players:
-                    model.Add(sum(assign[(player, team)] for team in range(num_teams)) <= 1)
-
-                # Jogadores obrigatórios devem ser atribuídos a um time
-                if mandatory_players:
-                    for player in mandatory_players:
-                        if player in players:
-                            model.Add(sum(assign[(player, team)] for team in range(num_teams)) == 1)
-
-                # Jogadores em conflito estão em times diferentes
-                for player in players:
-                    for conflict_player in conflicts_subset[player]:
-                        if conflict_player in players:
-                            for team in range(num_teams):
-                                model.Add(assign[(player, team)] + assign[(conflict_player, team)] <= 1)
-
-                # Cada time tem o número requerido de jogadores
-                for team in range(num_teams):
-                    model.Add(sum(assign[(player, team)] for player in players) == team_sizes[team])
-
-                # Cada jogador é atribuído a no máximo uma posição que pode jogar
-                for player in players:
-                    model.Add(sum(position_vars[(player, pos)] for pos in positions_subset[player]) <= 1)
-
-                # Vincular atribuição de jogador à atribuição de posição
-                for player in players:
-                    model.Add(sum(assign[(player, team)] for team in range(num_teams)) == sum(position_vars[(player, pos)] for pos in positions_subset[player]))
-
-                # Cada posição em um time é preenchida pelo número requerido de jogadores
-                for team in range(num_teams):
-                    positions_required = positions_required_list[team]
-                    for pos, required_number in positions_required.items():
-                        model.Add(sum(assign_pos[(player, team, pos)] for player in players if pos in positions_subset[player]) == required_number)
-
-                # Calcular overalls dos times com overalls ajustados
-                for team in range(num_teams):
-                    total_overall = []
-                    for player in players:
-                        # Contribuição do jogador para o overall do time
-                        primary_contrib = primary_overall[player] * plays_primary[(player, team)]
-                        adjusted_contrib = adjusted_overall[player] * plays_not_primary[(player, team)]
-                        total_overall.append(primary_contrib + adjusted_contrib)
-                    model.Add(team_overall[team] == sum(total_overall))
-
-                # Objetivo
-                # Primeiro, minimizar a diferença total de overalls
-                # Segundo, maximizar o número de jogadores em suas posições primárias (opcional)
-                weight_primary_positions = 1  # Peso para o número de posições primárias
-                model.Minimize(overall_difference - weight_primary_positions * sum(plays_primary[(player, team)] for player in players for team in range(num_teams)))
-
-                # Criar o solver e o coletor de soluções
-                solver = cp_model.CpSolver()
-                solution_limit = num_solutions  # Número de soluções a encontrar
-
-                # Opcional: Definir semente aleatória para reprodutibilidade
-                solver.parameters.random_seed = 42
-
-                class VarArraySolutionPrinter(cp_model.CpSolverSolutionCallback):
-                    """Coletar soluções."""
-                    def __init__(self, variables):
-                        cp_model.CpSolverSolutionCallback.__init__(self)
-                        self._variables = variables
-                        self._solution_count = 0
-                        self.solutions = []
-
-                    def on_solution_callback(self):
-                        self._solution_count += 1
-                        # Coletar a solução
-                        solution = {}
-                        for v in self._variables:
-                            solution[str(v)] = self.Value(v)
-                        self.solutions.append(solution)
-                        if self._solution_count >= solution_limit:
-                            self.StopSearch()
-
-                    def solution_count(self):
-                        return self._solution_count
-
-                # Preparar a lista de variáveis para monitorar
-                variables = []
-                for var_dict in [assign, position_vars, assign_pos, plays_primary, plays_not_primary]:
-                    variables.extend(var_dict.values())
-
-                # Resolver e coletar soluções
-                solution_printer = VarArraySolutionPrinter(variables)
-                status = solver.Solve(model, solution_printer)
-
-                if solution_printer.solution_count() > 0:
-                    solutions_data = []
-                    for idx, solution in enumerate(solution_printer.solutions):
-                        # Reconstruir variáveis da solução
-                        assign_solution = {}
-                        position_vars_solution = {}
-                        assign_pos_solution = {}
-                        plays_primary_solution = {}
-                        plays_not_primary_solution = {}
-                        for key in assign:
-                            var_name = f"assign_{key[0]}_team{key[1]}"
-                            assign_solution[key] = solution[var_name]
-                        for key in position_vars:
-                            var_name = f"position_{key[0]}_{key[1]}"
-                            position_vars_solution[key] = solution[var_name]
-                        for key in assign_pos:
-                            var_name = f"assign_{key[0]}_team{key[1]}_pos{key[2]}"
-                            assign_pos_solution[key] = solution[var_name]
-                        for key in plays_primary:
-                            var_name = f"plays_primary_{key[0]}_team{key[1]}"
-                            plays_primary_solution[key] = solution[var_name]
-                        for key in plays_not_primary:
-                            var_name = f"plays_not_primary_{key[0]}_team{key[1]}"
-                            plays_not_primary_solution[key] = solution[var_name]
-
-                        teams = {team: [] for team in range(num_teams)}
-                        team_positions = {team: {} for team in range(num_teams)}
-                        team_overalls_result = {team: 0 for team in range(num_teams)}
-                        assigned_players = []
-                        for player in players:
-                            for team in range(num_teams):
-                                if assign_solution[(player, team)] == 1:
-                                    teams[team].append(player)
-                                    assigned_players.append(player)
-                                    # Contribuição do jogador para o overall do time
-                                    if plays_primary_solution[(player, team)] == 1:
-                                        team_overalls_result[team] += primary_overall[player]
-                                    elif plays_not_primary_solution[(player, team)] == 1:
-                                        team_overalls_result[team] += adjusted_overall[player]
-                                    for pos in positions_subset[player]:
-                                        if assign_pos_solution.get((player, team, pos), 0) == 1:
-                                            team_positions[team].setdefault(pos, []).append(player)
-                        # Coletar os dados
-                        solution_data = {
-                            'teams': teams,
-                            'team_positions': team_positions,
-                            'team_overalls_result': team_overalls_result,
-                            'assigned_players': assigned_players,
-                            'left_out_players': [player for player in players if player not in assigned_players],
-                            'team_sizes': team_sizes,
-                            'primary_positions': primary_positions,
-                            'primary_overall': primary_overall,
-                            'adjusted_overall': adjusted_overall,
-                            'scale_factor': scale_factor,
-                            'positions_required_list': positions_required_list,
-                            'overall_difference': solver.Value(overall_difference)
-                        }
-                        solutions_data.append(solution_data)
-                        if idx + 1 >= num_solutions:
-                            break
-                    return solutions_data
-                else:
-                    return []
-
-        # Lista de configurações disponíveis (mantida igual)
-        configurations = [
-            # Configuração 1
-            [
-                {'Levantador': 1, 'Ponta': 2, 'Meio': 1, 'Libero': 1, 'Saida': 1},
-                {'Levantador': 1, 'Ponta': 2, 'Meio': 1, 'Libero': 1, 'Saida': 1}
-            ],
-            # Configuração 2
-            [
-                {'Levantador': 1, 'Ponta': 2, 'Meio': 1, 'Libero': 1, 'Saida': 1},
-                {'Levantador': 1, 'Ponta': 2, 'Meio': 2, 'Saida': 1}
-            ],
-            # Configuração 3
-            [
-                {'Levantador': 1, 'Ponta': 2, 'Meio': 2, 'Saida': 1},
-                {'Levantador': 1, 'Ponta': 2, 'Meio': 2, 'Saida': 1}
-            ]
-        ]
+            players, mandatory_players, players_to_bench = session.next_match()
+            if session.match_number > 1:
+                print(f"Jogadores que irão para o banco com base em partidas consecutivas jogadas: {players_to_bench}")
 
         # Exibir as configurações disponíveis
-        print("\nConfigurações disponíveis para a formação dos times:")
-        for idx, config in enumerate(configurations):
-            print(f"\nOpção {idx + 1}:")
-            for team_idx, team_config in enumerate(config):
-                print(f"  Time {team_idx + 1}:")
-                for position, count in team_config.items():
-                    print(f"    {position}: {count}")
+        with metrics.phase('exibir_configuracoes'):
+            print("\nConfigurações disponíveis para a formação dos times:")
+            for idx, config in enumerate(configurations):
+                print(f"\nOpção {idx + 1}:")
+                for team_idx, team_config in enumerate(config):
+                    print(f"  Time {team_idx + 1}:")
+                    for position, count in team_config.items():
+                        print(f"    {position}: {count}")
 
         # Para cada configuração, gerar soluções
-        all_solutions = []
-        for idx, positions_required_list in enumerate(configurations):
-            print(f"\nGerando soluções para a Opção {idx + 1}...")
-            solutions_data = form_teams(positions_required_list, num_solutions=10, mandatory_players=mandatory_players)
-            if solutions_data:
-                for solution in solutions_data:
-                    all_solutions.append((idx + 1, solution))
-            else:
-                print(f"Não foi possível gerar soluções para a Opção {idx + 1}.")
+        if planner is None:
+            with metrics.phase('resolver'):
+                all_solutions = speculation.result(players, mandatory_players)
+                solve_stats, source = speculation.last_stats, 'pre_calculada'
+                if all_solutions is None:
+                    all_solutions = lineup_engine.solve(players, mandatory_players, time_budget=time_budget)
+                    solve_stats, source = lineup_engine.last_stats, 'direta'
 
         if not all_solutions:
             print("\nNão foi possível formar times com as configurações disponíveis e os jogadores presentes.")
+            metrics.record_match(session.match_number, players, mandatory_players, source, solve_stats)
             # Decidir se continua ou para
             continue_prompt = input("Deseja tentar novamente? (sim/não): ").lower()
             if continue_prompt != 'sim':
                 break
             else:
+                if planner is not None:
+                    planner.replan(session)
                 continue  # Reiniciar o loop
 
-        # Ordenar as soluções por menor diferença de overall
-        all_solutions.sort(key=lambda x: x[1]['overall_difference'])
+        # Os dados completos de cada solução só são montados para as opções exibidas
+        if num_options_displayed:
+            all_solutions = all_solutions[:num_options_displayed]
 
         # Exibir as melhores soluções geradas e perguntar qual o usuário deseja escolher
-        print("\nAs melhores formações de times encontradas (ordenadas pela menor diferença de overall):")
-        for idx, (config_number, solution_data) in enumerate(all_solutions):
-            print(f"\nOpção {idx + 1} (Configuração {config_number}), Diferença de Overall Total: {solution_data['overall_difference']/solution_data['scale_factor']:.2f}")
-            teams = solution_data['teams']
-            team_positions = solution_data['team_positions']
-            team_overalls_result = solution_data['team_overalls_result']
-            assigned_players = solution_data['assigned_players']
-            left_out_players = solution_data['left_out_players']
-            team_sizes = solution_data['team_sizes']
-            primary_positions = solution_data['primary_positions']
-            primary_overall = solution_data['primary_overall']
-            adjusted_overall = solution_data['adjusted_overall']
-            scale_factor = solution_data['scale_factor']
-            positions_required_list = solution_data['positions_required_list']
+        with metrics.phase('exibir_opcoes'):
+            print_solutions(all_solutions)
 
-            for team in range(len(positions_required_list)):
-                team_total_overall = team_overalls_result[team] / scale_factor
-                team_average_overall = team_total_overall / team_sizes[team]
-                print(f"\n  Time {team + 1} (Overall Médio: {team_average_overall:.2f}, Overall Total: {team_total_overall:.2f}):")
-                print("    Jogadores:", teams[team])
-                print("    Posições:")
-                positions_required = positions_required_list[team]
-                for pos in positions_required.keys():
-                    players_in_position = team_positions[team].get(pos, [])
-                    for player in players_in_position:
-                        if primary_positions[player] == pos:
-                            player_overall = primary_overall[player] / scale_factor
-                            flag = '(Posição Primária)'
-                        else:
-                            player_overall = adjusted_overall[player] / scale_factor
-                            flag = '(Overall Ajustado)'
-                        print(f"      {pos}: {player} {flag}, Overall: {player_overall:.2f}")
-            if left_out_players:
-                print("    Jogadores não escalados:", left_out_players)
-            else:
-                print("    Todos os jogadores foram escalados.")
+        # Refinar as opções em segundo plano enquanto o organizador as lê
+        if improve_budget:
+            lineup_engine.start_improvement(players, mandatory_players, improve_budget)
 
         # Perguntar ao usuário qual opção deseja escolher
         while True:
             try:
-                solution_choice = int(input(f"\nEscolha o número da opção desejada (1 a {len(all_solutions)}): "))
+                choice_input = input(f"\nEscolha o número da opção desejada (1 a {len(all_solutions)}{refresh_hint}): ")
+                if improve_budget and choice_input.strip().lower() == 'r':
+                    improved_solutions = lineup_engine.improved_solutions()
+                    if improved_solutions is None:
+                        print("A melhoria em segundo plano ainda está em andamento.")
+                    elif improved_solutions:
+                        all_solutions = improved_solutions[:num_options_displayed] if num_options_displayed else improved_solutions
+                        print_solutions(all_solutions)
+                    continue
+                solution_choice = int(choice_input)
                 if 1 <= solution_choice <= len(all_solutions):
-                    _, solution_data = all_solutions[solution_choice - 1]
+                    config_number, solution_data = all_solutions[solution_choice - 1]
                     break
                 else:
                     print(f"Por favor, insira um número entre 1 e {len(all_solutions)}.")
             except ValueError:
                 print("Entrada inválida. Por favor, insira um número válido.")
 
+        # Interromper a melhoria em segundo plano antes de reutilizar os modelos
+        lineup_engine.cancel_improvement()
+
         # Utilizar a solução escolhida para prosseguir
+        if planner is not None:
+            # O banco do rodízio não entra no solver: registrá-lo como não escalado (sessão, log e exibição)
+            solution_data = rotation.with_bench(solution_data, players_to_bench)
+        session.choose(solution_data)
+        if planner is not None:
+            planner.match_played(session, solution_data)
+        else:
+            # Os jogadores da próxima partida não dependem do vencedor: começar a resolvê-la já
+            next_players, next_mandatory, _ = session.peek_next_match(session.match_number + 1)
+            speculation.start(next_players, next_mandatory, time_budget)
         teams = solution_data['teams']
         team_positions = solution_data['team_positions']
         team_overalls_result = solution_data['team_overalls_result']
@@ -435,65 +218,60 @@ def make_teams(positions, conflicts, coefficients, all_players, skills, all_posi
         positions_required_list = solution_data['positions_required_list']
 
         # Exibir os times escolhidos
-        print("\nTimes escolhidos:")
-        for team in range(len(positions_required_list)):
-            team_total_overall = team_overalls_result[team] / scale_factor
-            team_average_overall = team_total_overall / team_sizes[team]
-            print(f"\nTime {team + 1} (Overall Médio: {team_average_overall:.2f}, Overall Total: {team_total_overall:.2f}):")
-            print("Jogadores:", teams[team])
-            print("Posições:")
-            positions_required = positions_required_list[team]
-            for pos in positions_required.keys():
-                players_in_position = team_positions[team].get(pos, [])
-                for player in players_in_position:
-                    if primary_positions[player] == pos:
-                        player_overall = primary_overall[player] / scale_factor
-                        flag = '(Posição Primária)'
-                    else:
-                        player_overall = adjusted_overall[player] / scale_factor
-                        flag = '(Overall Ajustado)'
-                    print(f"  {pos}: {player} {flag}, Overall: {player_overall:.2f}")
-
-        # Exibir jogadores não escalados
-        if left_out_players:
-            print("\nJogadores não escalados:")
-            for player in left_out_players:
-                print(f"  {player}")
-        else:
-            print("\nTodos os jogadores foram escalados.")
-        print("-" * 40)
-
-        # Atualizar estatísticas dos jogadores
-        for player in assigned_players:
-            player_stats[player]['Games_Played'] += 1
-            consecutive_matches_played[player] += 1  # Incrementar partidas consecutivas jogadas
-        for player in left_out_players:
-            consecutive_matches_played[player] = 0  # Reiniciar partidas consecutivas jogadas
+        with metrics.phase('exibir_escolha'):
+            print("\nTimes escolhidos:")
+            for team in range(len(positions_required_list)):
+                team_total_overall = team_overalls_result[team] / scale_factor
+                team_average_overall = team_total_overall / team_sizes[team]
+                court_text = f", Quadra {team // 2 + 1}" if len(positions_required_list) > 2 else ""
+                print(f"\nTime {team + 1}{court_text} (Overall Médio: {team_average_overall:.2f}, Overall Total: {team_total_overall:.2f}):")
+                print("Jogadores:", teams[team])
+                print("Posições:")
+                positions_required = positions_required_list[team]
+                for pos in positions_required.keys():
+                    players_in_position = team_positions[team].get(pos, [])
+                    for player in players_in_position:
+                        if primary_positions[player] == pos:
+                            player_overall = primary_overall[player] / scale_factor
+                            flag = '(Posição Primária)'
+                        else:
+                            player_overall = adjusted_overall[player] / scale_factor
+                            flag = '(Overall Ajustado)'
+                        print(f"  {pos}: {player} {flag}, Overall: {player_overall:.2f}")
 
-        # Perguntar qual time venceu
-        while True:
-            winning_team_input = input("Qual time venceu? (1/2): ")
-            if winning_team_input in ['1', '2']:
-                winning_team = int(winning_team_input)
-                break
+            # Exibir jogadores não escalados
+            if left_out_players:
+                print("\nJogadores não escalados:")
+                for player in left_out_players:
+                    print(f"  {player}")
             else:
-                print("Entrada inválida. Por favor, insira 1 ou 2.")
-
-        if winning_team == 1:
-            winning_players = teams[0]
-        else:
-            winning_players = teams[1]
+                print("\nTodos os jogadores foram escalados.")
+            print("-" * 40)
+
+        # Perguntar qual time venceu (em cada quadra, com várias quadras)
+        winning_teams = []
+        for court in range(len(positions_required_list) // 2):
+            court_text = f" na quadra {court + 1}" if num_courts > 1 else ""
+            while True:
+                winning_team_input = input(f"Qual time venceu{court_text}? ({2 * court + 1}/{2 * court + 2}): ")
+                if winning_team_input in [str(2 * court + 1), str(2 * court + 2)]:
+                    winning_teams.append(int(winning_team_input))
+                    break
+                else:
+                    print(f"Entrada inválida. Por favor, insira {2 * court + 1} ou {2 * court + 2}.")
 
-        for player in winning_players:
-            player_stats[player]['Games_Won'] += 1
+        for winning_team in winning_teams:
+            session.record_winner(winning_team)
+        winning_team = winning_teams[0] if num_courts == 1 else winning_teams
 
-        # Salvar as estatísticas atualizadas dos jogadores no arquivo da sessão
-        session_df = pd.DataFrame([
-            {'Player': player, 'Games_Played': stats['Games_Played'], 'Games_Won': stats['Games_Won']}
-            for player, stats in player_stats.items()
-            if stats['Games_Played'] > 0
-        ])
-        session_df.to_csv(session_filepath, index=False)
+        # Registrar a partida no log da sessão e as métricas da partida
+        with metrics.phase('gravar_log'):
+            match_record = match_log.build_match_record(session.match_number, config_number, solution_data, winning_team)
+            session_log.append(match_record)
+        # Ratings atualizados com o resultado (valem para a mistura com os overalls a partir da próxima sessão)
+        if ratings is not None:
+            ratings.record_match(match_record, os.path.basename(session_log.path))
+        metrics.record_match(session.match_number, players, mandatory_players, source, solve_stats)
 
         # Perguntar se novos jogadores chegaram
         new_players_prompt = input("Algum novo jogador chegou? (sim/não): ").lower()
@@ -501,30 +279,50 @@ def make_teams(positions, conflicts, coefficients, all_players, skills, all_posi
             new_players_string = input("Digite os nomes dos novos jogadores, separados por vírgulas: ")
             new_players_list = [name.strip() for name in new_players_string.split(',')]
             # Adicionar novos jogadores à lista de jogadores presentes
-            for player in new_players_list:
-                if player not in all_players:
-                    print(f"Jogador '{player}' não encontrado nos dados. Certifique-se de que o nome está correto.")
-                elif player in all_present_players:
-                    print(f"Jogador '{player}' já está na lista de jogadores presentes.")
-                else:
-                    all_present_players.append(player)
-                    new_players_arrived.append(player)
-                    print(f"Jogador '{player}' adicionado à lista de jogadores presentes.")
+            already_present = set(session.all_present_players)
+            for message in session.add_players(new_players_list):
+                print(message)
+            added_players = [player for player in session.all_present_players if player not in already_present]
+            if planner is not None and added_players:
+                planner.players_arrived(session, added_players)
+            elif added_players:
+                # Quem chegou é obrigatório na próxima partida: refazer a pré-solução com os novos jogadores
+                next_players, next_mandatory, _ = session.peek_next_match(session.match_number + 1)
+                speculation.start(next_players, next_mandatory, time_budget)
+
+        # Com o rodízio planejado, também quem vai embora refaz o plano
+        if planner is not None:
+            left_players_prompt = input("Algum jogador foi embora? (sim/não): ").lower()
+            if left_players_prompt == 'sim':
+                left_players_string = input("Digite os nomes dos jogadores que foram embora, separados por vírgulas: ")
+                left_players_list = [name.strip() for name in left_players_string.split(',')]
+                for message in session.remove_players(left_players_list):
+                    print(message)
+                planner.players_left(session)
 
         # Perguntar se o usuário deseja continuar
         continue_prompt = input("Deseja agendar outra partida? (sim/não): ").lower()
         if continue_prompt != 'sim':
             break
         else:
-            match_number += 1
+            session.advance()
             # O loop continuará
             continue
 
-    # Ao final, preparar o dataframe final com as estatísticas
-    final_stats_df = pd.DataFrame([
-        {'Player': player, 'Games_Played': stats['Games_Played'], 'Games_Won': stats['Games_Won']}
-        for player, stats in player_stats.items()
-        if stats['Games_Played'] > 0
-    ])
+    if planner is not None:
+        planner.close()
+    else:
+        speculation.close()
+    lineup_engine.close()
+    session_log.close()
+    metrics.close()
+    if ratings is not None:
+        ratings.save()
+
+    import pandas as pd
+
+    # Ao final, preparar o dataframe final com as estatísticas e salvar os totais da sessão
+    final_stats_df = pd.DataFrame(session.session_stats(), columns=['Player', 'Games_Played', 'Games_Won'])
+    final_stats_df.to_csv(session_filepath, index=False)
 
     return final_stats_df
@@ -0,0 +1,213 @@
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from match_making import engine
+from match_making import team_configurations
+
+# Quantas soluções de cada quadra entram nas combinações entre quadras
+COURT_CANDIDATES = 3
+
+
+def partition_players(roster, players, mandatory_players, num_courts, court_size=None):
+    """Dividir os jogadores da partida entre as quadras.
+
+    Com court_size, só entram os court_size * num_courts primeiros jogadores (obrigatórios
+    primeiro, depois a ordem de chegada) e os demais ficam de fora; sem court_size, todos
+    são distribuídos e cada quadra escolhe quem fica de fora.
+    Cada jogador vai para a quadra com menos jogadores da sua posição primária, depois
+    com menos jogadores e, por fim, com menor overall somado. Os obrigatórios são
+    distribuídos primeiro e, dentro de cada grupo, os mais fortes antes, o que equilibra
+    as posições e a força das quadras.
+    Devolve ([(jogadores, obrigatórios)] por quadra, jogadores que ficaram de fora).
+    """
+    mandatory_set = set(mandatory_players or [])
+    present = [player for player in players if player in roster]
+    present = [player for player in present if player in mandatory_set] + [player for player in present if player not in mandatory_set]
+    left_out = []
+    if court_size is not None:
+        capacity = max(court_size * num_courts, len(mandatory_set))
+        present, left_out = present[:capacity], present[capacity:]
+    order = sorted(present, key=lambda player: (player not in mandatory_set, -roster.primary_overall[player]))
+    court_players = [set() for _ in range(num_courts)]
+    position_counts = [{} for _ in range(num_courts)]
+    strength = [0] * num_courts
+    for player in order:
+        pos = roster.primary_positions[player]
+        court = min(range(num_courts), key=lambda c: (position_counts[c].get(pos, 0), len(court_players[c]), strength[c]))
+        court_players[court].add(player)
+        position_counts[court][pos] = position_counts[court].get(pos, 0) + 1
+        strength[court] += roster.primary_overall[player]
+    _balance_courts(roster, court_players, strength)
+    # Manter a ordem (obrigatórios primeiro) dentro de cada quadra
+    courts = [
+        ([player for player in present if player in court_players[court]], [player for player in present if player in court_players[court] and player in mandatory_set])
+        for court in range(num_courts)
+    ]
+    return courts, left_out
+
+
+def _balance_courts(roster, court_players, strength, max_swaps=200):
+    # Trocar jogadores da mesma posição primária entre a quadra mais forte e a mais fraca
+    # enquanto isso reduzir a diferença de overall somado entre elas
+    for _ in range(max_swaps):
+        strongest = max(range(len(strength)), key=strength.__getitem__)
+        weakest = min(range(len(strength)), key=strength.__getitem__)
+        gap = strength[strongest] - strength[weakest]
+        best = None
+        for player in court_players[strongest]:
+            for other in court_players[weakest]:
+                delta = roster.primary_overall[player] - roster.primary_overall[other]
+                if roster.primary_positions[player] != roster.primary_positions[other] or not 0 < delta < gap:
+                    continue
+                new_gap = abs(gap - 2 * delta)
+                if best is None or new_gap < best[0]:
+                    best = (new_gap, player, other, delta)
+        if best is None:
+            return
+        _, player, other, delta = best
+        court_players[strongest].remove(player)
+        court_players[weakest].remove(other)
+        court_players[strongest].add(other)
+        court_players[weakest].add(player)
+        strength[strongest] -= delta
+        strength[weakest] += delta
+
+
+def merge_court_solutions(court_solutions, left_out=()):
+    # Juntar as escalações das quadras num único solution_data; a quadra c tem os times 2c e 2c + 1.
+    # left_out: jogadores que não foram designados a nenhuma quadra. O gap de cada quadra vale só para
+    # a diferença dentro dela: a diferença entre todos os times não tem limite provado (gap None)
+    merged = {
+        'teams': {}, 'team_positions': {}, 'team_overalls_result': {},
+        'assigned_players': [], 'left_out_players': [], 'team_sizes': [], 'positions_required_list': [],
+        'primary_positions': {}, 'primary_overall': {}, 'adjusted_overall': {},
+        'optimality_gap': None, 'solver_status': None, 'court_differences': [], 'court_gaps': [],
+    }
+    statuses = []
+    for _, solution_data in court_solutions:
+        offset = len(merged['teams'])
+        for team, players in solution_data['teams'].items():
+            merged['teams'][offset + team] = players
+            merged['team_positions'][offset + team] = solution_data['team_positions'][team]
+            merged['team_overalls_result'][offset + team] = solution_data['team_overalls_result'][team]
+        merged['assigned_players'] += solution_data['assigned_players']
+        merged['left_out_players'] += solution_data['left_out_players']
+        merged['team_sizes'] = merged['team_sizes'] + list(solution_data['team_sizes'])
+        merged['positions_required_list'] = merged['positions_required_list'] + list(solution_data['positions_required_list'])
+        for key in ('primary_positions', 'primary_overall', 'adjusted_overall'):
+            merged[key].update(solution_data[key])
+        merged['court_differences'].append(solution_data['overall_difference'])
+        merged['court_gaps'].append(solution_data['optimality_gap'])
+        statuses.append(solution_data['solver_status'])
+        merged['scale_factor'] = solution_data['scale_factor']
+    merged['left_out_players'] += list(left_out)
+    # Diferença entre o time mais forte e o mais fraco de todas as quadras
+    overalls = list(merged['team_overalls_result'].values())
+    merged['overall_difference'] = max(overalls) - min(overalls)
+    merged['solver_status'] = 'OPTIMAL' if all(status == 'OPTIMAL' for status in statuses) else 'FEASIBLE'
+    return merged
+
+
+class MultiCourtEngine:
+    """Várias quadras simultâneas: 2 times por quadra, equilibrados entre todas as quadras.
+
+    strategy='partition' divide os jogadores entre as quadras (partition_players) e resolve
+    cada quadra em paralelo com o motor de dois times; o tempo de solução fica limitado ao
+    de uma quadra, mesmo com 100+ jogadores. strategy='joint' resolve um único modelo com
+    todos os times, minimizando a diferença entre o maior e o menor overall (só para poucos
+    jogadores).
+    """
+
+    def __init__(self, roster, num_courts, configurations=None, formulation='classic', num_solutions=10, verbose=True, strategy='partition', lineup_cache=None, mode='exact', presolve=True):
+        self.roster = roster
+        self.num_courts = num_courts
+        self.strategy = strategy
+        self.num_solutions = num_solutions
+        self.verbose = verbose
+        base_configurations = configurations or team_configurations.generate_configurations(roster)
+        if strategy == 'joint':
+            # A mesma configuração repetida em todas as quadras
+            self.configurations = [positions_required_list * num_courts for positions_required_list in base_configurations]
+            self.court_engines = [engine.LineupEngine(roster, self.configurations, formulation=formulation, num_solutions=num_solutions, verbose=verbose,
+                                                     lineup_cache=lineup_cache, mode=mode, presolve=presolve)]
+        else:
+            self.configurations = base_configurations
+            # Um motor por quadra (modelos próprios), cada um com sua fatia dos núcleos; o cache de escalações é o mesmo
+            cpsat_workers = max(1, (os.cpu_count() or 1) // num_courts)
+            self.court_engines = [
+                engine.LineupEngine(roster, base_configurations, formulation=formulation, num_solutions=num_solutions, verbose=False, cpsat_workers=cpsat_workers,
+                                   lineup_cache=lineup_cache, mode=mode, presolve=presolve)
+                for _ in range(num_courts)
+            ]
+            self._executor = ThreadPoolExecutor(max_workers=num_courts)
+        self.last_partition = None
+
+    def solve(self, players, mandatory_players, time_budget=None, verbose=None, cancel_event=None):
+        # Mesmo formato de LineupEngine.solve: [(configuração, solution_data)] ordenado pela diferença
+        verbose = self.verbose if verbose is None else verbose
+        if self.strategy == 'joint':
+            return self.court_engines[0].solve(players, mandatory_players, time_budget=time_budget, verbose=verbose, cancel_event=cancel_event)
+
+        # Primeiro só os jogadores que cabem nas quadras, divididos com equilíbrio de força; se alguma
+        # quadra ficar sem escalação viável, cada quadra recebe também parte dos excedentes
+        court_size = max(sum(self.roster_team_sizes(positions_required_list)) for positions_required_list in self.configurations)
+        court_results = None
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        for size in (court_size, None):
+            courts, left_out = partition_players(self.roster, players, mandatory_players, self.num_courts, size)
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0.01)
+            court_results = self._solve_courts(courts, remaining, verbose, cancel_event)
+            if all(court_results) or size is None or not left_out:
+                break
+        self.last_partition = courts
+        for court, results in enumerate(court_results):
+            if not results:
+                if verbose:
+                    print(f"Não foi possível formar times na quadra {court + 1} com os jogadores designados a ela.")
+                return []
+
+        # Combinar as melhores soluções de cada quadra e ordenar pela diferença entre todos os times
+        options = []
+        for combination in itertools.product(*(results[:COURT_CANDIDATES] for results in court_results)):
+            merged = merge_court_solutions(combination, left_out)
+            label = '+'.join(str(config_number) for config_number, _ in combination)
+            options.append((label, merged))
+        options.sort(key=lambda option: (option[1]['overall_difference'], sum(option[1]['court_differences'])))
+        return options[:self.num_solutions]
+
+    @property
+    def last_stats(self):
+        # Estatísticas da última partida, com a quadra de cada configuração resolvida
+        if self.strategy == 'joint':
+            return self.court_engines[0].last_stats
+        return [dict(stats, court=court + 1) for court, court_engine in enumerate(self.court_engines) for stats in court_engine.last_stats]
+
+    @staticmethod
+    def roster_team_sizes(positions_required_list):
+        return [sum(positions_required.values()) for positions_required in positions_required_list]
+
+    def _solve_courts(self, courts, time_budget, verbose, cancel_event=None):
+        if verbose:
+            for court, (court_players, _) in enumerate(courts):
+                print(f"\nQuadra {court + 1}: {len(court_players)} jogadores disponíveis")
+        # O CP-SAT libera o GIL durante a busca, então as quadras correm de fato em paralelo
+        futures = [
+            self._executor.submit(court_engine.solve, court_players, court_mandatory, time_budget, cancel_event=cancel_event)
+            for court_engine, (court_players, court_mandatory) in zip(self.court_engines, courts)
+        ]
+        return [future.result() for future in futures]
+
+    def stop_search(self):
+        for court_engine in self.court_engines:
+            court_engine.stop_search()
+
+    def cancel_improvement(self):
+        # Sem melhoria em segundo plano no modo de várias quadras
+        pass
+
+    def close(self):
+        for court_engine in self.court_engines:
+            court_engine.close()
+        if self.strategy != 'joint':
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from match_making import lineup_model
+
+# Estado de cada processo do pool: dados do elenco e modelos já construídos
+_worker_roster = None
+_worker_models = {}
+_worker_cpsat_workers = 0
+_worker_formulation = 'classic'
+
+
+def configuration_key(positions_required_list):
+    # Chave canônica de uma configuração, usada para reaproveitar modelos
+    return tuple(tuple(sorted(positions_required.items())) for positions_required in positions_required_list)
+
+
+def split_workers(num_pool_workers, num_cpus=None):
+    # Dividir os núcleos entre os processos do pool e os workers internos do CP-SAT
+    num_cpus = num_cpus or os.cpu_count() or 1
+    return max(1, num_cpus // max(1, num_pool_workers))
+
+
+def _init_worker(roster, cpsat_workers, formulation):
+    global _worker_roster, _worker_models, _worker_cpsat_workers, _worker_formulation
+    _worker_roster = roster
+    _worker_formulation = formulation
+    _worker_models = {}
+    _worker_cpsat_workers = cpsat_workers
+
+
+def _solve_configuration(config_idx, positions_required_list, players, mandatory_players, num_solutions, verbose, time_limit, solve_options):
+    # Cada processo mantém seus próprios modelos persistentes durante a sessão
+    key = configuration_key(positions_required_list)
+    build_time = 0.0
+    if key not in _worker_models:
+        _worker_models[key] = lineup_model.build_lineup_model(_worker_formulation, _worker_roster, positions_required_list)
+        build_time = _worker_models[key].build_time
+    solutions_data = _worker_models[key].solve_lineups(players, num_solutions=num_solutions, mandatory_players=mandatory_players, num_workers=_worker_cpsat_workers,
+                                                      verbose=verbose, time_limit=time_limit, **solve_options)
+    # As estatísticas da busca voltam junto com as soluções (o modelo fica no processo)
+    return config_idx, solutions_data, dict(_worker_models[key].last_solve_stats, build_time=build_time)
+
+
+class ConfigurationSolverPool:
+    """Resolver as configurações de uma partida em paralelo num pool de processos."""
+
+    def __init__(self, roster, num_pool_workers=None, formulation='classic'):
+        self.num_pool_workers = num_pool_workers or min(3, os.cpu_count() or 1)
+        self.cpsat_workers = split_workers(self.num_pool_workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_pool_workers,
+            initializer=_init_worker,
+            initargs=(roster, self.cpsat_workers, formulation),
+        )
+
+    def solve_all(self, configurations, players, mandatory_players, num_solutions=10, verbose=True, time_limit=None, solve_options=None, cancel_event=None):
+        # Enviar todas as configurações e devolver (índice, soluções, estatísticas) à medida que terminam.
+        # Com cancel_event ligado, para de esperar: as buscas já em curso nos processos terminam pelo
+        # próprio prazo e as que ainda não começaram são descartadas
+        futures = [
+            self._executor.submit(_solve_configuration, idx, positions_required_list, players, mandatory_players, num_solutions, verbose, time_limit, solve_options or {})
+            for idx, positions_required_list in enumerate(configurations)
+        ]
+        pending = set(futures)
+        try:
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                done, pending = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,94 @@
+from match_making import team_configurations
+
+
+def _feasible(players, prefs, need, mandatory_set):
+    candidates = [player for player in players if player in mandatory_set] + [player for player in players if player not in mandatory_set]
+    return team_configurations.assign_positions(candidates, prefs, need, mandatory_set) is not None
+
+
+def presolve_match(players, mandatory_players, positions_required_list, player_positions, conflicts, symmetry_order=None):
+    """Deduções sobre os jogadores da partida antes do CP-SAT, válidas para qualquer escalação viável.
+
+    - posições descartadas: jogador × posição que nenhum emparelhamento completo de vagas admite
+      (por exemplo, todas as vagas de líbero já cabem aos obrigatórios);
+    - jogadores forçados: sem eles não há como preencher as vagas (passam a ser obrigatórios);
+    - jogadores dominados: não obrigatórios que não cabem em nenhuma escalação (saem da partida);
+    - times forçados: com dois times, quem só cabe num deles, o primeiro jogador na ordem do
+      elenco com times idênticos (quebra de simetria do modelo) e, a partir deles, os desafetos
+      forçados a jogar, sempre no outro time.
+    Devolve {'feasible', 'positions', 'teams', 'forced_players', 'eliminated', 'removed_positions',
+    'forced_positions', 'forced_teams'}; positions e teams dizem o que sobra para cada jogador.
+    """
+    need = team_configurations.position_slots(positions_required_list)
+    num_teams = len(positions_required_list)
+    players = [player for player in players if player in player_positions]
+    mandatory_set = set(mandatory_players or []) & set(players)
+    prefs = {player: [pos for pos in player_positions[player] if pos in need] for player in players}
+    reduction = {'feasible': False, 'positions': {}, 'teams': {}, 'forced_players': set(), 'eliminated': set(),
+                 'removed_positions': 0, 'forced_positions': 0, 'forced_teams': 0}
+    if not _feasible(players, prefs, need, mandatory_set):
+        return reduction
+
+    # Jogadores sem os quais as vagas não fecham
+    forced = set(mandatory_set)
+    for player in players:
+        if player not in mandatory_set and prefs[player]:
+            others = [other for other in players if other != player]
+            if not _feasible(others, prefs, need, mandatory_set):
+                forced.add(player)
+
+    # Posições que o jogador não pode ocupar em nenhuma escalação viável
+    positions = {}
+    for player in players:
+        if len(prefs[player]) == 1 and player in forced:
+            positions[player] = list(prefs[player])
+            continue
+        kept = []
+        for pos in prefs[player]:
+            restricted = dict(prefs)
+            restricted[player] = [pos]
+            if _feasible(players, restricted, need, mandatory_set | {player}):
+                kept.append(pos)
+        positions[player] = kept
+        reduction['removed_positions'] += len(prefs[player]) - len(kept)
+    eliminated = {player for player in players if not positions[player]}
+
+    # Times que ainda têm vaga nas posições que sobraram para cada jogador
+    teams = {player: [team for team in range(num_teams) if any(pos in positions_required_list[team] for pos in positions[player])] for player in players}
+    if num_teams == 2:
+        fixed = {player: teams[player][0] for player in forced if len(teams[player]) == 1}
+        if symmetry_order is not None:
+            # Com times idênticos, o primeiro jogador escalado (na ordem do elenco) fica no time 0
+            first = next((player for player in symmetry_order if player in teams and player not in eliminated), None)
+            if first in forced:
+                if 0 not in teams[first]:
+                    return reduction
+                fixed[first] = 0
+                teams[first] = [0]
+        # Desafetos de um jogador de time fixo não jogam no time dele; os forçados vão para o outro
+        queue = list(fixed)
+        while queue:
+            player = queue.pop(0)
+            team = fixed[player]
+            for other in conflicts[player]:
+                if other not in teams or team not in teams[other]:
+                    continue
+                teams[other] = [other_team for other_team in teams[other] if other_team != team]
+                if not teams[other]:
+                    if other in forced:
+                        return reduction
+                    eliminated.add(other)
+                elif other in forced and other not in fixed:
+                    fixed[other] = teams[other][0]
+                    queue.append(other)
+        reduction['forced_teams'] = len(fixed)
+    for player in eliminated:
+        positions[player] = []
+        teams[player] = []
+
+    reduction.update({
+        'feasible': True, 'positions': positions, 'teams': teams,
+        'forced_players': forced - mandatory_set, 'eliminated': eliminated,
+        'forced_positions': sum(1 for player in forced if len(positions[player]) == 1),
+    })
+    return reduction
@@ -0,0 +1,108 @@
+import csv
+import json
+import time
+import numpy as np
+from match_making import engine
+
+
+def load_script(path):
+    """Carregar um roteiro de sessão em JSON ou CSV.
+
+    JSON: {"present": [...], "matches": [{"choice": 1, "winner": 2, "arrivals": [...]}, ...]}
+    CSV (separado por ';'): colunas match;choice;winner;arrivals, com os nomes separados por '/'.
+    A linha com match 0 traz em arrivals a lista inicial de presentes.
+    """
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            script = json.load(f)
+    else:
+        script = {'present': [], 'matches': []}
+        with open(path, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                arrivals = [name.strip() for name in (row.get('arrivals') or '').split('/') if name.strip()]
+                if int(row['match']) == 0:
+                    script['present'] = arrivals
+                else:
+                    script['matches'].append({'choice': int(row['choice']), 'winner': int(row['winner']), 'arrivals': arrivals})
+    script.setdefault('name', path)
+    return script
+
+
+def replay_session(lineup_engine, script, time_budget=None):
+    # Reproduzir uma sessão sem interação, medindo a latência de cada partida
+    session = engine.MatchSession(lineup_engine.roster.players, list(script['present']))
+    latencies = []
+    overall_differences = []
+    # Gap da heurística em relação ao CP-SAT em cada partida (modo heuristic-then-exact)
+    heuristic_gaps = []
+    status = 'ok'
+    for match in script['matches']:
+        players, mandatory_players, _ = session.next_match()
+        start = time.perf_counter()
+        all_solutions = lineup_engine.solve(players, mandatory_players, time_budget=time_budget)
+        latencies.append(time.perf_counter() - start)
+        report = lineup_engine.last_heuristic_report
+        if report is not None and report['gap'] is not None:
+            heuristic_gaps.append(report['gap'] / lineup_engine.roster.scale_factor)
+        if not all_solutions:
+            status = 'sem_solucao'
+            break
+        # Escolhas fora do intervalo caem na última opção disponível
+        choice = min(max(match.get('choice', 1), 1), len(all_solutions))
+        _, solution_data = all_solutions[choice - 1]
+        session.choose(solution_data)
+        overall_differences.append(solution_data['overall_difference'] / solution_data['scale_factor'])
+        session.record_winner(match.get('winner', 1))
+        session.add_players(match.get('arrivals', []))
+        session.advance()
+    return {
+        'name': script['name'],
+        'status': status,
+        'matches_played': len(overall_differences),
+        'latencies': latencies,
+        'overall_differences': overall_differences,
+        'heuristic_gaps': heuristic_gaps,
+        'stats': session.session_stats(),
+    }
+
+
+def summarize_latencies(latencies):
+    if not latencies:
+        return {'count': 0}
+    values = np.asarray(latencies)
+    return {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'max': float(values.max()),
+        'total': float(values.sum()),
+    }
+
+
+def run_batch(roster, script_paths, repeat=1,
+              formulation='classic', num_pool_workers=1, output_path=None, time_budget=None, top_k=False, mode='exact'):
+    # O mesmo motor atende todas as sessões, como numa noite de jogos contínua
+    scripts = [load_script(path) for path in script_paths]
+    lineup_engine = engine.LineupEngine(roster, formulation=formulation, num_pool_workers=num_pool_workers, verbose=False, top_k=top_k, mode=mode)
+    results = []
+    start = time.perf_counter()
+    try:
+        for _ in range(repeat):
+            for script in scripts:
+                results.append(replay_session(lineup_engine, script, time_budget))
+    finally:
+        lineup_engine.close()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        'sessions': len(results),
+        'failed_sessions': sum(1 for result in results if result['status'] != 'ok'),
+        'elapsed': elapsed,
+        'latency': summarize_latencies([latency for result in results for latency in result['latencies']]),
+        'heuristic_gaps': [gap for result in results for gap in result['heuristic_gaps']],
+    }
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'sessions': results}, f, ensure_ascii=False, indent=2)
+    return summary
@@ -0,0 +1,231 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from match_making import engine
+from match_making import heuristic
+from match_making import team_configurations
+
+# Candidatos além do banco da ordem de rodízio entre os quais o banco pode ser escolhido
+# (só quem tem no máximo uma partida a menos que o último do banco)
+ROTATION_SLACK = 3
+# Diferença de overall (em pontos) tolerada para manter o banco mais cedo na ordem de rodízio
+SPREAD_TOLERANCE = 1.0
+# Reinícios da heurística ao estimar a diferença de overall de um conjunto de jogadores
+SPREAD_RESTARTS = 4
+
+
+def plan_rotation(present_players, games_played, consecutive_matches_played, sat_out_last, horizon, slots, lineup_spread=None):
+    """Decidir quem joga e quem fica no banco nas próximas `horizon` partidas.
+
+    Vão para o banco os que têm mais partidas jogadas, depois a maior sequência de
+    partidas seguidas e, por fim, quem chegou por último; quem acabou de ficar de fora
+    joga a partida seguinte (é obrigatório), como no rodízio de MatchSession.
+    Com lineup_spread (jogadores -> diferença de overall estimada, ou None se não há
+    escalação viável com todos eles), o banco é escolhido entre os ROTATION_SLACK
+    candidatos seguintes também: fica o primeiro na ordem de rodízio cujo conjunto é viável
+    e está a SPREAD_TOLERANCE do mais equilibrado.
+    Devolve uma lista com {'players', 'mandatory', 'bench'} para cada partida.
+    """
+    games = {player: games_played.get(player, 0) for player in present_players}
+    streak = {player: consecutive_matches_played.get(player, 0) for player in present_players}
+    arrival = {player: idx for idx, player in enumerate(present_players)}
+    sat_out = [player for player in sat_out_last if player in games]
+    num_bench = max(len(present_players) - slots, 0)
+    plan = []
+    for _ in range(horizon):
+        sat_out_set = set(sat_out)
+        candidates = sorted((player for player in present_players if player not in sat_out_set),
+                            key=lambda player: (-games[player], -streak[player], -arrival[player]))
+        bench = candidates[:num_bench]
+        if len(bench) < num_bench:
+            # Banco maior que o número de jogadores que podem sair: alguns ficam de fora de novo
+            repeat = sorted(sat_out, key=lambda player: (-games[player], -arrival[player]))
+            bench += repeat[:num_bench - len(bench)]
+        elif lineup_spread is not None and num_bench > 0:
+            bench = _balanced_bench(present_players, sat_out, candidates, games, num_bench, lineup_spread)
+        players, mandatory = _lineup_players(present_players, sat_out, bench)
+        plan.append({'players': players, 'mandatory': mandatory, 'bench': bench})
+        for player in players:
+            games[player] += 1
+            streak[player] += 1
+        for player in bench:
+            streak[player] = 0
+        sat_out = bench
+    return plan
+
+
+def _lineup_players(present_players, sat_out, bench):
+    # Quem joga (os obrigatórios primeiro) e quem é obrigatório com o banco dado
+    bench_set = set(bench)
+    mandatory = [player for player in sat_out if player not in bench_set]
+    mandatory_set = set(mandatory)
+    return mandatory + [player for player in present_players if player not in bench_set and player not in mandatory_set], mandatory
+
+
+def _balanced_bench(present_players, sat_out, candidates, games, num_bench, lineup_spread):
+    # Bancos possíveis entre os candidatos com folga, na ordem de rodízio (o guloso primeiro); sem
+    # nenhum viável, a folga dobra uma vez, e depois fica o guloso (a partida cai no fallback de _solve_entry)
+    threshold = games[candidates[num_bench - 1]] - 1
+    spreads = []
+    for slack in (ROTATION_SLACK, 2 * ROTATION_SLACK):
+        pool = [player for player in candidates[:num_bench + slack] if games[player] >= threshold]
+        for bench in itertools.combinations(pool, num_bench):
+            players, _ = _lineup_players(present_players, sat_out, bench)
+            spread = lineup_spread(players)
+            if spread is not None:
+                spreads.append((list(bench), spread))
+        if spreads or len(pool) < num_bench + slack:
+            break
+    if not spreads:
+        return candidates[:num_bench]
+    best = min(spread for _, spread in spreads)
+    return next(bench for bench, spread in spreads if spread <= best + SPREAD_TOLERANCE)
+
+
+def with_bench(solution_data, bench):
+    # Cópia da solução com o banco planejado entre os não escalados, para que quem ficou de fora
+    # zere a sequência de partidas e seja obrigatório na seguinte, como no rodízio de MatchSession
+    left_out = list(solution_data['left_out_players'])
+    left_out += [player for player in bench if player not in left_out and player not in solution_data['assigned_players']]
+    return dict(solution_data, left_out_players=left_out)
+
+
+class RotationPlanner:
+    """Rodízio das próximas partidas da noite, com as escalações calculadas de antemão.
+
+    O plano cobre `horizon` partidas e ganha mais uma a cada partida jogada. As escalações
+    das partidas planejadas são resolvidas em segundo plano, em ordem, e a da próxima
+    partida normalmente já está pronta quando é pedida. O banco de cada partida é checado
+    antes de travado (lineup_spread): conflitos, cotas de posição e equilíbrio dos times.
+    O plano só é refeito quando alguém chega ou vai embora, ou quando a escalação
+    escolhida fugiu do plano.
+    """
+
+    def __init__(self, lineup_engine, horizon=4, slots=12, time_budget=None):
+        self.lineup_engine = lineup_engine
+        self.horizon = horizon
+        self.slots = slots
+        self.time_budget = time_budget
+        # plan[0] é a próxima partida; futures[i] resolve a escalação de plan[i]
+        self.plan = []
+        self.futures = []
+        # Partidas creditadas a quem chegou depois, para não emendar partidas até alcançar os demais
+        self.arrival_credit = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._cancelled = threading.Event()
+        # Estatísticas das buscas da partida devolvida por último em next_match
+        self.last_stats = []
+        # Diferença estimada por conjunto de jogadores (os replanejamentos repetem os mesmos conjuntos)
+        self._spreads = {}
+
+    def lineup_spread(self, players):
+        # Menor diferença de overall (em pontos) da heurística com todos os jogadores obrigatórios,
+        # entre as configurações do motor (repetidas até cobrir os jogadores, como nas quadras);
+        # None se nenhuma tem escalação que respeite as cotas de posição e os conflitos
+        key = frozenset(players)
+        if key not in self._spreads:
+            self._spreads[key] = self._heuristic_spread(players)
+        return self._spreads[key]
+
+    def _heuristic_spread(self, players):
+        roster = self.lineup_engine.roster
+        spreads = []
+        for positions_required_list in self.lineup_engine.configurations:
+            size = sum(sum(positions_required.values()) for positions_required in positions_required_list)
+            if len(players) % size:
+                continue
+            positions_required_list = positions_required_list * (len(players) // size)
+            if not team_configurations.is_feasible(positions_required_list, players, players, roster.positions):
+                continue
+            results = heuristic.heuristic_lineups(roster, positions_required_list, players, players, num_solutions=1, num_restarts=SPREAD_RESTARTS)
+            if results:
+                spreads.append(results[0]['overall_difference'] / roster.scale_factor)
+        return min(spreads, default=None)
+
+    def _plan(self, session, games, streak, sat_out, horizon):
+        return plan_rotation(session.all_present_players, games, streak, sat_out, horizon, self.slots, lineup_spread=self.lineup_spread)
+
+    def _solve_entry(self, entry):
+        # Todos os planejados são obrigatórios; sem escalação viável com eles, volta a regra de
+        # MatchSession: só quem ficou de fora é obrigatório e o solver escolhe entre os demais
+        solutions, stats = engine.solve_with_stats(self.lineup_engine, entry['players'], entry['players'], time_budget=self.time_budget,
+                                                   verbose=False, cancel_event=self._cancelled)
+        if not solutions and entry['bench'] and not self._cancelled.is_set():
+            solutions, fallback_stats = engine.solve_with_stats(self.lineup_engine, entry['players'] + entry['bench'], entry['mandatory'], time_budget=self.time_budget,
+                                                                verbose=False, cancel_event=self._cancelled)
+            stats += fallback_stats
+        return solutions, stats
+
+    def _schedule(self, entries):
+        for entry in entries:
+            self.plan.append(entry)
+            self.futures.append(self._executor.submit(self._solve_entry, entry))
+
+    def _projected_state(self, session):
+        # Partidas, sequências e quem ficou de fora por último depois das partidas já planejadas
+        games = {player: session.player_stats[player]['Games_Played'] + self.arrival_credit.get(player, 0) for player in session.all_present_players}
+        streak = {player: session.consecutive_matches_played[player] for player in session.all_present_players}
+        sat_out = list(session.left_out_players)
+        for entry in self.plan:
+            for player in entry['players']:
+                games[player] += 1
+                streak[player] += 1
+            for player in entry['bench']:
+                streak[player] = 0
+            sat_out = entry['bench']
+        return games, streak, sat_out
+
+    def replan(self, session):
+        # Descartar o plano e as escalações pendentes e planejar de novo a partir do estado da sessão
+        self.cancel()
+        self._cancelled.clear()
+        games, streak, sat_out = self._projected_state(session)
+        self._schedule(self._plan(session, games, streak, sat_out, self.horizon))
+
+    def next_match(self, session):
+        # Devolve (jogadores, obrigatórios, banco, soluções, já estava pronta) da próxima partida
+        if not self.plan:
+            self.replan(session)
+        entry = self.plan[0]
+        ready = self.futures[0].done()
+        solutions, self.last_stats = self.futures[0].result()
+        return entry['players'], entry['mandatory'], entry['bench'], solutions, ready
+
+    def match_played(self, session, solution_data):
+        # Chamado depois de session.choose: se a escalação seguiu o plano, ele só ganha uma
+        # partida no fim; senão, é refeito a partir do estado real
+        entry = self.plan.pop(0)
+        self.futures.pop(0)
+        if set(solution_data['assigned_players']) != set(entry['players']):
+            self.replan(session)
+            return
+        games, streak, sat_out = self._projected_state(session)
+        self._schedule(self._plan(session, games, streak, sat_out, 1))
+
+    def players_arrived(self, session, new_players):
+        # Quem chega entra com o mínimo de partidas entre os presentes
+        others = [session.player_stats[player]['Games_Played'] + self.arrival_credit.get(player, 0)
+                  for player in session.all_present_players if player not in new_players]
+        baseline = min(others, default=0)
+        for player in new_players:
+            self.arrival_credit[player] = baseline - session.player_stats[player]['Games_Played']
+        self.replan(session)
+
+    def players_left(self, session):
+        self.replan(session)
+
+    def cancel(self):
+        # Cancelar as escalações pendentes e interromper a que estiver em andamento
+        self._cancelled.set()
+        for future in self.futures:
+            future.cancel()
+        running = [future for future in self.futures if not future.done()]
+        while running and not all(future.done() for future in running):
+            self.lineup_engine.stop_search()
+            wait(running, timeout=0.05)
+        self.plan = []
+        self.futures = []
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=True)
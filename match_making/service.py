@@ -0,0 +1,361 @@
+import asyncio
+import csv
+import datetime
+import json
+import os
+import signal
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from data_output import match_log
+from match_making import engine
+from match_making import replay
+
+HISTORY_DIR = 'match_history'
+# Maior corpo aceito numa requisição (listas de nomes)
+MAX_BODY_SIZE = 1 << 20
+# Latências guardadas por rota para as métricas (as mais recentes)
+LATENCY_WINDOW = 1000
+
+
+class ServiceError(Exception):
+    """Erro de uma requisição, devolvido ao cliente com o status HTTP e a mensagem."""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def _option_payload(option_number, config_number, solution_data):
+    # Opção de escalação em JSON: o mesmo conteúdo do registro do log de partidas
+    scale_factor = solution_data['scale_factor']
+    teams = solution_data['teams']
+    return {
+        'option': option_number,
+        'configuration': config_number,
+        'overall_difference': solution_data['overall_difference'] / scale_factor,
+        'team_overalls': [solution_data['team_overalls_result'][team] / scale_factor for team in range(len(teams))],
+        'teams': [teams[team] for team in range(len(teams))],
+        'positions': [solution_data['team_positions'][team] for team in range(len(teams))],
+        'left_out': solution_data['left_out_players'],
+        'solver_status': solution_data['solver_status'],
+    }
+
+
+def _names(body, key):
+    # Lista de nomes de jogadores do corpo (vazia se ausente); outros tipos são recusados com 400
+    names = body.get(key, [])
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"'{key}' deve ser uma lista de nomes (texto).")
+    return [name.strip() for name in names]
+
+
+def _integer(body, key, default, minimum):
+    # Inteiro opcional do corpo; bool é recusado (em Python True também é int)
+    value = body.get(key, default)
+    if value is None and default is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ServiceError(HTTPStatus.BAD_REQUEST, f"'{key}' deve ser um inteiro maior ou igual a {minimum}.")
+    return value
+
+
+class ServiceSession:
+    """Estado de um grupo atendido pelo serviço: a sessão de partidas, as opções da partida em
+    aberto e o log de partidas (o mesmo formato do modo interativo, em match_history)."""
+
+    def __init__(self, session_id, match_session, start_time, history_dir):
+        self.session_id = session_id
+        self.match_session = match_session
+        self.start_time = start_time
+        self.history_dir = history_dir
+        self.log = match_log.MatchLog(f"{history_dir}/partidas_{start_time}.jsonl")
+        self.matches_logged = 0
+        # Opções calculadas para a próxima partida; descartadas se alguém chega ou vai embora
+        self.options = None
+        # Requisições da mesma sessão são atendidas uma de cada vez
+        self.lock = asyncio.Lock()
+
+    def close(self):
+        # Gravar os totais da sessão como o modo interativo (sessao_jogo_*.csv) e fechar o log
+        # (o arquivo reservado ao criar a sessão é apagado se nenhuma partida foi registrada)
+        self.log.close()
+        if not self.matches_logged:
+            os.remove(self.log.path)
+        stats = self.match_session.session_stats()
+        with open(f"{self.history_dir}/sessao_jogo_{self.start_time}.csv", 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['Player', 'Games_Played', 'Games_Won'])
+            writer.writeheader()
+            writer.writerows(stats)
+        return stats
+
+
+class LineupService:
+    """Serviço local de escalações: elenco carregado uma vez e motores CP-SAT aquecidos.
+
+    Cada motor (LineupEngine, com seus modelos persistentes já construídos) atende uma
+    partida por vez numa thread; as requisições esperam um motor livre numa fila, e com todos
+    os motores ocupados e max_pending já esperando o serviço recusa com 503 (Retry-After)
+    em vez de acumular.
+    As sessões de cada grupo ficam em memória, com o log de partidas gravado a cada jogo.
+    """
+
+    def __init__(self, roster, num_engines=2, max_pending=8, time_budget=None, history_dir=HISTORY_DIR, **engine_options):
+        self.roster = roster
+        self.time_budget = time_budget
+        self.max_pending = max_pending
+        self.history_dir = history_dir
+        # Os núcleos são divididos entre os motores, como no pool de processos
+        cpsat_workers = max(1, (os.cpu_count() or 1) // num_engines)
+        self.engines = [engine.LineupEngine(roster, verbose=False, cpsat_workers=cpsat_workers, **engine_options) for _ in range(num_engines)]
+        self._executor = ThreadPoolExecutor(max_workers=num_engines)
+        self._idle_engines = None
+        self.sessions = {}
+        self._next_session = 1
+        # Partidas em andamento (resolvendo ou na fila) e, destas, as que esperam um motor livre
+        self.pending = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.started = time.time()
+        # Latências por rota e, nas requisições que resolvem partidas, espera na fila e busca
+        self.latencies = {}
+        self.queue_waits = deque(maxlen=LATENCY_WINDOW)
+        self.solve_times = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        # Construir os modelos de todas as configurações em cada motor antes de aceitar requisições
+        loop = asyncio.get_running_loop()
+        self._idle_engines = asyncio.Queue()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, lineup_engine.warm_up) for lineup_engine in self.engines))
+        for lineup_engine in self.engines:
+            self._idle_engines.put_nowait(lineup_engine)
+
+    async def solve(self, players, mandatory_players):
+        # Resolver numa thread com um motor livre; sem motor livre e com a fila cheia, recusar (backpressure).
+        # Só contam para max_pending as requisições que esperam motor, não as que já estão resolvendo
+        if self._idle_engines.empty() and self.waiting >= self.max_pending:
+            self.rejected += 1
+            raise ServiceError(HTTPStatus.SERVICE_UNAVAILABLE, "Serviço ocupado: muitas partidas na fila, tente novamente.", {'Retry-After': '1'})
+        self.pending += 1
+        try:
+            start = time.perf_counter()
+            self.waiting += 1
+            try:
+                lineup_engine = await self._idle_engines.get()
+            finally:
+                self.waiting -= 1
+            self.queue_waits.append(time.perf_counter() - start)
+            try:
+                start = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                all_solutions = await loop.run_in_executor(self._executor, lineup_engine.solve, players, mandatory_players, self.time_budget, False)
+                self.solve_times.append(time.perf_counter() - start)
+                return all_solutions
+            finally:
+                self._idle_engines.put_nowait(lineup_engine)
+        finally:
+            self.pending -= 1
+
+    def _session(self, session_id):
+        if session_id not in self.sessions:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Sessão '{session_id}' não encontrada.")
+        return self.sessions[session_id]
+
+    def _reserve_start_time(self):
+        # Horário de início da sessão, único entre as sessões (nomeia os arquivos de match_history)
+        start = datetime.datetime.now()
+        while True:
+            start_time = start.strftime("%d-%m-%Y_%H-%M-%S")
+            try:
+                with open(f"{self.history_dir}/partidas_{start_time}.jsonl", 'x', encoding='utf-8'):
+                    return start_time
+            except FileExistsError:
+                start += datetime.timedelta(seconds=1)
+
+    async def create_session(self, body):
+        players = _names(body, 'players')
+        priority_count = _integer(body, 'priority_count', 12, 0)
+        if not players:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "Informe a lista 'players' com os jogadores presentes.")
+        os.makedirs(self.history_dir, exist_ok=True)
+        session_id = str(self._next_session)
+        self._next_session += 1
+        match_session = engine.MatchSession(self.roster.players, players, priority_count=priority_count)
+        self.sessions[session_id] = ServiceSession(session_id, match_session, self._reserve_start_time(), self.history_dir)
+        unknown = [player for player in players if player not in self.roster]
+        return HTTPStatus.CREATED, {'session': session_id, 'present': match_session.all_present_players, 'unknown': unknown}
+
+    async def next_match(self, session_id, body):
+        service_session = self._session(session_id)
+        limit = _integer(body, 'options', None, 1)
+        async with service_session.lock:
+            match_session = service_session.match_session
+            players, mandatory_players, players_to_bench = match_session.peek_next_match()
+            all_solutions = await self.solve(players, mandatory_players)
+            service_session.options = all_solutions
+            return HTTPStatus.OK, {
+                'match': match_session.match_number,
+                'bench': players_to_bench,
+                'mandatory': mandatory_players,
+                'options': [_option_payload(idx + 1, config_number, solution_data)
+                            for idx, (config_number, solution_data) in enumerate(all_solutions[:limit])],
+            }
+
+    async def choose(self, session_id, body):
+        # Registrar a opção escolhida e o vencedor (1 ou 2; lista com um por quadra) e avançar a sessão
+        service_session = self._session(session_id)
+        async with service_session.lock:
+            options = service_session.options
+            if not options:
+                raise ServiceError(HTTPStatus.CONFLICT, "Nenhuma opção calculada para a próxima partida: peça /next antes.")
+            option = body.get('option', 1)
+            if isinstance(option, bool) or not isinstance(option, int) or not 1 <= option <= len(options):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, f"Opção inválida: escolha entre 1 e {len(options)}.")
+            config_number, solution_data = options[option - 1]
+            num_courts = len(solution_data['teams']) // 2
+            winners = body.get('winner')
+            winners = winners if isinstance(winners, list) else [winners]
+            if len(winners) != num_courts or any(
+                    isinstance(winner, bool) or winner not in (2 * court + 1, 2 * court + 2) for court, winner in enumerate(winners)):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "Vencedor inválido: informe 'winner' (1 ou 2; com várias quadras, um por quadra).")
+            match_session = service_session.match_session
+            match_session.next_match()
+            match_session.choose(solution_data)
+            for winner in winners:
+                match_session.record_winner(winner)
+            winning_team = winners[0] if num_courts == 1 else winners
+            service_session.log.append(match_log.build_match_record(match_session.match_number, config_number, solution_data, winning_team))
+            service_session.matches_logged += 1
+            match_session.advance()
+            service_session.options = None
+            return HTTPStatus.OK, {'match': match_session.match_number, 'stats': match_session.session_stats()}
+
+    async def update_players(self, session_id, body):
+        # Chegadas e saídas; as opções já calculadas deixam de valer
+        service_session = self._session(session_id)
+        async with service_session.lock:
+            match_session = service_session.match_session
+            messages = match_session.add_players(_names(body, 'arrived'))
+            messages += match_session.remove_players(_names(body, 'left'))
+            service_session.options = None
+            return HTTPStatus.OK, {'messages': messages, 'present': match_session.all_present_players}
+
+    async def close_session(self, session_id, body):
+        service_session = self._session(session_id)
+        async with service_session.lock:
+            del self.sessions[session_id]
+            return HTTPStatus.OK, {'stats': service_session.close()}
+
+    async def metrics(self, body):
+        lineup_cache = self.engines[0].lineup_cache
+        return HTTPStatus.OK, {
+            'uptime': time.time() - self.started,
+            'sessions': len(self.sessions),
+            'engines': len(self.engines),
+            'idle_engines': self._idle_engines.qsize(),
+            'pending': self.pending,
+            'waiting': self.waiting,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+            'requests': {route: replay.summarize_latencies(latencies) for route, latencies in self.latencies.items()},
+            'queue_wait': replay.summarize_latencies(self.queue_waits),
+            'solve': replay.summarize_latencies(self.solve_times),
+            'lineup_cache': None if lineup_cache is None else {'hits': lineup_cache.hits, 'misses': lineup_cache.misses},
+        }
+
+    def _route(self, method, path):
+        # (rota para as métricas, função, argumentos) de cada caminho
+        parts = [part for part in path.split('?', 1)[0].split('/') if part]
+        if method == 'GET' and parts == ['metrics']:
+            return 'GET /metrics', self.metrics, ()
+        if method == 'POST' and parts == ['sessions']:
+            return 'POST /sessions', self.create_session, ()
+        if len(parts) >= 2 and parts[0] == 'sessions':
+            session_id = parts[1]
+            if method == 'DELETE' and len(parts) == 2:
+                return 'DELETE /sessions/{id}', self.close_session, (session_id,)
+            actions = {'next': self.next_match, 'choose': self.choose, 'players': self.update_players}
+            if method == 'POST' and len(parts) == 3 and parts[2] in actions:
+                return f'POST /sessions/{{id}}/{parts[2]}', actions[parts[2]], (session_id,)
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"Rota desconhecida: {method} {path}")
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 mínimo: uma requisição JSON por conexão
+        start = time.perf_counter()
+        route = None
+        headers = {}
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            if len(request_line) != 3:
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "Requisição HTTP inválida.")
+            method, path, _ = request_line
+            request_headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                request_headers[name.strip().lower()] = value.strip()
+            length = int(request_headers.get('content-length', 0) or 0)
+            if length > MAX_BODY_SIZE:
+                raise ServiceError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corpo da requisição grande demais.")
+            body = json.loads(await reader.readexactly(length)) if length else {}
+            if not isinstance(body, dict):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "O corpo deve ser um objeto JSON.")
+            route, handler, route_args = self._route(method, path)
+            if route.startswith('GET'):
+                status, payload = await handler(body)
+            else:
+                status, payload = await handler(*route_args, body)
+        except ServiceError as error:
+            status, payload, headers = error.status, {'error': error.message}, error.headers
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = HTTPStatus.BAD_REQUEST, {'error': "Corpo JSON inválido."}
+        except Exception:
+            # Falha inesperada ao atender: responder 500 e seguir aceitando conexões
+            traceback.print_exc()
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Erro interno do serviço."}
+        content = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = [f"HTTP/1.1 {status.value} {status.phrase}", "Content-Type: application/json; charset=utf-8",
+                f"Content-Length: {len(content)}", "Connection: close"] + [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + content)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        # Requisições sem rota reconhecida (inválidas, 404) entram juntas nas métricas
+        route = route or 'outras'
+        self.latencies.setdefault(route, deque(maxlen=LATENCY_WINDOW)).append(time.perf_counter() - start)
+
+    def close(self):
+        # Encerrar as sessões ainda abertas (gravando os totais) e os motores (o cache de escalações é salvo)
+        for service_session in self.sessions.values():
+            service_session.close()
+        self.sessions = {}
+        for lineup_engine in self.engines:
+            lineup_engine.close()
+        self._executor.shutdown(wait=True)
+
+
+async def serve(service, address):
+    """Atender em 'host:porta' (TCP) ou 'unix:/caminho' (socket Unix) até ser interrompido."""
+    await service.start()
+    if address.startswith('unix:'):
+        server = await asyncio.start_unix_server(service.handle_connection, path=address[len('unix:'):])
+    else:
+        host, _, port = address.rpartition(':')
+        server = await asyncio.start_server(service.handle_connection, host or '127.0.0.1', int(port))
+    # SIGTERM encerra como Ctrl+C: as sessões abertas são fechadas e os totais gravados
+    stop = asyncio.Event()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    except NotImplementedError:
+        pass
+    print(f"Serviço de escalações em {address} com {len(service.engines)} motores aquecidos (Ctrl+C para encerrar).")
+    async with server:
+        await stop.wait()
@@ -0,0 +1,139 @@
+from collections.abc import Mapping
+import numpy as np
+from ortools.sat.python import cp_model
+
+SOLUTION_KEYS = [
+    'teams', 'team_positions', 'team_overalls_result', 'assigned_players', 'left_out_players',
+    'team_sizes', 'primary_positions', 'primary_overall', 'adjusted_overall', 'scale_factor',
+    'positions_required_list', 'overall_difference', 'optimality_gap', 'solver_status',
+]
+
+
+class MatrixSolutionCollector(cp_model.CpSolverSolutionCallback):
+    """Coletar soluções numa matriz pré-alocada (uma linha por solução, uma coluna por variável).
+
+    Com keep_best=True a busca não para no limite de soluções: a matriz funciona como
+    buffer circular e guarda as últimas (melhores) soluções encontradas até o fim do tempo.
+    """
+    def __init__(self, num_variables, solution_limit, keep_best=False):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self._solution_limit = solution_limit
+        self._num_variables = num_variables
+        self._keep_best = keep_best
+        self._solution_count = 0
+        # Coluna extra sempre zero, usada para combinações jogador/time/posição inexistentes
+        self.values = np.zeros((solution_limit, num_variables + 1), dtype=np.int64)
+
+    def on_solution_callback(self):
+        self.values[self._solution_count % self._solution_limit, :self._num_variables] = self.response_proto.solution
+        self._solution_count += 1
+        if not self._keep_best and self._solution_count >= self._solution_limit:
+            self.StopSearch()
+
+    def solution_count(self):
+        return min(self._solution_count, self._solution_limit)
+
+    def solution_matrix(self):
+        if self._solution_count <= self._solution_limit:
+            return self.values[:self._solution_count]
+        # Reordenar o buffer circular em ordem cronológica
+        start = self._solution_count % self._solution_limit
+        return np.roll(self.values, -start, axis=0)
+
+
+class SolutionSet:
+    """Soluções decodificadas de uma configuração numa partida, em forma de arrays."""
+
+    def __init__(self, players, position_names, team_of, position_of, team_overalls, overall_difference,
+                 team_sizes, positions_required_list, primary_positions, primary_overall, adjusted_overall, scale_factor,
+                 optimality_gap=None, solver_status=None):
+        self.players = players
+        self.position_names = position_names
+        self.team_of = team_of                  # (soluções, jogadores): time do jogador ou -1
+        self.position_of = position_of          # (soluções, jogadores): índice da posição ou -1
+        self.team_overalls = team_overalls      # (soluções, times)
+        self.overall_difference = overall_difference
+        self.team_sizes = team_sizes
+        self.positions_required_list = positions_required_list
+        self.primary_positions = primary_positions
+        self.primary_overall = primary_overall
+        self.adjusted_overall = adjusted_overall
+        self.scale_factor = scale_factor
+        # Distância entre a melhor solução e o limite inferior provado pelo CP-SAT
+        self.optimality_gap = optimality_gap
+        self.solver_status = solver_status
+
+    def __len__(self):
+        return len(self.overall_difference)
+
+    def solutions(self):
+        return [LazySolution(self, row) for row in range(len(self))]
+
+    def build_solution_data(self, row):
+        num_teams = len(self.team_sizes)
+        team_of = self.team_of[row]
+        position_of = self.position_of[row]
+        teams = {team: [] for team in range(num_teams)}
+        team_positions = {team: {} for team in range(num_teams)}
+        assigned_players = []
+        left_out_players = []
+        for player_idx, player in enumerate(self.players):
+            team = int(team_of[player_idx])
+            if team < 0:
+                left_out_players.append(player)
+                continue
+            teams[team].append(player)
+            assigned_players.append(player)
+            pos = self.position_names[position_of[player_idx]]
+            team_positions[team].setdefault(pos, []).append(player)
+        return {
+            'teams': teams,
+            'team_positions': team_positions,
+            'team_overalls_result': {team: int(self.team_overalls[row, team]) for team in range(num_teams)},
+            'assigned_players': assigned_players,
+            'left_out_players': left_out_players,
+            'team_sizes': self.team_sizes,
+            'primary_positions': self.primary_positions,
+            'primary_overall': self.primary_overall,
+            'adjusted_overall': self.adjusted_overall,
+            'scale_factor': self.scale_factor,
+            'positions_required_list': self.positions_required_list,
+            'overall_difference': int(self.overall_difference[row]),
+            'optimality_gap': self.optimality_gap,
+            'solver_status': self.solver_status,
+        }
+
+
+class LazySolution(Mapping):
+    """Dicionário solution_data construído apenas quando a solução é exibida ou escolhida."""
+
+    def __init__(self, solution_set, row):
+        self._solution_set = solution_set
+        self._row = row
+        self._data = None
+
+    def __getitem__(self, key):
+        # A diferença de overall é usada para ordenar e não exige montar o dicionário
+        if key == 'overall_difference':
+            return int(self._solution_set.overall_difference[self._row])
+        if self._data is None:
+            self._data = self._solution_set.build_solution_data(self._row)
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(SOLUTION_KEYS)
+
+    def __len__(self):
+        return len(SOLUTION_KEYS)
+
+
+def decode_solutions(values, lineup_index, overall_difference_index, overall_matrix):
+    # values: (soluções, variáveis + 1); lineup_index: (jogadores, times, posições) com índices de variáveis
+    lineup = values[:, lineup_index]                     # (S, P, T, K)
+    assigned_team = lineup.any(axis=3)                   # (S, P, T)
+    assigned = assigned_team.any(axis=2)                 # (S, P)
+    team_of = np.where(assigned, assigned_team.argmax(axis=2), -1)
+    position_of = np.where(assigned, lineup.any(axis=2).argmax(axis=2), -1)
+    team_overalls = np.einsum('sptk,pk->st', lineup, overall_matrix)
+    overall_difference = values[:, overall_difference_index]
+    return team_of, position_of, team_overalls, overall_difference
@@ -0,0 +1,130 @@
+import itertools
+
+# Jogadores por time e limites (mínimo, máximo) de cada posição num time; a ordem das posições
+# é a ordem de exibição. Com estes limites saem as três configurações de sempre (com e sem líbero)
+TEAM_SIZE = 6
+POSITION_LIMITS = {'Levantador': (1, 1), 'Ponta': (2, 2), 'Meio': (1, 2), 'Libero': (0, 1), 'Saida': (1, 1)}
+
+
+def position_slots(positions_required_list):
+    # Vagas de cada posição somadas entre os times da configuração
+    need = {}
+    for positions_required in positions_required_list:
+        for pos, required_number in positions_required.items():
+            need[pos] = need.get(pos, 0) + required_number
+    return need
+
+
+def assign_positions(candidates, prefs, need, mandatory_set):
+    """Emparelhamento jogador -> vaga de posição por caminhos aumentantes.
+
+    Todo obrigatório precisa de vaga (quem já tem vaga pode mudar de posição para abrir
+    espaço); os demais entram na ordem dada até completar as vagas. Com os obrigatórios
+    primeiro em `candidates`, o emparelhamento é máximo e a resposta é exata.
+    Devolve {jogador: posição}, ou None se não houver como.
+    """
+    holders = {pos: [] for pos in need}
+    assigned = {}
+    total_slots = sum(need.values())
+
+    def augment(player, seen):
+        for pos in prefs[player]:
+            if pos in seen:
+                continue
+            seen.add(pos)
+            if len(holders[pos]) < need[pos]:
+                holders[pos].append(player)
+                assigned[player] = pos
+                return True
+            for holder in list(holders[pos]):
+                holders[pos].remove(holder)
+                if augment(holder, seen):
+                    holders[pos].append(player)
+                    assigned[player] = pos
+                    return True
+                holders[pos].append(holder)
+        return False
+
+    for player in candidates:
+        if len(assigned) == total_slots:
+            break
+        if not augment(player, set()) and player in mandatory_set:
+            return None
+    if len(assigned) < total_slots or not mandatory_set <= assigned.keys():
+        return None
+    return assigned
+
+
+def is_feasible(positions_required_list, players, mandatory_players, player_positions):
+    # Teste exato (sem conflitos): existe uma vaga de posição para cada obrigatório e todas as
+    # vagas são preenchidas, sem contar o mesmo jogador em duas posições
+    need = position_slots(positions_required_list)
+    players = [player for player in players if player in player_positions]
+    mandatory_set = set(mandatory_players or []) & set(players)
+    if len(players) < sum(need.values()) or len(mandatory_set) > sum(need.values()):
+        return False
+    candidates = [player for player in players if player in mandatory_set] + [player for player in players if player not in mandatory_set]
+    prefs = {player: [pos for pos in player_positions[player] if pos in need] for player in players}
+    return assign_positions(candidates, prefs, need, mandatory_set) is not None
+
+
+def team_templates(position_counts, team_size=TEAM_SIZE, position_limits=POSITION_LIMITS):
+    # Composições de um time dentro dos limites de cada posição, sem pedir mais jogadores de
+    # uma posição do que o elenco tem; times com mais posições diferentes vêm primeiro
+    ranges = []
+    for pos, (low, high) in position_limits.items():
+        high = min(high, position_counts.get(pos, 0))
+        if high < low:
+            return []
+        ranges.append([(pos, count) for count in range(low, high + 1)])
+    templates = [
+        {pos: count for pos, count in combination if count > 0}
+        for combination in itertools.product(*ranges)
+        if sum(count for _, count in combination) == team_size
+    ]
+    templates.sort(key=lambda template: -len(template))
+    return templates
+
+
+def generate_configurations(roster, num_teams=2, team_size=TEAM_SIZE, position_limits=POSITION_LIMITS):
+    """Configurações (lista de composições, uma por time) possíveis com o elenco.
+
+    As composições saem das posições que os jogadores do elenco jogam, e cada configuração
+    combina `num_teams` delas sem repetir a mesma combinação em outra ordem. Só ficam as que
+    o elenco inteiro consegue preencher (is_feasible).
+    """
+    position_counts = {}
+    for player in roster.players:
+        for pos in roster.positions[player]:
+            position_counts[pos] = position_counts.get(pos, 0) + 1
+    templates = team_templates(position_counts, team_size, position_limits)
+    configurations = [
+        [dict(templates[idx]) for idx in combination]
+        for combination in itertools.combinations_with_replacement(range(len(templates)), num_teams)
+    ]
+    return [positions_required_list for positions_required_list in configurations
+            if is_feasible(positions_required_list, roster.players, None, roster.positions)]
+
+
+def rank_configurations(configurations, players, mandatory_players, player_positions, primary_positions):
+    """Índices das configurações viáveis para a partida, das mais promissoras às menos.
+
+    Vêm antes as que podem pôr mais jogadores na posição primária e, depois, as com mais
+    folga na posição mais disputada (mais escolhas para o solver equilibrar os times).
+    """
+    players = [player for player in players if player in player_positions]
+    can_play = {}
+    primary_count = {}
+    for player in players:
+        primary_count[primary_positions[player]] = primary_count.get(primary_positions[player], 0) + 1
+        for pos in player_positions[player]:
+            can_play[pos] = can_play.get(pos, 0) + 1
+    scored = []
+    for idx, positions_required_list in enumerate(configurations):
+        if not is_feasible(positions_required_list, players, mandatory_players, player_positions):
+            continue
+        need = position_slots(positions_required_list)
+        primary_fit = sum(min(required_number, primary_count.get(pos, 0)) for pos, required_number in need.items())
+        slack = min(can_play.get(pos, 0) - required_number for pos, required_number in need.items())
+        scored.append((-primary_fit, -slack, idx))
+    return [idx for *_, idx in sorted(scored)]
@@ -0,0 +1,30 @@
+import random
+
+# Partidas sorteadas por comparação; o prazo é folgado para as duas variantes provarem o ótimo
+NUM_CASES = 4
+TIME_LIMIT = 20
+
+
+def assert_same_optimum(test_case, variants, seed, **labels):
+    """Comparar duas variantes de modelo em partidas sorteadas do elenco de test_case.
+
+    Cada variante é (modelos por configuração, opções extras de form_teams). Em cada partida e
+    configuração, as duas têm a mesma viabilidade e, quando ambas provam o ótimo, o mesmo
+    objetivo; ao menos uma comparação de ótimos tem de acontecer.
+    """
+    rng = random.Random(seed)
+    compared = 0
+    for _ in range(NUM_CASES):
+        players = rng.sample(test_case.roster.players, rng.randint(12, 18))
+        mandatory_players = rng.sample(players, rng.randint(0, 10))
+        for config_number, models in enumerate(zip(*(variant_models for variant_models, _ in variants)), start=1):
+            results = []
+            for model, (_, options) in zip(models, variants):
+                solutions_data = model.form_teams(players, num_solutions=1, mandatory_players=mandatory_players, verbose=False, time_limit=TIME_LIMIT, **options)
+                results.append((bool(solutions_data), model.last_solve_stats['status'], model.last_solve_stats['objective']))
+            with test_case.subTest(configuration=config_number, players=players, mandatory=mandatory_players, **labels):
+                test_case.assertEqual(results[0][0], results[1][0])
+                if results[0][1] == results[1][1] == 'OPTIMAL':
+                    test_case.assertEqual(results[0][2], results[1][2])
+                    compared += 1
+    test_case.assertGreater(compared, 0)
@@ -0,0 +1,27 @@
+import unittest
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import lineup_model
+from match_making import team_configurations
+from same_optimum import assert_same_optimum
+
+
+class FormulationTest(unittest.TestCase):
+    """A formulação enxuta (x[jogador, time, posição]) e a original têm o mesmo objetivo ótimo
+    e a mesma viabilidade em cada partida do elenco incluído no projeto."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+        cls.configurations = team_configurations.generate_configurations(cls.roster)
+
+    def test_same_optimum(self):
+        variants = [([lineup_model.build_lineup_model(formulation, self.roster, positions_required_list)
+                      for positions_required_list in self.configurations], {})
+                    for formulation in ('classic', 'compact')]
+        assert_same_optimum(self, variants, seed=11)
+
+
+if __name__ == '__main__':
+    unittest.main()
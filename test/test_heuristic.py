@@ -0,0 +1,80 @@
+import unittest
+from data_cleaning import roster
+from match_making import heuristic
+
+# Elenco pequeno em que o overall é só o saque (coeficiente 1 em todas as posições): o overall
+# de cada jogador é o valor abaixo vezes o fator de escala
+POSITIONS = ['Levantador', 'Ponta']
+COEFFICIENTS = {pos: {skill: int(skill == 'Saque') for skill in roster.SKILL_NAMES} for pos in POSITIONS}
+PLAYERS = {
+    'Ana': (['Levantador'], 10),
+    'Bruno': (['Levantador'], 8),
+    'Caio': (['Ponta'], 7),
+    'Duda': (['Ponta'], 5),
+    'Eva': (['Ponta'], 6),
+    'Fábio': (['Ponta', 'Levantador'], 9),
+    'Gabi': (['Levantador'], 4),
+}
+# Dois times de um levantador e um ponta
+CONFIGURATION = [{'Levantador': 1, 'Ponta': 1}, {'Levantador': 1, 'Ponta': 1}]
+
+
+def _roster(conflicts=None):
+    positions = {player: player_positions for player, (player_positions, _) in PLAYERS.items()}
+    skills = {player: {skill: serve if skill == 'Saque' else 0 for skill in roster.SKILL_NAMES} for player, (_, serve) in PLAYERS.items()}
+    return roster.Roster(positions, conflicts or {}, COEFFICIENTS, list(PLAYERS), skills, POSITIONS)
+
+
+class HeuristicTest(unittest.TestCase):
+    """As escalações da heurística respeitam cotas de posição, obrigatórios e conflitos, e
+    nenhuma é devolvida quando não há escalação possível."""
+
+    def _solve(self, players, mandatory_players=None, conflicts=None):
+        session_roster = _roster(conflicts)
+        return heuristic.heuristic_lineups(session_roster, CONFIGURATION, players, mandatory_players, num_solutions=5)
+
+    def test_position_quotas(self):
+        results = self._solve(['Ana', 'Bruno', 'Caio', 'Duda'])
+        self.assertTrue(results)
+        for solution_data in results:
+            for team, team_positions in solution_data['team_positions'].items():
+                self.assertEqual({pos: len(players) for pos, players in team_positions.items()}, CONFIGURATION[team])
+        # Ana e Duda contra Bruno e Caio: 15 a 15
+        best = results[0]
+        self.assertEqual(best['overall_difference'], 0)
+        self.assertEqual(sorted(sorted(team) for team in best['teams'].values()), [['Ana', 'Duda'], ['Bruno', 'Caio']])
+        self.assertEqual(best['solver_status'], 'HEURISTIC')
+
+    def test_mandatory_players(self):
+        # Fábio pode jogar de levantador ou ponta; Gabi e Eva, os mais fracos, são obrigatórios
+        players = ['Ana', 'Bruno', 'Caio', 'Eva', 'Fábio', 'Gabi']
+        results = self._solve(players, ['Gabi', 'Eva'])
+        self.assertTrue(results)
+        for solution_data in results:
+            self.assertIn('Gabi', solution_data['assigned_players'])
+            self.assertIn('Eva', solution_data['assigned_players'])
+            self.assertEqual(len(solution_data['assigned_players']), 4)
+            self.assertEqual(sorted(solution_data['assigned_players'] + solution_data['left_out_players']), sorted(players))
+        # Melhor: Gabi com Fábio de ponta (13) contra Bruno e Eva (14)
+        self.assertEqual(results[0]['overall_difference'], 1 * roster.SCALE_FACTOR)
+
+    def test_conflicts(self):
+        # Ana e Duda não jogam juntos: Ana fica com Caio (17) e Bruno com Duda (13)
+        results = self._solve(['Ana', 'Bruno', 'Caio', 'Duda'], conflicts={'Ana': ['Duda']})
+        self.assertTrue(results)
+        for solution_data in results:
+            for team in solution_data['teams'].values():
+                self.assertFalse({'Ana', 'Duda'} <= set(team))
+        self.assertEqual(results[0]['overall_difference'], 4 * roster.SCALE_FACTOR)
+
+    def test_no_lineup(self):
+        # Três levantadores obrigatórios para duas vagas
+        self.assertEqual(self._solve(['Ana', 'Bruno', 'Gabi', 'Caio', 'Duda'], ['Ana', 'Bruno', 'Gabi']), [])
+        # Menos jogadores que vagas
+        self.assertEqual(self._solve(['Ana', 'Bruno', 'Caio']), [])
+        # Ana em conflito com os dois únicos pontas: todo time dela viola um conflito
+        self.assertEqual(self._solve(['Ana', 'Bruno', 'Caio', 'Duda'], conflicts={'Ana': ['Caio', 'Duda']}), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import csv
+import os
+import tempfile
+import unittest
+from data_output import history_store
+from data_output import match_log
+
+# Sessão completa (CSV de totais e log), sessão interrompida antes do CSV (só log) e uma sessão nova
+FULL_SESSION = '24-11-2024_20-49-42'
+LOG_ONLY_SESSION = '01-12-2024_20-30-00'
+NEW_SESSION = '08-12-2024_20-35-10'
+
+
+def _record(match_number, team_positions, winner):
+    return {'match': match_number, 'teams': [[player for players in positions.values() for player in players] for positions in team_positions],
+            'positions': team_positions, 'winner': winner}
+
+
+class HistoryStoreTest(unittest.TestCase):
+    """A ingestão é incremental (só arquivos novos ou modificados), e uma sessão sem CSV de
+    totais entra nos totais dos jogadores pelo seu log de partidas."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history_dir = os.path.join(self.directory.name, 'match_history')
+        os.mkdir(self.history_dir)
+        self.store = history_store.HistoryStore(os.path.join(self.directory.name, 'history.sqlite'))
+
+        with open(self._path(f'sessao_jogo_{FULL_SESSION}.csv'), 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['Player', 'Games_Played', 'Games_Won'])
+            writer.writeheader()
+            writer.writerows([{'Player': 'Ana', 'Games_Played': 3, 'Games_Won': 2}, {'Player': 'Bruno', 'Games_Played': 3, 'Games_Won': 1}])
+        # O log da sessão completa não pode ser contado de novo nos totais
+        self._write_log(FULL_SESSION, [_record(1, [{'Levantador': ['Ana']}, {'Levantador': ['Bruno']}], 1)])
+        self._write_log(LOG_ONLY_SESSION, [
+            _record(1, [{'Levantador': ['Ana'], 'Ponta': ['Caio']}, {'Levantador': ['Bruno'], 'Ponta': ['Duda']}], 2),
+            _record(2, [{'Levantador': ['Bruno'], 'Ponta': ['Caio']}, {'Levantador': ['Ana'], 'Ponta': ['Duda']}], 1),
+        ])
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.history_dir, name)
+
+    def _write_log(self, session, records, mtime=None):
+        path = self._path(f'partidas_{session}.jsonl')
+        log = match_log.MatchLog(path)
+        for record in records:
+            log.append(record)
+        log.close()
+        if mtime is not None:
+            # O mtime muda mesmo em sistemas de arquivos com resolução grosseira
+            os.utime(path, (mtime, mtime))
+
+    def _matches(self):
+        return self.store.connection.execute('SELECT session, match, COUNT(*) FROM match_players GROUP BY session, match ORDER BY session, match').fetchall()
+
+    def _totals(self):
+        return {row['Player']: (row['Games_Played'], row['Games_Won'], row['Sessions']) for row in self.store.player_totals()}
+
+    def test_incremental_ingest(self):
+        self.assertEqual(self.store.ingest(self.history_dir), 3)
+        matches = self._matches()
+        self.assertEqual(len(matches), 3)
+
+        # Nada mudou: nenhum arquivo é relido
+        self.assertEqual(self.store.ingest(self.history_dir), 0)
+        self.assertEqual(self._matches(), matches)
+
+        # Só a sessão nova é ingerida, e só as suas partidas são acrescentadas
+        self._write_log(NEW_SESSION, [_record(1, [{'Levantador': ['Caio']}, {'Levantador': ['Duda']}], 2)])
+        self.assertEqual(self.store.ingest(self.history_dir), 1)
+        self.assertEqual(self._matches(), sorted(matches + [(f'partidas_{NEW_SESSION}', 1, 2)]))
+
+        # Um log que cresceu é relido por inteiro, sem duplicar as partidas que já estavam lá
+        path = self._path(f'partidas_{NEW_SESSION}.jsonl')
+        self._write_log(NEW_SESSION, [_record(2, [{'Levantador': ['Duda']}, {'Levantador': ['Caio']}], 1)], mtime=os.path.getmtime(path) + 10)
+        self.assertEqual(self.store.ingest(self.history_dir), 1)
+        self.assertEqual(self._matches(), sorted(matches + [(f'partidas_{NEW_SESSION}', 1, 2), (f'partidas_{NEW_SESSION}', 2, 2)]))
+
+    def test_log_only_session_is_counted(self):
+        self.store.ingest(self.history_dir)
+        self.assertEqual(self._totals(), {
+            # CSV da sessão completa + 2 partidas do log da sessão interrompida
+            'Ana': (5, 2, 2), 'Bruno': (5, 3, 2),
+            'Caio': (2, 1, 1), 'Duda': (2, 1, 1),
+        })
+        # Só o dia da sessão interrompida
+        totals = {row['Player']: row['Games_Played'] for row in self.store.player_totals(['Ana', 'Caio'], start='2024-12-01', end='2024-12-01')}
+        self.assertEqual(totals, {'Ana': 2, 'Caio': 2})
+        self.assertEqual(self.store.position_totals('Caio'), [{'Position': 'Ponta', 'Games_Played': 2, 'Games_Won': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
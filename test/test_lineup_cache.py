@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import engine
+from match_making import lineup_cache
+
+CONFIGURATION = [{'Levantador': 1, 'Ponta': 2}, {'Levantador': 1, 'Ponta': 2}]
+# Jogadores da partida resolvida pelo motor (os primeiros e os últimos do elenco)
+NUM_PLAYERS = 16
+# Prazo por partida folgado para as configurações provarem o ótimo e entrarem no cache
+TIME_BUDGET = 30
+
+
+class LineupCacheTest(unittest.TestCase):
+    """Descarte das escalações quando o elenco muda, descarte LRU e o modo de busca na chave."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'lineup_cache.pkl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _key(self, players, search='first-n'):
+        return lineup_cache.lineup_key(players, [], CONFIGURATION, {'num_solutions': 1, 'search': search})
+
+    def test_roster_version_invalidates(self):
+        cache = lineup_cache.LineupCache('v1', path=self.path)
+        key = self._key(['Ana', 'Bruno'])
+        cache.put(key, ['escalação'])
+        cache.save()
+        # A ordem dos jogadores não muda a chave
+        self.assertEqual(lineup_cache.LineupCache('v1', path=self.path).get(self._key(['Bruno', 'Ana'])), ['escalação'])
+        # Algum CSV mudou: nada do arquivo é aproveitado
+        cache = lineup_cache.LineupCache('v2', path=self.path)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_lru_eviction(self):
+        cache = lineup_cache.LineupCache('v1', path=self.path, max_entries=2)
+        keys = [self._key([player]) for player in ('Ana', 'Bruno', 'Caio')]
+        cache.put(keys[0], ['a'])
+        cache.put(keys[1], ['b'])
+        # Ana foi usada por último, então Bruno é o descartado quando Caio entra
+        self.assertEqual(cache.get(keys[0]), ['a'])
+        cache.put(keys[2], ['c'])
+        self.assertEqual(list(cache.entries), [keys[0], keys[2]])
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_search_mode_in_key(self):
+        self.assertNotEqual(self._key(['Ana']), self._key(['Ana'], search='keep-best'))
+        cache = lineup_cache.LineupCache(self.roster.version, path=self.path)
+        lineup_engine = engine.LineupEngine(self.roster, verbose=False, num_solutions=3, lineup_cache=cache)
+        players = self.roster.players[:NUM_PLAYERS // 2] + self.roster.players[-NUM_PLAYERS // 2:]
+        try:
+            # Sem prazo (primeiras N soluções): tudo vai ao solver e entra no cache
+            _, stats = engine.solve_with_stats(lineup_engine, players, [], verbose=False)
+            self.assertNotIn('cache', [solve_stats['source'] for solve_stats in stats])
+            _, stats = engine.solve_with_stats(lineup_engine, players, [], verbose=False)
+            self.assertIn('cache', [solve_stats['source'] for solve_stats in stats])
+            # Com prazo, as primeiras N não servem: as configurações vão de novo ao solver
+            _, stats = engine.solve_with_stats(lineup_engine, players, [], time_budget=TIME_BUDGET, verbose=False)
+            self.assertNotIn('cache', [solve_stats['source'] for solve_stats in stats])
+            _, stats = engine.solve_with_stats(lineup_engine, players, [], time_budget=TIME_BUDGET, verbose=False)
+            self.assertIn('cache', [solve_stats['source'] for solve_stats in stats])
+        finally:
+            lineup_engine.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
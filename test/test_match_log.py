@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from data_output import match_log
+
+SCALE_FACTOR = 100
+
+
+def _solution_data(teams, team_positions, overalls, left_out):
+    return {
+        'scale_factor': SCALE_FACTOR,
+        'teams': dict(enumerate(teams)),
+        'team_positions': dict(enumerate(team_positions)),
+        'team_overalls_result': dict(enumerate(overall * SCALE_FACTOR for overall in overalls)),
+        'overall_difference': (max(overalls) - min(overalls)) * SCALE_FACTOR,
+        'left_out_players': left_out,
+    }
+
+
+class MatchLogTest(unittest.TestCase):
+    """O log de partidas devolve, na releitura, exatamente os registros acrescentados, e os
+    totais da sessão reconstruídos a partir dele batem com os vencedores registrados."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'partidas_24-11-2024_20-49-42.jsonl')
+        self.records = [
+            match_log.build_match_record(1, 2, _solution_data([['Ana', 'Bruno'], ['Caio', 'Duda']],
+                                                              [{'Levantador': ['Ana'], 'Ponta': ['Bruno']}, {'Levantador': ['Caio'], 'Ponta': ['Duda']}],
+                                                              [70.5, 69.0], ['Eva']), 1),
+            match_log.build_match_record(2, 1, _solution_data([['Eva', 'Bruno'], ['Ana', 'Duda'], ['Caio', 'Fábio'], ['Gabi', 'Hugo']],
+                                                              [{'Levantador': ['Eva'], 'Ponta': ['Bruno']}, {'Levantador': ['Ana'], 'Ponta': ['Duda']},
+                                                               {'Levantador': ['Caio'], 'Ponta': ['Fábio']}, {'Levantador': ['Gabi'], 'Ponta': ['Hugo']}],
+                                                              [71.0, 70.0, 68.0, 68.5], []), [2, 3]),
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        # O arquivo só existe depois da primeira partida
+        log = match_log.MatchLog(self.path)
+        self.assertFalse(os.path.exists(self.path))
+        for record in self.records[:1]:
+            log.append(record)
+        log.close()
+        self.assertEqual(match_log.read_match_log(self.path), self.records[:1])
+
+        # Um log reaberto continua a partir do fim
+        log = match_log.MatchLog(self.path)
+        for record in self.records[1:]:
+            log.append(record)
+        log.close()
+        replayed = match_log.read_match_log(self.path)
+        self.assertEqual(replayed, self.records)
+        self.assertEqual(replayed[1]['team_overalls'], [71.0, 70.0, 68.0, 68.5])
+        self.assertEqual(replayed[0]['left_out'], ['Eva'])
+
+    def test_incomplete_last_line_is_ignored(self):
+        log = match_log.MatchLog(self.path)
+        for record in self.records:
+            log.append(record)
+        log.close()
+        # Queda no meio da escrita de uma terceira partida
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"match": 3, "teams": [["Ana"')
+        self.assertEqual(match_log.read_match_log(self.path), self.records)
+
+    def test_session_totals(self):
+        totals = {stats['Player']: (stats['Games_Played'], stats['Games_Won']) for stats in match_log.session_totals(self.records)}
+        self.assertEqual(totals, {
+            'Ana': (2, 2), 'Bruno': (2, 1), 'Caio': (2, 1), 'Duda': (2, 1),
+            'Eva': (1, 0), 'Fábio': (1, 1), 'Gabi': (1, 0), 'Hugo': (1, 0),
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
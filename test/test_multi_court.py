@@ -0,0 +1,65 @@
+import unittest
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import multi_court
+
+# Times de 5 (10 por quadra), sem líbero: com duas quadras, os 4 últimos a chegar dos 24 jogadores do
+# elenco ficam de fora da divisão (os que só jogam de líbero e mais um)
+POSITIONS_REQUIRED = {'Levantador': 1, 'Ponta': 2, 'Meio': 1, 'Saida': 1}
+NUM_COURTS = 2
+
+
+class PartitionModeTest(unittest.TestCase):
+    """Várias quadras por divisão dos jogadores: as escalações das quadras são juntadas com a
+    quadra c nos times 2c e 2c + 1, e todo jogador presente está num time ou de fora."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+
+    def test_merged_lineups(self):
+        court_engine = multi_court.MultiCourtEngine(self.roster, NUM_COURTS, configurations=[[POSITIONS_REQUIRED, POSITIONS_REQUIRED]],
+                                                    num_solutions=4, verbose=False)
+        try:
+            late = [player for player in self.roster.players if self.roster.positions[player] == ['Libero']]
+            surplus = len(self.roster.players) - 2 * NUM_COURTS * sum(POSITIONS_REQUIRED.values())
+            late += [player for player in self.roster.players if player not in late][:surplus - len(late)]
+            players = [player for player in self.roster.players if player not in late] + late
+            options = court_engine.solve(players, [], time_budget=2)
+            courts = court_engine.last_partition
+        finally:
+            court_engine.close()
+
+        self.assertTrue(options)
+        court_players = [set(players_in_court) for players_in_court, _ in courts]
+        unpartitioned = set(players) - set().union(*court_players)
+        self.assertEqual(unpartitioned, set(late))
+        for label, solution_data in options:
+            with self.subTest(label=label):
+                teams = solution_data['teams']
+                self.assertEqual(sorted(teams), list(range(2 * NUM_COURTS)))
+                for court in range(NUM_COURTS):
+                    for team in (2 * court, 2 * court + 1):
+                        self.assertLessEqual(set(teams[team]), court_players[court])
+                        self.assertEqual(solution_data['positions_required_list'][team], POSITIONS_REQUIRED)
+                        self.assertEqual(sum(len(team_players) for team_players in solution_data['team_positions'][team].values()),
+                                         sum(POSITIONS_REQUIRED.values()))
+
+                # Quem não foi designado a nenhuma quadra, e quem a quadra não escalou, fica de fora
+                assigned = [player for team in teams.values() for player in team]
+                left_out = solution_data['left_out_players']
+                self.assertEqual(len(assigned), len(set(assigned)))
+                self.assertFalse(set(assigned) & set(left_out))
+                self.assertEqual(sorted(assigned + left_out), sorted(players))
+                self.assertLessEqual(unpartitioned, set(left_out))
+
+                overalls = solution_data['team_overalls_result']
+                self.assertEqual(solution_data['overall_difference'], max(overalls.values()) - min(overalls.values()))
+                # O equilíbrio entre as quadras não tem limite provado
+                self.assertIsNone(solution_data['optimality_gap'])
+                self.assertEqual(len(solution_data['court_gaps']), NUM_COURTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import lineup_model
+from match_making import team_configurations
+from same_optimum import assert_same_optimum
+
+
+class PresolveRegressionTest(unittest.TestCase):
+    """O pré-processamento só descarta o que nenhuma escalação viável usa: com e sem ele, cada
+    partida tem a mesma viabilidade e o mesmo objetivo ótimo, nas duas formulações."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+        cls.configurations = team_configurations.generate_configurations(cls.roster)
+
+    def test_same_optimum_with_and_without_presolve(self):
+        for formulation in lineup_model.FORMULATIONS:
+            # Os mesmos modelos nas duas variantes; só a opção de form_teams muda
+            models = [lineup_model.build_lineup_model(formulation, self.roster, positions_required_list)
+                      for positions_required_list in self.configurations]
+            assert_same_optimum(self, [(models, {'presolve': True}), (models, {'presolve': False})], seed=7, formulation=formulation)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import math
+import os
+import tempfile
+import unittest
+from data_cleaning import roster
+from data_output import match_log
+from data_output import ratings
+
+FIRST_SESSION = '24-11-2024_20-49-42'
+SECOND_SESSION = '01-12-2024_20-30-00'
+
+
+def _record(match_number, teams, winner):
+    return {'match': match_number, 'teams': teams, 'positions': [{'Ponta': team} for team in teams], 'winner': winner}
+
+
+def _strength(rating):
+    # Rating -> força logística do ajuste em lote
+    return (rating - ratings.BASE_RATING) * math.log(10) / 400.0
+
+
+class RatingEngineTest(unittest.TestCase):
+    """Atualização Elo, aplicação incremental dos logs sem contar partidas duas vezes, ajuste em
+    lote pelo histórico e ajuste dos overalls pelos ratings."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.history_dir = self.directory.name
+        self.path = os.path.join(self.history_dir, 'ratings.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _log_name(self, session):
+        return f'partidas_{session}.jsonl'
+
+    def _write_log(self, session, records):
+        log = match_log.MatchLog(os.path.join(self.history_dir, self._log_name(session)))
+        for record in records:
+            log.append(record)
+        log.close()
+
+    def test_update(self):
+        engine = ratings.RatingEngine(self.path)
+        # Times iguais (1500 x 1500): vitória esperada 0.5, o vencedor ganha K/2
+        engine.update(['Ana', 'Bruno'], ['Caio', 'Duda'], True)
+        self.assertEqual(engine.ratings, {'Ana': 1516.0, 'Bruno': 1516.0, 'Caio': 1484.0, 'Duda': 1484.0})
+        self.assertEqual(engine.games, {'Ana': 1, 'Bruno': 1, 'Caio': 1, 'Duda': 1})
+        # O favorito (média 1516) ganha menos do que perderia
+        engine.update(['Ana', 'Bruno'], ['Caio', 'Duda'], True)
+        gain = ratings.K_FACTOR * (1.0 - ratings.expected_score(1516.0, 1484.0))
+        self.assertAlmostEqual(engine.ratings['Ana'], 1516.0 + gain)
+        self.assertAlmostEqual(engine.ratings['Caio'], 1484.0 - gain)
+        self.assertLess(gain, ratings.K_FACTOR / 2)
+
+    def test_catch_up(self):
+        self._write_log(FIRST_SESSION, [_record(1, [['Ana', 'Bruno'], ['Caio', 'Duda']], 1),
+                                        _record(2, [['Ana', 'Caio'], ['Bruno', 'Duda']], 2)])
+        engine = ratings.RatingEngine(self.path)
+        self.assertEqual(engine.catch_up(self.history_dir), 2)
+        self.assertEqual(engine.catch_up(self.history_dir), 0)
+
+        # Partida registrada durante a sessão: vai para o log e para os ratings de uma vez
+        record = _record(3, [['Ana', 'Duda'], ['Bruno', 'Caio']], 1)
+        self._write_log(FIRST_SESSION, [record])
+        engine.record_match(record, self._log_name(FIRST_SESSION))
+        self.assertEqual(engine.applied, {self._log_name(FIRST_SESSION): 3})
+        engine.save()
+        expected = dict(engine.ratings)
+
+        # Ao reabrir, o log modificado é relido mas a partida da sessão não é aplicada de novo;
+        # só a sessão nova entra
+        engine = ratings.RatingEngine(self.path)
+        self.assertEqual(engine.catch_up(self.history_dir), 0)
+        self.assertEqual(engine.ratings, expected)
+        self._write_log(SECOND_SESSION, [_record(1, [['Ana', 'Bruno'], ['Caio', 'Duda']], 2)])
+        self.assertEqual(engine.catch_up(self.history_dir), 1)
+        self.assertEqual(engine.applied, {self._log_name(FIRST_SESSION): 3, self._log_name(SECOND_SESSION): 1})
+        self.assertEqual(engine.games['Ana'], 4)
+
+    def test_refit(self):
+        # Ana vence Bruno duas vezes e perde uma; Caio e Duda empatam em vitórias
+        self._write_log(FIRST_SESSION, [_record(1, [['Ana'], ['Bruno']], 1), _record(2, [['Caio'], ['Duda']], 1)])
+        self._write_log(SECOND_SESSION, [_record(1, [['Ana'], ['Bruno']], 1), _record(2, [['Bruno'], ['Ana']], 1),
+                                         _record(3, [['Duda'], ['Caio']], 1)])
+        engine = ratings.RatingEngine(self.path)
+        self.assertEqual(engine.refit(self.history_dir), 5)
+        self.assertEqual(engine.games, {'Ana': 3, 'Bruno': 3, 'Caio': 2, 'Duda': 2})
+        self.assertEqual(engine.applied, {self._log_name(FIRST_SESSION): 2, self._log_name(SECOND_SESSION): 3})
+        self.assertAlmostEqual(engine.ratings['Caio'], ratings.BASE_RATING)
+        self.assertAlmostEqual(engine.ratings['Duda'], ratings.BASE_RATING)
+        # Ótimo do Newton: com força s de Ana e -s de Bruno e p = 1 / (1 + e^(-2s)) a chance de
+        # Ana vencer, o gradiente de Ana (2 vitórias, 1 derrota, menos a regularização) se anula
+        strength = _strength(engine.ratings['Ana'])
+        self.assertAlmostEqual(_strength(engine.ratings['Bruno']), -strength)
+        probability = 1.0 / (1.0 + math.exp(-2.0 * strength))
+        gradient = 2 * (1.0 - probability) - probability - ratings.REFIT_PRIOR * strength
+        self.assertAlmostEqual(gradient, 0.0, places=8)
+        self.assertGreater(strength, 0.0)
+
+    def test_overall_shifts(self):
+        # Overall 10, 20 e 15 (só o saque conta): desvio padrão de 5 * sqrt(2/3) pontos
+        coefficients = {'Ponta': {skill: int(skill == 'Saque') for skill in roster.SKILL_NAMES}}
+        skills = {player: {skill: serve if skill == 'Saque' else 0 for skill in roster.SKILL_NAMES}
+                  for player, serve in (('Ana', 10), ('Bruno', 20), ('Caio', 15))}
+        session_roster = roster.Roster({player: ['Ponta'] for player in skills}, {}, coefficients, list(skills), skills, ['Ponta'])
+        spread = 5 * math.sqrt(2 / 3) * roster.SCALE_FACTOR
+        engine = ratings.RatingEngine(self.path)
+        engine.ratings = {'Ana': 1900.0, 'Bruno': 1300.0, 'Caio': 1700.0}
+        engine.games = {'Ana': 10, 'Bruno': 30}
+        shifts = engine.overall_shifts(session_roster, weight=0.8)
+        # Pesos 0.8 * 10 / (10 + 10) e 0.8 * 30 / (30 + 10), vezes +400 e -200 pontos de Elo;
+        # Caio não tem partidas e fica de fora
+        self.assertEqual(shifts, {'Ana': round(0.4 * 1.0 * spread), 'Bruno': round(0.6 * -0.5 * spread)})
+
+
+if __name__ == '__main__':
+    unittest.main()
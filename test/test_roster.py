@@ -0,0 +1,58 @@
+import unittest
+from data_input import roster_cache
+from data_cleaning import roster
+
+
+class RosterTest(unittest.TestCase):
+    """Os arrays do elenco batem com os dicionários por nome, e o recorte por ids segue a ordem dada."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.roster_data, cls.version = roster_cache.load_roster_snapshot()
+
+    def setUp(self):
+        self.roster = roster.Roster(*self.roster_data, version=self.version)
+
+    def test_overall_matrix(self):
+        # Cada posição calibrada: média das habilidades ponderada pelos coeficientes, como no cálculo escalar
+        _, _, coefficients, _, skills, _ = self.roster_data
+        for player in self.roster.players:
+            for pos in self.roster.position_names:
+                numerator = sum(skills[player][skill] * coefficients[pos][skill] for skill in roster.SKILL_NAMES)
+                denominator = sum(coefficients[pos][skill] for skill in roster.SKILL_NAMES)
+                with self.subTest(player=player, pos=pos):
+                    self.assertEqual(self.roster.overall_matrix[self.roster.index[player], self.roster.position_index[pos]],
+                                     int(numerator / denominator * roster.SCALE_FACTOR))
+            self.assertEqual(self.roster.primary_overall[player],
+                             self.roster.overall_matrix[self.roster.index[player], self.roster.position_index[self.roster.primary_positions[player]]])
+
+    def test_eligibility_and_conflicts(self):
+        for idx, player in enumerate(self.roster.players):
+            calibrated = {pos for pos in self.roster.positions[player] if pos in self.roster.position_index}
+            self.assertEqual({self.roster.position_names[pos_id] for pos_id in self.roster.eligibility[idx].nonzero()[0]}, calibrated)
+            self.assertEqual(self.roster.eligibility_mask[idx], sum(1 << self.roster.position_index[pos] for pos in calibrated))
+            self.assertEqual(self.roster.names(self.roster.conflict_matrix[idx].nonzero()[0]), self.roster.conflicts[player])
+        self.assertTrue((self.roster.conflict_matrix == self.roster.conflict_matrix.T).all())
+
+    def test_ids_subset(self):
+        players = [self.roster.players[5], 'Fulano', self.roster.players[2]]
+        ids = self.roster.ids(players)
+        self.assertEqual(ids.tolist(), [5, 2])
+        self.assertEqual(self.roster.names(ids), [players[0], players[2]])
+        self.assertEqual(self.roster.primary_overalls[ids].tolist(), [self.roster.primary_overall[player] for player in self.roster.names(ids)])
+
+    def test_shift_overalls(self):
+        player = self.roster.players[0]
+        before = self.roster.overall_matrix[0].copy()
+        primary_overall = self.roster.primary_overall
+        self.roster.shift_overalls({player: 7, 'Fulano': 3})
+        self.assertEqual((self.roster.overall_matrix[0] - before).tolist(), [7] * len(before))
+        # Os dicionários são atualizados no lugar, e a versão muda com os ajustes
+        self.assertIs(self.roster.primary_overall, primary_overall)
+        self.assertEqual(primary_overall[player], self.roster.primary_overalls[0])
+        self.assertEqual(self.roster.adjusted_overall[player], self.roster.primary_overalls[0])
+        self.assertNotEqual(self.roster.version, self.version)
+
+
+if __name__ == '__main__':
+    unittest.main()
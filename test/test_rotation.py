@@ -0,0 +1,70 @@
+import unittest
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import engine
+from match_making import rotation
+
+# Jogadores presentes no início da noite do replay exemplo_quinta (15 para 12 vagas)
+PRESENT = ['Bia', 'Helo', 'Vini', 'Dimitri', 'Caio', 'Rafael', 'Vitor', 'Pedro', 'Ballogh', 'Gustavo', 'Ane', 'Miguel', 'Cintra', 'Duda', 'Lucas']
+
+
+def _spread(players):
+    # Ana e Bruno estão em conflito e não há como separá-los em 4 vagas; com Caio em quadra os times ficam desequilibrados
+    if 'Ana' in players and 'Bruno' in players:
+        return None
+    return 5.0 if 'Caio' in players else 0.5
+
+
+class PlanRotationTest(unittest.TestCase):
+    """O banco sai da ordem de rodízio, mas entre os candidatos com folga fica o primeiro conjunto viável e equilibrado."""
+
+    def test_balanced_bench(self):
+        present = ['Ana', 'Bruno', 'Caio', 'Duda', 'Eva', 'Fábio']
+        # Sem estimativa, o banco é o guloso: quem chegou por último
+        plan = rotation.plan_rotation(present, {}, {}, [], 2, 4)
+        self.assertEqual([entry['bench'] for entry in plan], [['Fábio', 'Eva'], ['Duda', 'Caio']])
+
+        plan = rotation.plan_rotation(present, {}, {}, [], 2, 4, lineup_spread=_spread)
+        # Primeira partida: só os bancos com Ana ou Bruno são viáveis, e o único sem Caio em quadra é o mais equilibrado
+        self.assertEqual(plan[0]['bench'], ['Caio', 'Bruno'])
+        self.assertEqual(plan[0]['players'], ['Ana', 'Duda', 'Eva', 'Fábio'])
+        # Segunda: Caio e Bruno são obrigatórios, então Ana sai; Fábio é o primeiro na ordem de rodízio
+        self.assertEqual(plan[1]['mandatory'], ['Caio', 'Bruno'])
+        self.assertEqual(plan[1]['bench'], ['Fábio', 'Ana'])
+
+
+class RotationPlannerTest(unittest.TestCase):
+    """As partidas planejadas têm escalação com todos os planejados e ficam equilibradas como no modo direto."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+
+    def setUp(self):
+        self.engine = engine.LineupEngine(self.roster, verbose=False)
+        self.planner = rotation.RotationPlanner(self.engine, horizon=3, slots=12)
+
+    def tearDown(self):
+        self.planner.close()
+        self.engine.close()
+
+    def test_planned_matches_are_balanced(self):
+        session = engine.MatchSession(self.roster.players, list(PRESENT))
+        self.planner.replan(session)
+        greedy = rotation.plan_rotation(PRESENT, {}, {}, [], 3, 12)
+        greedy_spreads = [self.planner.lineup_spread(entry['players']) for entry in greedy]
+        for match, (entry, future) in enumerate(zip(self.planner.plan, self.planner.futures)):
+            solutions, _ = future.result()
+            with self.subTest(match=match + 1):
+                # Viável com todos os planejados obrigatórios, sem cair no fallback
+                self.assertIsNotNone(self.planner.lineup_spread(entry['players']))
+                self.assertTrue(solutions)
+                self.assertEqual(set(solutions[0][1]['assigned_players']), set(entry['players']))
+                self.assertLessEqual(solutions[0][1]['overall_difference'] / self.roster.scale_factor, 2.0)
+        # O banco guloso trava um conjunto muito desequilibrado (ou inviável) em alguma das partidas
+        self.assertTrue(any(spread is None or spread > 2.0 for spread in greedy_spreads))
+
+
+if __name__ == '__main__':
+    unittest.main()
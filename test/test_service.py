@@ -0,0 +1,157 @@
+import asyncio
+import json
+import tempfile
+import threading
+import unittest
+from http import HTTPStatus
+from unittest import mock
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import service
+
+# Jogadores presentes em cada sessão (os primeiros e os últimos do elenco), suficientes para formar times
+NUM_PLAYERS = 18
+
+
+class _Writer:
+    # Lado de escrita de uma conexão, guardando a resposta em memória
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LineupServiceTest(unittest.IsolatedAsyncioTestCase):
+    """Rotas por sessão, validação dos corpos (400) e backpressure (503) do serviço local."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+
+    async def asyncSetUp(self):
+        self.history_dir = tempfile.TemporaryDirectory()
+        self.service = service.LineupService(self.roster, num_engines=2, max_pending=1, history_dir=self.history_dir.name)
+        await self.service.start()
+
+    async def asyncTearDown(self):
+        self.service.close()
+        self.history_dir.cleanup()
+
+    async def _request(self, method, path, body=None, content=None):
+        if content is None:
+            content = json.dumps(body or {}).encode('utf-8')
+        reader = asyncio.StreamReader()
+        reader.feed_data(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(content)}\r\n\r\n".encode('latin-1') + content)
+        reader.feed_eof()
+        writer = _Writer()
+        await self.service.handle_connection(reader, writer)
+        head, _, payload = writer.data.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(payload)
+
+    async def _wait_until(self, condition, timeout=5):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            self.assertLess(asyncio.get_running_loop().time(), deadline)
+            await asyncio.sleep(0.01)
+
+    async def _create_session(self, players):
+        # Sem obrigatórios na primeira partida: os primeiros do elenco não cabem todos nas posições
+        status, payload = await self._request('POST', '/sessions', {'players': players, 'priority_count': 0})
+        self.assertEqual(status, HTTPStatus.CREATED)
+        return payload['session']
+
+    async def test_sessions_are_routed_independently(self):
+        first = await self._create_session(self.roster.players[:NUM_PLAYERS])
+        second = await self._create_session(self.roster.players[-14:])
+        self.assertNotEqual(first, second)
+
+        status, payload = await self._request('POST', f'/sessions/{first}/next', {'options': 2})
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertLessEqual(len(payload['options']), 2)
+        first_players = set(self.roster.players[:NUM_PLAYERS])
+        for option in payload['options']:
+            self.assertLessEqual({player for team in option['teams'] for player in team}, first_players)
+
+        status, payload = await self._request('POST', f'/sessions/{first}/choose', {'option': 1, 'winner': 1})
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(payload['match'], 2)
+        # As opções foram consumidas pela escolha; a outra sessão não foi afetada
+        status, _ = await self._request('POST', f'/sessions/{first}/choose', {'option': 1, 'winner': 1})
+        self.assertEqual(status, HTTPStatus.CONFLICT)
+        status, _ = await self._request('POST', f'/sessions/{second}/choose', {'option': 1, 'winner': 1})
+        self.assertEqual(status, HTTPStatus.CONFLICT)
+
+        status, payload = await self._request('DELETE', f'/sessions/{first}')
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertIn('stats', payload)
+        status, _ = await self._request('POST', f'/sessions/{first}/next')
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        status, _ = await self._request('POST', f'/sessions/{second}/escalar')
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        status, payload = await self._request('GET', '/metrics')
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(payload['sessions'], 1)
+
+    async def test_invalid_bodies_are_rejected(self):
+        session_id = await self._create_session(self.roster.players[:NUM_PLAYERS])
+        invalid = [
+            ('POST', '/sessions', {}),
+            ('POST', '/sessions', {'players': 'Fulano'}),
+            ('POST', '/sessions', {'players': [1, 2]}),
+            ('POST', '/sessions', {'players': ['Fulano'], 'priority_count': True}),
+            ('POST', f'/sessions/{session_id}/next', {'options': 0}),
+            ('POST', f'/sessions/{session_id}/players', {'arrived': 'Fulano'}),
+        ]
+        for method, path, body in invalid:
+            with self.subTest(path=path, body=body):
+                status, payload = await self._request(method, path, body)
+                self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+                self.assertIn('error', payload)
+        for content in (b'{"players": [', b'["Fulano"]'):
+            with self.subTest(content=content):
+                status, _ = await self._request('POST', '/sessions', content=content)
+                self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
+        status, _ = await self._request('POST', f'/sessions/{session_id}/next')
+        self.assertEqual(status, HTTPStatus.OK)
+        for body in ({'option': 99, 'winner': 1}, {'option': 1, 'winner': 3}, {'option': 1, 'winner': True}):
+            with self.subTest(body=body):
+                status, _ = await self._request('POST', f'/sessions/{session_id}/choose', body)
+                self.assertEqual(status, HTTPStatus.BAD_REQUEST)
+
+    async def test_rejects_only_when_engines_busy_and_queue_full(self):
+        release = threading.Event()
+
+        def blocking_solve(*args):
+            release.wait(10)
+            return []
+
+        players = self.roster.players[:NUM_PLAYERS]
+        with mock.patch.object(self.service.engines[0], 'solve', blocking_solve), mock.patch.object(self.service.engines[1], 'solve', blocking_solve):
+            try:
+                # Uma partida por motor: nenhuma é recusada, mesmo com max_pending=1
+                running = [asyncio.create_task(self.service.solve(players, [])) for _ in self.service.engines]
+                await self._wait_until(self.service._idle_engines.empty)
+                # Motores ocupados: uma partida cabe na fila, a seguinte é recusada
+                queued = asyncio.create_task(self.service.solve(players, []))
+                await self._wait_until(lambda: self.service.waiting == 1)
+                with self.assertRaises(service.ServiceError) as context:
+                    await self.service.solve(players, [])
+                self.assertEqual(context.exception.status, HTTPStatus.SERVICE_UNAVAILABLE)
+                self.assertEqual(self.service.rejected, 1)
+            finally:
+                release.set()
+            self.assertEqual(await asyncio.gather(*running, queued), [[], [], []])
+        self.assertEqual((self.service.pending, self.service.waiting), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from unittest import mock
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import lineup_model
+from match_making import team_configurations
+from same_optimum import assert_same_optimum
+
+
+def _unbroken_model(formulation, session_roster, positions_required_list):
+    # O mesmo modelo sem a quebra de simetria, tratado como se os times fossem diferentes
+    with mock.patch.object(lineup_model.BaseLineupModel, '_break_team_symmetry', lambda self, model, team_membership: None):
+        model = lineup_model.build_lineup_model(formulation, session_roster, positions_required_list)
+    model.identical_templates = False
+    return model
+
+
+class SymmetryBreakingTest(unittest.TestCase):
+    """Com dois times de mesma composição, fixar o primeiro escalado no time 0 só descarta as
+    escalações espelhadas: com e sem a quebra de simetria, o objetivo ótimo é o mesmo."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+        cls.configurations = [positions_required_list for positions_required_list in team_configurations.generate_configurations(cls.roster)
+                              if positions_required_list[0] == positions_required_list[1]]
+
+    def test_same_optimum_with_and_without_symmetry_breaking(self):
+        self.assertTrue(self.configurations)
+        for formulation in lineup_model.FORMULATIONS:
+            broken = [lineup_model.build_lineup_model(formulation, self.roster, positions_required_list) for positions_required_list in self.configurations]
+            self.assertTrue(all(model.identical_templates for model in broken))
+            unbroken = [_unbroken_model(formulation, self.roster, positions_required_list) for positions_required_list in self.configurations]
+            assert_same_optimum(self, [(broken, {}), (unbroken, {})], seed=5, formulation=formulation)
+
+
+if __name__ == '__main__':
+    unittest.main()
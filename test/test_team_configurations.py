@@ -0,0 +1,30 @@
+import unittest
+from match_making import team_configurations
+
+CONFIGURATION = [{'Levantador': 1, 'Ponta': 1}, {'Ponta': 1}]
+
+
+class FeasibilityTest(unittest.TestCase):
+    """is_feasible emparelha jogadores e vagas: um jogador flexível conta para uma posição só."""
+
+    def test_flexible_player_fills_one_slot(self):
+        # Contando por posição há 1 levantador e 2 pontas, mas Ana teria de ocupar as duas vagas
+        player_positions = {'Ana': ['Levantador', 'Ponta'], 'Bruno': ['Ponta'], 'Caio': ['Libero']}
+        self.assertFalse(team_configurations.is_feasible(CONFIGURATION, list(player_positions), None, player_positions))
+
+        player_positions['Duda'] = ['Ponta']
+        self.assertTrue(team_configurations.is_feasible(CONFIGURATION, list(player_positions), None, player_positions))
+
+    def test_mandatory_players_need_a_slot(self):
+        player_positions = {'Ana': ['Levantador', 'Ponta'], 'Bruno': ['Ponta'], 'Caio': ['Libero'], 'Duda': ['Ponta']}
+        players = list(player_positions)
+        self.assertTrue(team_configurations.is_feasible(CONFIGURATION, players, ['Ana', 'Bruno'], player_positions))
+        # Caio só joga de líbero, que a configuração não tem
+        self.assertFalse(team_configurations.is_feasible(CONFIGURATION, players, ['Caio'], player_positions))
+        # Mais obrigatórios que vagas
+        player_positions['Eva'] = ['Ponta']
+        self.assertFalse(team_configurations.is_feasible(CONFIGURATION, list(player_positions), ['Ana', 'Bruno', 'Duda', 'Eva'], player_positions))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import random
+import time
+import unittest
+from unittest import mock
+from data_input import roster_cache
+from data_cleaning import roster
+from match_making import engine
+from match_making import lineup_model
+
+# Elenco pequeno e sintético: 9 jogadores para dois times idênticos de 4 (um fica de fora)
+POSITIONS_REQUIRED = {'Levantador': 1, 'Ponta': 2, 'Meio': 1}
+PLAYER_POSITIONS = [['Levantador'], ['Levantador', 'Ponta'], ['Ponta'], ['Ponta', 'Meio'], ['Ponta'],
+                    ['Meio'], ['Meio', 'Ponta'], ['Ponta', 'Levantador'], ['Meio']]
+K = 6
+# Prazo do top-k sem orçamento no teste de latência, e folga para pré-processamento e extração
+LATENCY_BUDGET = 1.0
+LATENCY_SLACK = 0.5
+
+
+def _objective(solution_data, primary_positions):
+    # Objetivo do modelo: diferença de overall menos o número de jogadores na posição primária
+    primaries = sum(1 for team_positions in solution_data['team_positions'].values()
+                    for pos, players in team_positions.items() for player in players if primary_positions[player] == pos)
+    return solution_data['overall_difference'] - primaries
+
+
+class TopKTest(unittest.TestCase):
+    """As k divisões devolvidas são as k melhores (por força bruta), em ordem de objetivo."""
+
+    @classmethod
+    def setUpClass(cls):
+        (_, _, coefficients, _, _, all_positions), _ = roster_cache.load_roster_snapshot()
+        rng = random.Random(3)
+        names = [f'Jogador{idx}' for idx in range(len(PLAYER_POSITIONS))]
+        skills = {name: {skill: rng.randint(55, 95) for skill in roster.SKILL_NAMES} for name in names}
+        positions = dict(zip(names, PLAYER_POSITIONS))
+        cls.roster = roster.Roster(positions, {}, coefficients, names, skills, all_positions)
+
+    def _brute_force(self):
+        # Melhor objetivo de cada divisão (times como conjuntos; os times idênticos são intercambiáveis)
+        slots = [(team, pos) for team in range(2) for pos, required in POSITIONS_REQUIRED.items() for _ in range(required)]
+        best = {}
+
+        def place(slot_idx, used, teams, overalls, primaries):
+            if slot_idx == len(slots):
+                key = frozenset(frozenset(team) for team in teams)
+                objective = abs(overalls[0] - overalls[1]) - primaries
+                best[key] = min(best.get(key, objective), objective)
+                return
+            team, pos = slots[slot_idx]
+            for player in self.roster.players:
+                if player in used or pos not in self.roster.positions[player]:
+                    continue
+                overalls[team] += self.roster.primary_overall[player]
+                teams[team].append(player)
+                place(slot_idx + 1, used | {player}, teams, overalls,
+                      primaries + int(self.roster.primary_positions[player] == pos))
+                teams[team].pop()
+                overalls[team] -= self.roster.primary_overall[player]
+
+        place(0, frozenset(), [[], []], [0, 0], 0)
+        return sorted(best.values())
+
+    def test_ranked_top_k(self):
+        expected = self._brute_force()[:K]
+        for formulation in lineup_model.FORMULATIONS:
+            model = lineup_model.build_lineup_model(formulation, self.roster, [POSITIONS_REQUIRED, POSITIONS_REQUIRED])
+            # Sem gap as rodadas provam o ótimo, e o resultado é exato
+            with mock.patch.object(lineup_model, 'TOP_K_ABSOLUTE_GAP', 0), mock.patch.object(lineup_model, 'TOP_K_TIME_BUDGET', 120):
+                solutions_data = model.top_k_lineups(self.roster.players, k=K, verbose=False)
+            objectives = [_objective(solution_data, self.roster.primary_positions) for solution_data in solutions_data]
+            divisions = {frozenset(frozenset(team) for team in solution_data['teams'].values()) for solution_data in solutions_data}
+            with self.subTest(formulation=formulation):
+                self.assertEqual(model.last_solve_stats['status'], 'OPTIMAL')
+                self.assertEqual(len(divisions), K)
+                self.assertEqual(objectives, expected)
+
+    def test_gap_keeps_order(self):
+        # Com o gap padrão cada rodada fica a no máximo TOP_K_ABSOLUTE_GAP do melhor que resta: em ordem,
+        # a j-ésima divisão devolvida não é pior que a j-ésima melhor mais o gap
+        expected = self._brute_force()[:K]
+        for formulation in lineup_model.FORMULATIONS:
+            model = lineup_model.build_lineup_model(formulation, self.roster, [POSITIONS_REQUIRED, POSITIONS_REQUIRED])
+            solutions_data = model.top_k_lineups(self.roster.players, k=K, verbose=False)
+            objectives = [_objective(solution_data, self.roster.primary_positions) for solution_data in solutions_data]
+            with self.subTest(formulation=formulation):
+                self.assertEqual(objectives, sorted(objectives))
+                for objective, best in zip(objectives, expected):
+                    self.assertLessEqual(objective, best + lineup_model.TOP_K_ABSOLUTE_GAP)
+
+
+class TopKLatencyTest(unittest.TestCase):
+    """Sem --time-budget, o top-k tem um prazo total por partida, dividido entre as configurações
+    e as rodadas: a latência não cresce com k × número de configurações."""
+
+    @classmethod
+    def setUpClass(cls):
+        roster_data, version = roster_cache.load_roster_snapshot()
+        cls.roster = roster.Roster(*roster_data, version=version)
+
+    def test_match_deadline(self):
+        lineup_engine = engine.LineupEngine(self.roster, verbose=False, top_k=True)
+        try:
+            lineup_engine.warm_up()
+            for num_players in (18, len(self.roster.players)):
+                players = self.roster.players[:num_players]
+                with mock.patch.object(lineup_model, 'TOP_K_TIME_BUDGET', LATENCY_BUDGET):
+                    start = time.perf_counter()
+                    all_solutions = lineup_engine.solve(players, [])
+                    elapsed = time.perf_counter() - start
+                with self.subTest(players=num_players):
+                    self.assertTrue(all_solutions)
+                    self.assertLess(elapsed, LATENCY_BUDGET + LATENCY_SLACK)
+        finally:
+            lineup_engine.close()
+
+
+if __name__ == '__main__':
+    unittest.main()